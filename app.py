@@ -1,20 +1,106 @@
 
-from fastapi import FastAPI, APIRouter
-from voice_agent.main import voice_agent_router
-from video_agent.main import video_agent_router
-from graphics_agent.main import graphics_agent_router
+import asyncio
+import importlib
+
+from fastapi import FastAPI, APIRouter, Request, Response
+from fastapi.responses import JSONResponse
+from config import Config
+from core.cache import result_cache
+from core.embeddings import prompt_embedding_cache
+from core.executor import shutdown_executors
+from core.gateway import WorkerPool, create_gateway_router, parse_workers
+from core.jobs import job_manager
+from core.metrics import render_metrics
+from core.readiness import readiness
+from core.scheduling import current_tenant, fair_scheduler
+
+# The sub-agents: the module and name of their router, and their tag in the API docs
+AGENT_ROUTERS = {
+    "voice": ("voice_agent.main", "voice_agent_router", "Voice Agent"),
+    "video": ("video_agent.main", "video_agent_router", "Video Agent"),
+    "graphics": ("graphics_agent.main", "graphics_agent_router", "Graphics Agent"),
+    "campaign": ("campaign_agent.main", "campaign_agent_router", "Campaign Agent"),
+}
 
 app = FastAPI()
 
-# Include routers from the sub-agents
-app.include_router(voice_agent_router, prefix="/voice", tags=["Voice Agent"])
-app.include_router(video_agent_router, prefix="/video", tags=["Video Agent"])
-app.include_router(graphics_agent_router, prefix="/graphics", tags=["Graphics Agent"])
+# Agents with workers in GATEWAY_WORKERS are forwarded to them; of the others, those in SERVE_AGENTS
+# are served in this process. Only their modules are imported, so a worker loads only its own models.
+worker_pools = {agent: WorkerPool(agent, urls) for agent, urls in parse_workers(Config.GATEWAY_WORKERS).items() if agent in AGENT_ROUTERS}
+served_agents = list(AGENT_ROUTERS) if Config.SERVE_AGENTS.strip() == "all" else [agent.strip() for agent in Config.SERVE_AGENTS.split(",")]
+local_agents = []
+for agent, (module, router, tag) in AGENT_ROUTERS.items():
+    if agent in worker_pools:
+        app.include_router(create_gateway_router(worker_pools[agent]), prefix=f"/{agent}", tags=[tag])
+    elif agent in served_agents:
+        app.include_router(getattr(importlib.import_module(module), router), prefix=f"/{agent}", tags=[tag])
+        local_agents.append(agent)
+
+@app.middleware("http")
+async def identify_tenant(request: Request, call_next):
+    """
+    Attributes the request to a tenant for fair scheduling: the X-Tenant-ID header, else
+    X-Session-ID, else a shared anonymous tenant.
+    """
+    tenant = request.headers.get("X-Tenant-ID") or request.headers.get("X-Session-ID") or "anonymous"
+    token = current_tenant.set(tenant)
+    try:
+        return await call_next(request)
+    finally:
+        current_tenant.reset(token)
+
+@app.on_event("startup")
+async def startup():
+    if "voice" in local_agents or "campaign" in local_agents:
+        from voice_agent.engine import ambience_tracks
+
+        ambience_tracks.load()
+    job_manager.resume(Config.SERVER_STARTED_AT)
+    # Models warm up in the background so the server answers liveness checks meanwhile
+    app.state.warm_up = asyncio.create_task(readiness.warm_up())
+
+@app.on_event("shutdown")
+async def shutdown():
+    shutdown_executors()
+    await asyncio.gather(*(pool.close() for pool in worker_pools.values()))
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Kalasetu API"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Reports whether the models selected by WARMUP_MODELS are loaded and warmed up.
+    Responds with 503 until they are, so load balancers only route traffic to warm replicas.
+    A gateway also requires at least one ready worker per forwarded agent.
+    """
+    report = readiness.report()
+    if worker_pools:
+        statuses = await asyncio.gather(*(pool.ready() for pool in worker_pools.values()))
+        report["workers"] = dict(zip(worker_pools, statuses))
+        report["ready"] = report["ready"] and all(200 in status.values() for status in statuses)
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {**result_cache.stats(), "prompt_embeddings": prompt_embedding_cache.stats()}
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    """
+    Reports the estimated work running and waiting in the fair scheduler, by agent.
+    """
+    return fair_scheduler.stats()
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Exposes per-stage latency histograms, request counters and queue gauges for Prometheus.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
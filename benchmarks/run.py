@@ -0,0 +1,245 @@
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict
+
+import numpy as np
+
+from core.quality import QUALITY_TIERS
+
+# Metrics compared against a baseline, and whether a higher value is better
+COMPARED_METRICS = {
+    "latency_p50_ms": False,
+    "latency_p95_ms": False,
+    "throughput_per_second": True,
+    "peak_rss_mb": False,
+}
+
+# 'charts' is the graphics agent drawing a chart from data, for comparison with diffusion
+AGENTS = ("voice", "graphics", "video", "charts")
+
+ENDPOINTS = {
+    "voice": "/voice/generate_audio",
+    "graphics": "/graphics/generate_graphics",
+    "video": "/video/generate_video",
+    "charts": "/graphics/generate_graphics",
+}
+
+
+def build_payload(agent: str, index: int, enhance: bool = False, quality: str = "standard") -> dict:
+    """
+    Returns the request body of the index-th benchmark request for an agent.
+    Every request has its own seed, so none of them is answered from the result cache.
+    """
+    if agent == "voice":
+        return {"text": "Hello there. How are you doing today?", "ambience": "none", "seed": index, "quality": quality}
+    if agent == "graphics":
+        # Sized for the stand-in pipeline, which generates 64x64 images; the step count is the default
+        return {"text": "Quarterly revenue", "width": 64, "height": 64, "enhance_image": enhance, "seed": index, "quality": quality}
+    if agent == "charts":
+        # Drawn at the default 768x768; the quality tier does not change a chart
+        data = {"labels": ["Q1", "Q2", "Q3", "Q4"], "series": {"2023": [120, 340, 280, 410], "2024": [150, 360, 330, 480 + index]}}
+        return {"text": "Quarterly revenue", "chart_type": "bar_chart", "data": data, "seed": index, "quality": quality}
+    if agent == "video":
+        return {"text": "A cat on a rooftop", "add_subtitles": True, "enhance_video": enhance, "seed": index, "quality": quality}
+    raise ValueError(f"Unknown agent: {agent}")
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # ru_maxrss is the lifetime peak, in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """
+    Samples the resident set size of this process in the background and keeps the peak.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+def summarize(agent: str, concurrency: int, latencies: list, errors: dict, wall_seconds: float, peak_rss: int, quality: str = "standard") -> dict:
+    """
+    Reduces the outcome of one benchmark level to the numbers that are compared between runs.
+    """
+    return {
+        "agent": agent,
+        "quality": quality,
+        "concurrency": concurrency,
+        "requests": len(latencies) + sum(errors.values()),
+        "succeeded": len(latencies),
+        "errors": errors,
+        "latency_p50_ms": float(np.percentile(latencies, 50)) * 1000 if latencies else None,
+        "latency_p95_ms": float(np.percentile(latencies, 95)) * 1000 if latencies else None,
+        "throughput_per_second": len(latencies) / wall_seconds if wall_seconds else 0.0,
+        "wall_seconds": wall_seconds,
+        "peak_rss_mb": peak_rss / 2**20,
+    }
+
+
+async def run_level(client, agent: str, concurrency: int, requests: int, enhance: bool, first_index: int, quality: str = "standard") -> dict:
+    """
+    Sends the given number of requests with at most `concurrency` of them in flight.
+    """
+    latencies = []
+    errors = {}
+    indexes = iter(range(first_index, first_index + requests))
+
+    async def worker():
+        for index in indexes:
+            started = time.perf_counter()
+            response = await client.post(ENDPOINTS[agent], json=build_payload(agent, index, enhance, quality))
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall_seconds = time.perf_counter() - started
+    return summarize(agent, concurrency, latencies, errors, wall_seconds, rss.peak, quality)
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """
+    Returns a description of every metric that is worse than the baseline by more than `tolerance`
+    (a fraction), for the agent, quality tier and concurrency levels present in both runs.
+    """
+    def level(result):
+        return result["agent"], result.get("quality", "standard"), result["concurrency"]
+
+    previous = {level(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(level(result))
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(
+                    f"{result['agent']} ({result.get('quality', 'standard')}) at concurrency {result['concurrency']}: {metric} {old:.1f} -> {new:.1f} ({change:+.0%})"
+                )
+    return regressions
+
+
+async def run_benchmark(agents, concurrency_levels, requests: int, enhance: bool, warmup: int, qualities=("standard",)) -> list:
+    import httpx
+
+    from app import app
+
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for agent in agents:
+            next_index = 0
+            for quality in qualities:
+                # Load the models and fill the caches before anything is timed
+                for index in range(warmup):
+                    response = await client.post(ENDPOINTS[agent], json=build_payload(agent, -1 - index, enhance, quality))
+                    response.raise_for_status()
+                for concurrency in concurrency_levels:
+                    print(f"Benchmarking {agent} ({quality}) at concurrency {concurrency}...")
+                    result = await run_level(client, agent, concurrency, max(requests, concurrency), enhance, next_index, quality)
+                    next_index += result["requests"]
+                    print(
+                        f"  p50 {result['latency_p50_ms'] or 0:.0f} ms, p95 {result['latency_p95_ms'] or 0:.0f} ms, "
+                        f"{result['throughput_per_second']:.2f} req/s, peak RSS {result['peak_rss_mb']:.0f} MiB, errors {result['errors']}"
+                    )
+                    results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the agents through the FastAPI app with tiny local model stand-ins.")
+    parser.add_argument("--agents", nargs="+", choices=AGENTS, default=list(AGENTS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4], help="Concurrency levels to measure.")
+    parser.add_argument("--requests", type=int, default=8, help="Requests per concurrency level.")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed requests per agent before measuring.")
+    parser.add_argument("--enhance", action="store_true", help="Upscale graphics and video output.")
+    parser.add_argument("--quality", nargs="+", choices=QUALITY_TIERS, default=["standard"], help="Quality tiers to measure.")
+    parser.add_argument("--output", help="Where to write the JSON results. Defaults to benchmarks/results/<timestamp>.json.")
+    parser.add_argument("--baseline", help="A previous results file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression against the baseline.")
+    args = parser.parse_args(argv)
+
+    # Keep the benchmark's job store and cached files out of the working tree
+    state_dir = tempfile.mkdtemp(prefix="kalasetu-benchmark-")
+    os.environ.setdefault("JOB_STORE_PATH", os.path.join(state_dir, "jobs.sqlite3"))
+    os.environ.setdefault("RESULT_CACHE_DIR", os.path.join(state_dir, "cache"))
+
+    import torch
+
+    from core.profiles import get_profile
+    from .stand_ins import install
+
+    install()
+    results = asyncio.run(run_benchmark(args.agents, args.concurrency, args.requests, args.enhance, args.warmup, args.quality))
+    report = {
+        "created_at": time.time(),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+        "profile": asdict(get_profile()),
+        "settings": {"requests": args.requests, "warmup": args.warmup, "enhance": args.enhance, "quality": args.quality},
+        "results": results,
+    }
+
+    output = args.output or os.path.join(os.path.dirname(__file__), "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+
+# Tiny, randomly initialized stand-ins for the agents' models. They have the same classes and
+# call signatures as the real checkpoints but a tiny fraction of the parameters, so the whole
+# request path can be exercised without downloading anything. Their output is noise; only the
+# timings are meaningful.
+
+import json
+import os
+import tempfile
+
+import numpy as np
+import torch
+
+from core.models import UPSCALER
+from core.profiles import get_profile, prepare_bark, prepare_pipeline
+from core.registry import registry
+
+# Shared by the text encoders of every diffusion stand-in
+CROSS_ATTENTION_DIM = 32
+
+
+def _bytes_to_unicode() -> dict:
+    # The byte-to-character table CLIP's BPE vocabulary is defined over
+    printable = list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1)) + list(range(ord("®"), ord("ÿ") + 1))
+    codes = printable[:]
+    extra = 0
+    for byte in range(2**8):
+        if byte not in printable:
+            printable.append(byte)
+            codes.append(2**8 + extra)
+            extra += 1
+    return dict(zip(printable, [chr(code) for code in codes]))
+
+
+def _clip_text_model(directory: str):
+    """
+    Returns a character-level CLIP tokenizer and a two-layer text encoder.
+    """
+    from transformers import CLIPTextConfig, CLIPTextModel, CLIPTokenizer
+
+    vocab = {}
+    characters = list(_bytes_to_unicode().values())
+    for suffix in ("", "</w>"):
+        for character in characters:
+            vocab[character + suffix] = len(vocab)
+    vocab["<|startoftext|>"] = len(vocab)
+    vocab["<|endoftext|>"] = len(vocab)
+    vocab_path = os.path.join(directory, "vocab.json")
+    merges_path = os.path.join(directory, "merges.txt")
+    with open(vocab_path, "w") as f:
+        json.dump(vocab, f)
+    with open(merges_path, "w") as f:
+        f.write("#version: 0.2\n")
+
+    tokenizer = CLIPTokenizer(vocab_path, merges_path, model_max_length=77)
+    text_encoder = CLIPTextModel(CLIPTextConfig(
+        bos_token_id=len(vocab) - 2,
+        eos_token_id=len(vocab) - 1,
+        pad_token_id=len(vocab) - 1,
+        vocab_size=len(vocab),
+        hidden_size=CROSS_ATTENTION_DIM,
+        intermediate_size=37,
+        num_attention_heads=4,
+        num_hidden_layers=2,
+    ))
+    return tokenizer, text_encoder
+
+
+def _vae(blocks: int):
+    from diffusers import AutoencoderKL
+
+    # Each block after the first halves the resolution
+    return AutoencoderKL(
+        block_out_channels=[32] * (blocks - 1) + [64],
+        in_channels=3,
+        out_channels=3,
+        down_block_types=["DownEncoderBlock2D"] * blocks,
+        up_block_types=["UpDecoderBlock2D"] * blocks,
+        latent_channels=4,
+    )
+
+
+def _prepare(pipe):
+    profile = get_profile()
+    return prepare_pipeline(pipe.to(dtype=profile.torch_dtype), profile)
+
+
+def build_stable_diffusion():
+    """
+    A Stable Diffusion pipeline that generates 64x64 images by default.
+    """
+    from diffusers import DDIMScheduler, StableDiffusionPipeline, UNet2DConditionModel
+
+    torch.manual_seed(0)
+    tokenizer, text_encoder = _clip_text_model(tempfile.mkdtemp())
+    unet = UNet2DConditionModel(
+        block_out_channels=(32, 64),
+        layers_per_block=1,
+        sample_size=32,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        cross_attention_dim=CROSS_ATTENTION_DIM,
+    )
+    pipe = StableDiffusionPipeline(
+        unet=unet,
+        vae=_vae(2),
+        text_encoder=text_encoder,
+        tokenizer=tokenizer,
+        scheduler=DDIMScheduler(),
+        safety_checker=None,
+        feature_extractor=None,
+        requires_safety_checker=False,
+    )
+    pipe.set_progress_bar_config(disable=True)
+    return _prepare(pipe)
+
+
+def build_upscaler():
+    """
+    An x4 upscale pipeline: its VAE has three blocks, so latents are a quarter of the output size.
+    """
+    from diffusers import DDIMScheduler, DDPMScheduler, StableDiffusionUpscalePipeline, UNet2DConditionModel
+
+    torch.manual_seed(0)
+    tokenizer, text_encoder = _clip_text_model(tempfile.mkdtemp())
+    unet = UNet2DConditionModel(
+        block_out_channels=(32, 64),
+        layers_per_block=1,
+        sample_size=32,
+        in_channels=7,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        cross_attention_dim=CROSS_ATTENTION_DIM,
+        class_embed_type=None,
+        num_class_embeds=1001,
+    )
+    pipe = StableDiffusionUpscalePipeline(
+        vae=_vae(3),
+        text_encoder=text_encoder,
+        tokenizer=tokenizer,
+        unet=unet,
+        low_res_scheduler=DDPMScheduler(),
+        scheduler=DDIMScheduler(),
+        max_noise_level=350,
+    )
+    pipe.set_progress_bar_config(disable=True)
+    return _prepare(pipe)
+
+
+def build_text_to_video():
+    """
+    A text-to-video pipeline that generates 16 frames of 32x32 by default.
+    """
+    from diffusers import DDIMScheduler, TextToVideoSDPipeline, UNet3DConditionModel
+
+    torch.manual_seed(0)
+    tokenizer, text_encoder = _clip_text_model(tempfile.mkdtemp())
+    unet = UNet3DConditionModel(
+        block_out_channels=(16, 32),
+        layers_per_block=1,
+        sample_size=16,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("CrossAttnDownBlock3D", "DownBlock3D"),
+        up_block_types=("UpBlock3D", "CrossAttnUpBlock3D"),
+        cross_attention_dim=CROSS_ATTENTION_DIM,
+        attention_head_dim=8,
+        norm_num_groups=8,
+    )
+    pipe = TextToVideoSDPipeline(vae=_vae(2), text_encoder=text_encoder, tokenizer=tokenizer, unet=unet, scheduler=DDIMScheduler())
+    pipe.set_progress_bar_config(disable=True)
+    return _prepare(pipe)
+
+
+def build_bark(voice_presets, max_semantic_tokens: int = 32):
+    """
+    A Bark processor and model with one-layer sub-models and a small Encodec codec.
+    Each voice preset gets a short silent history prompt, stored in a temporary directory
+    the way the processor expects to find them.
+    - **voice_presets**: The preset names the processor must accept.
+    - **max_semantic_tokens**: Caps the semantic stage, which otherwise runs until an
+      end-of-sequence token that a random model rarely produces.
+    """
+    from transformers import BarkConfig, BarkModel, BarkProcessor, BertTokenizer, EncodecConfig
+    from transformers.models.bark.generation_configuration_bark import (
+        BarkCoarseGenerationConfig,
+        BarkFineGenerationConfig,
+        BarkGenerationConfig,
+        BarkSemanticGenerationConfig,
+    )
+
+    directory = tempfile.mkdtemp()
+    characters = sorted(set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 .,!?'"))
+    vocab_path = os.path.join(directory, "vocab.txt")
+    with open(vocab_path, "w") as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + characters))
+
+    prompts = {
+        "semantic_prompt": np.zeros(8, dtype=np.int64),
+        "coarse_prompt": np.zeros((2, 8), dtype=np.int64),
+        "fine_prompt": np.zeros((8, 8), dtype=np.int64),
+    }
+    paths = {}
+    for key, prompt in prompts.items():
+        paths[key] = f"history_{key}.npy"
+        np.save(os.path.join(directory, paths[key]), prompt)
+    speaker_embeddings = {"repo_or_path": directory}
+    speaker_embeddings.update({preset: paths for preset in voice_presets})
+    processor = BarkProcessor(BertTokenizer(vocab_path), speaker_embeddings=speaker_embeddings)
+
+    torch.manual_seed(0)
+    layer = dict(hidden_size=16, num_layers=1, num_heads=2, block_size=1024)
+    model = BarkModel(BarkConfig(
+        # The semantic model sees text tokens offset past the semantic vocabulary
+        semantic_config=dict(layer, input_vocab_size=129600, output_vocab_size=10048),
+        coarse_acoustics_config=dict(layer, input_vocab_size=12096, output_vocab_size=12096),
+        fine_acoustics_config=dict(layer, input_vocab_size=1056, output_vocab_size=1056, n_codes_total=8, n_codes_given=1),
+        codec_config=EncodecConfig(num_filters=4, hidden_size=16, codebook_dim=16).to_dict(),
+    )).eval()
+    generation_config = BarkGenerationConfig(
+        semantic_config=BarkSemanticGenerationConfig(max_new_tokens=max_semantic_tokens).to_dict(),
+        coarse_acoustics_config=BarkCoarseGenerationConfig().to_dict(),
+        fine_acoustics_config=BarkFineGenerationConfig().to_dict(),
+        sample_rate=24000,
+        codebook_size=1024,
+    )
+    # BarkModel.generate expects the sub-configs as plain dicts
+    for name in ("semantic_config", "coarse_acoustics_config", "fine_acoustics_config"):
+        sub_config = getattr(generation_config, name)
+        setattr(generation_config, name, sub_config.to_dict() if hasattr(sub_config, "to_dict") else sub_config)
+    model.generation_config = generation_config
+    return processor, prepare_bark(model)
+
+
+def install():
+    """
+    Registers the stand-ins in place of the real models of all three agents.
+    """
+    from graphics_agent.engine import STABLE_DIFFUSION
+    from video_agent.engine import TEXT_TO_VIDEO
+    from voice_agent.engine import BARK, BARK_SMALL, voice_presets
+
+    registry.register(STABLE_DIFFUSION, build_stable_diffusion, replace=True)
+    registry.register(UPSCALER, build_upscaler, replace=True)
+    registry.register(TEXT_TO_VIDEO, build_text_to_video, replace=True)
+    presets = set(voice_presets.values()) | {"v2/en_speaker_6"}
+    registry.register(BARK, lambda: build_bark(presets), replace=True)
+    registry.register(BARK_SMALL, lambda: build_bark(presets), replace=True)
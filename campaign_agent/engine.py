@@ -0,0 +1,124 @@
+import asyncio
+import time
+from core.cache import resolve_seed
+from core.dag import run_dag
+from core.progress import BranchProgress, ProgressTracker
+from graphics_agent.engine import generate_graphics_logic
+from graphics_agent.schemas import TextToGraphicsRequest
+from video_agent.engine import generate_video_logic
+from video_agent.schemas import TextToVideoRequest
+from voice_agent.engine import generate_audio_logic
+from voice_agent.schemas import TextToAudioRequest
+from .schemas import CampaignRequest, CampaignResponse
+
+STAGES = ("voice", "graphics", "video")
+
+
+def build_stage_requests(request: CampaignRequest) -> tuple:
+    """
+    Derives the voice, graphics and video requests from a campaign brief.
+    The fields the stages share (brief, tone, subject, quality and seed) are resolved once here, so every
+    stage describes the same content and a repeated brief hits each agent's caches.
+    """
+    seed = resolve_seed(request)
+    voice = TextToAudioRequest(
+        text=request.script or request.brief,
+        language=request.language,
+        accent=request.accent,
+        seed=seed,
+        quality=request.quality,
+    )
+    graphics = TextToGraphicsRequest(
+        text=request.brief,
+        chart_type=request.chart_type,
+        tone=request.tone,
+        color_scheme=request.color_scheme,
+        subject=request.subject,
+        style_preset=request.style_preset,
+        width=request.width,
+        height=request.height,
+        enhance_image=request.enhance,
+        seed=seed,
+        quality=request.quality,
+    )
+    video = TextToVideoRequest(
+        text=request.brief,
+        tone=request.tone,
+        domain=request.subject,
+        environment=request.environment,
+        add_subtitles=request.add_subtitles,
+        timed_subtitles=request.timed_subtitles,
+        enhance_video=request.enhance,
+        seed=seed,
+        quality=request.quality,
+    )
+    return voice, graphics, video
+
+
+async def generate_campaign_logic(request: CampaignRequest, progress: ProgressTracker = None) -> CampaignResponse:
+    """
+    Generates a campaign's narration, graphic and video as one dependency graph: the voice and
+    graphics stages run concurrently on their agents' executors, and the video stage starts once
+    both are done, using the narration as its audio track and the graphic as its title card.
+    Each stage goes through its agent's result cache, so a repeated brief is answered from it.
+    - **progress**: Carries cancellation and the deadline to every stage, and counts finished stages.
+      Defaults to a tracker enforcing the request's deadline_seconds.
+    """
+    progress = progress or ProgressTracker(request.deadline_seconds)
+    voice_request, graphics_request, video_request = build_stage_requests(request)
+    branches = {stage: BranchProgress(progress) for stage in STAGES}
+    stage_seconds = {}
+    progress.begin_stage("campaign", len(STAGES))
+
+    def timed(stage, run):
+        async def run_stage(results):
+            started = time.perf_counter()
+            response = await run(results)
+            stage_seconds[stage] = round(time.perf_counter() - started, 3)
+            progress.step()
+            return response
+        return run_stage
+
+    stages = {
+        "voice": ((), timed("voice", lambda results: generate_audio_logic(voice_request, progress=branches["voice"]))),
+        "graphics": ((), timed("graphics", lambda results: generate_graphics_logic(graphics_request, progress=branches["graphics"]))),
+        "video": (("voice", "graphics"), timed("video", lambda results: generate_video_logic(
+            video_request,
+            progress=branches["video"],
+            narration_file=results["voice"].audio_file,
+            title_card_file=results["graphics"].graphics_file,
+        ))),
+    }
+
+    started = time.perf_counter()
+    try:
+        results = await run_dag(stages)
+    except Exception:
+        # Stages already running on a worker stop at their next step boundary
+        for branch in branches.values():
+            branch.cancel()
+        raise
+    return CampaignResponse(
+        audio_file=results["voice"].audio_file,
+        graphics_file=results["graphics"].graphics_file,
+        video_file=results["video"].video_file,
+        stage_seconds=stage_seconds,
+        total_seconds=round(time.perf_counter() - started, 3),
+        message="Campaign generated successfully.",
+    )
+
+
+async def test_generate_campaign_logic():
+    print("Testing campaign generation logic...")
+    request = CampaignRequest(
+        brief="Launch of a solar-powered water purifier for rural schools",
+        script="Clean water for every classroom. Meet the solar purifier that runs all day on sunlight.",
+        tone="hopeful",
+        subject="social impact",
+        color_scheme="green and white",
+    )
+    response = await generate_campaign_logic(request)
+    print(f"Response: {response}")
+
+if __name__ == '__main__':
+    asyncio.run(test_generate_campaign_logic())
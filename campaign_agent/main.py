@@ -0,0 +1,52 @@
+
+from fastapi import APIRouter, HTTPException, Request
+from .schemas import CampaignRequest, CampaignResponse
+from core.executor import ExecutorSaturated
+from core.jobs import create_job_router
+from core.progress import GenerationCancelled, ProgressTracker, cancel_on_disconnect
+from .engine import generate_campaign_logic
+
+def validate_campaign_request(request: CampaignRequest):
+    if not request.brief:
+        raise HTTPException(status_code=400, detail="Brief cannot be empty.")
+
+campaign_agent_router = APIRouter()
+campaign_agent_router.include_router(create_job_router("campaign", CampaignRequest, generate_campaign_logic, artifact_field="video_file", validate=validate_campaign_request))
+
+@campaign_agent_router.post("/generate_campaign", response_model=CampaignResponse)
+async def generate_campaign(request: CampaignRequest, http_request: Request = None):
+    """
+    Generates a narration, a graphic and a video from one content brief in a single call.
+    The narration and graphic are generated concurrently; the video uses them as its audio track and title card.
+    - **brief**: What the campaign is about.
+    - **script**: The narration (optional, defaults to the brief).
+    - **tone**, **subject**, **environment**, **color_scheme**, **style_preset**, **chart_type**: Shared by the stages.
+    - **language**, **accent**: The narration's voice.
+    - **enhance**: Upscale the graphic and the video.
+    - **deadline_seconds**: Cancels the whole campaign if it runs longer than this (optional).
+    """
+    validate_campaign_request(request)
+
+    try:
+        progress = ProgressTracker(request.deadline_seconds)
+        generation = generate_campaign_logic(request, progress=progress)
+        if http_request is not None:
+            response = await cancel_on_disconnect(http_request, progress, generation)
+        else:
+            response = await generation
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except GenerationCancelled as e:
+        raise HTTPException(status_code=504 if e.reason == "exceeded its deadline" else 499, detail=str(e))
+    return response
+
+if __name__ == '__main__':
+    import asyncio
+
+    async def test_generate_campaign():
+        print("Testing campaign generation endpoint...")
+        test_request = CampaignRequest(brief="This is a test of the campaign agent endpoint.")
+        response = await generate_campaign(test_request)
+        print(f"Response: {response}")
+
+    asyncio.run(test_generate_campaign())
@@ -0,0 +1,31 @@
+
+from pydantic import BaseModel
+from typing import Dict, Literal, Optional
+
+class CampaignRequest(BaseModel):
+    brief: str  # What the campaign is about; the subject of the graphic and the video
+    script: Optional[str] = None  # The narration; defaults to the brief
+    tone: str = "neutral"
+    subject: str = "general"  # Also the video's domain
+    environment: str = "studio"
+    color_scheme: str = "default"
+    style_preset: Literal["photorealistic", "anime", "impressionism", "digital-art", "comic-book"] = "digital-art"
+    chart_type: str = "infographic"
+    language: str = "en"
+    accent: str = "us"
+    width: int = 768  # Size of the graphic
+    height: int = 768
+    add_subtitles: bool = True
+    timed_subtitles: bool = False  # Subtitle the video a sentence at a time, in step with the narration
+    enhance: bool = False  # Upscale the graphic and the video
+    quality: Literal["draft", "standard", "final"] = "standard"  # Shared by every stage
+    seed: Optional[int] = None  # Derived from the request when omitted; shared by every stage
+    deadline_seconds: Optional[float] = None  # The whole campaign is aborted once it runs longer
+
+class CampaignResponse(BaseModel):
+    audio_file: str
+    graphics_file: str
+    video_file: str
+    stage_seconds: Dict[str, float]  # Wall-clock time of each stage
+    total_seconds: float
+    message: str
@@ -2,3 +2,108 @@ import os
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
+
+    # Model registry: 0 disables the memory budget
+    MODEL_MEMORY_BUDGET_MB = int(os.environ.get('MODEL_MEMORY_BUDGET_MB', '0'))
+
+    # Inference executors: 'thread' or 'process' backend, concurrent workers
+    # and how many requests may wait before new ones are rejected with 503
+    VOICE_EXECUTOR_BACKEND = os.environ.get('VOICE_EXECUTOR_BACKEND', 'thread')
+    VOICE_MAX_WORKERS = int(os.environ.get('VOICE_MAX_WORKERS', '2'))
+    VOICE_MAX_QUEUE = int(os.environ.get('VOICE_MAX_QUEUE', '8'))
+    VIDEO_EXECUTOR_BACKEND = os.environ.get('VIDEO_EXECUTOR_BACKEND', 'thread')
+    VIDEO_MAX_WORKERS = int(os.environ.get('VIDEO_MAX_WORKERS', '1'))
+    VIDEO_MAX_QUEUE = int(os.environ.get('VIDEO_MAX_QUEUE', '2'))
+    GRAPHICS_EXECUTOR_BACKEND = os.environ.get('GRAPHICS_EXECUTOR_BACKEND', 'thread')
+    GRAPHICS_MAX_WORKERS = int(os.environ.get('GRAPHICS_MAX_WORKERS', '1'))
+    GRAPHICS_MAX_QUEUE = int(os.environ.get('GRAPHICS_MAX_QUEUE', '4'))
+    # Charts drawn from data take milliseconds and run on a small executor of their own
+    CHART_MAX_WORKERS = int(os.environ.get('CHART_MAX_WORKERS', '2'))
+    CHART_MAX_QUEUE = int(os.environ.get('CHART_MAX_QUEUE', '16'))
+
+    # Fair scheduler across agents and tenants, in estimated seconds of work on a reference CPU:
+    # how much may run at once and how much may wait before requests are rejected with 503;
+    # a capacity of 0 disables it. Weights give agents a larger share, e.g. 'voice=2,video=1'
+    SCHEDULER_CAPACITY_SECONDS = float(os.environ.get('SCHEDULER_CAPACITY_SECONDS', '600'))
+    SCHEDULER_MAX_BACKLOG_SECONDS = float(os.environ.get('SCHEDULER_MAX_BACKLOG_SECONDS', '14400'))
+    SCHEDULER_WEIGHTS = os.environ.get('SCHEDULER_WEIGHTS', 'voice=2,graphics=1,video=1')
+
+    # Split deployment: the agents this process serves itself ('all', 'none' or a comma-separated
+    # list), and the worker services the others are forwarded to, as
+    # 'voice=http://127.0.0.1:8101,unix:/run/kalasetu/voice.sock;video=http://127.0.0.1:8103'
+    SERVE_AGENTS = os.environ.get('SERVE_AGENTS', 'all')
+    GATEWAY_WORKERS = os.environ.get('GATEWAY_WORKERS', '')
+    GATEWAY_MAX_CONNECTIONS = int(os.environ.get('GATEWAY_MAX_CONNECTIONS', '64'))  # Per worker
+    GATEWAY_TIMEOUT_SECONDS = float(os.environ.get('GATEWAY_TIMEOUT_SECONDS', '900'))  # 0 waits forever
+    GATEWAY_RETRY_SECONDS = int(os.environ.get('GATEWAY_RETRY_SECONDS', '5'))
+    GATEWAY_READY_TIMEOUT_SECONDS = float(os.environ.get('GATEWAY_READY_TIMEOUT_SECONDS', '2'))
+
+    # Background jobs are persisted here so they survive a worker restart
+    JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH', os.path.join('outputs', 'jobs.sqlite3'))
+    # Set by gunicorn.conf.py when the server starts several workers, so only the jobs
+    # of the previous server are resumed
+    SERVER_STARTED_AT = float(os.environ.get('SERVER_STARTED_AT', '0'))
+
+    # Graphics requests with the same size and step count arriving within the
+    # wait window are generated together, up to the batch size
+    GRAPHICS_MAX_BATCH_SIZE = int(os.environ.get('GRAPHICS_MAX_BATCH_SIZE', '4'))
+    GRAPHICS_MAX_BATCH_WAIT_MS = int(os.environ.get('GRAPHICS_MAX_BATCH_WAIT_MS', '50'))
+
+    # Generated files are cached by request hash; 0 disables the cache
+    RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', os.path.join('outputs', 'cache'))
+    RESULT_CACHE_MAX_MB = int(os.environ.get('RESULT_CACHE_MAX_MB', '1024'))
+    # Text encoder outputs of recent prompts, per model; 0 disables the cache
+    PROMPT_EMBEDDING_CACHE_SIZE = int(os.environ.get('PROMPT_EMBEDDING_CACHE_SIZE', '256'))
+
+    # Quality tiers: draft requests denoise with this many DPM-Solver++ steps, skip upscaling and
+    # speak with Bark small; final requests denoise with at least this many
+    GRAPHICS_DRAFT_STEPS = int(os.environ.get('GRAPHICS_DRAFT_STEPS', '12'))
+    GRAPHICS_FINAL_STEPS = int(os.environ.get('GRAPHICS_FINAL_STEPS', '50'))
+    VIDEO_DRAFT_STEPS = int(os.environ.get('VIDEO_DRAFT_STEPS', '10'))
+    VIDEO_FINAL_STEPS = int(os.environ.get('VIDEO_FINAL_STEPS', '50'))
+
+    # Long voice inputs are split into sentence chunks of at most this many
+    # characters, generated in batches and joined with short crossfades
+    VOICE_MAX_CHUNK_CHARS = int(os.environ.get('VOICE_MAX_CHUNK_CHARS', '200'))
+    VOICE_BATCH_SIZE = int(os.environ.get('VOICE_BATCH_SIZE', '4'))
+    VOICE_CROSSFADE_MS = int(os.environ.get('VOICE_CROSSFADE_MS', '50'))
+
+    # Ambience is mixed under the speech at this gain, with fades at both ends
+    VOICE_AMBIENCE_GAIN_DB = float(os.environ.get('VOICE_AMBIENCE_GAIN_DB', '-10'))
+    VOICE_AMBIENCE_FADE_MS = int(os.environ.get('VOICE_AMBIENCE_FADE_MS', '500'))
+
+    # Videos are encoded once, straight from the generated frames
+    VIDEO_FPS = int(os.environ.get('VIDEO_FPS', '8'))
+    VIDEO_ENCODER_PRESET = os.environ.get('VIDEO_ENCODER_PRESET', 'medium')
+    # Timed subtitles show sentences of the text in segments of at most this many characters
+    VIDEO_SUBTITLE_MAX_CHARS = int(os.environ.get('VIDEO_SUBTITLE_MAX_CHARS', '80'))
+    # Videos longer than one segment are generated as consecutive segments of this many
+    # frames, each continuing the last overlap frames of the previous one
+    VIDEO_SEGMENT_FRAMES = int(os.environ.get('VIDEO_SEGMENT_FRAMES', '16'))
+    VIDEO_SEGMENT_OVERLAP_FRAMES = int(os.environ.get('VIDEO_SEGMENT_OVERLAP_FRAMES', '4'))
+    VIDEO_MAX_DURATION_SECONDS = float(os.environ.get('VIDEO_MAX_DURATION_SECONDS', '120'))
+    # How long a title card (e.g. a campaign's graphic) is shown before the clip
+    VIDEO_TITLE_CARD_SECONDS = float(os.environ.get('VIDEO_TITLE_CARD_SECONDS', '2'))
+
+    # The x4 upscaler works on overlapping tiles of this size (in input pixels),
+    # upscaling this many tiles per pipeline call
+    UPSCALE_TILE_SIZE = int(os.environ.get('UPSCALE_TILE_SIZE', '128'))
+    UPSCALE_TILE_OVERLAP = int(os.environ.get('UPSCALE_TILE_OVERLAP', '16'))
+    UPSCALE_BATCH_SIZE = int(os.environ.get('UPSCALE_BATCH_SIZE', '4'))
+
+    # Execution profile; 'auto' (or 0 threads) picks a default for the host
+    EXECUTION_DTYPE = os.environ.get('EXECUTION_DTYPE', 'auto')  # fp32, bf16 or fp16
+    TORCH_INTRA_OP_THREADS = int(os.environ.get('TORCH_INTRA_OP_THREADS', '0'))
+    TORCH_INTER_OP_THREADS = int(os.environ.get('TORCH_INTER_OP_THREADS', '0'))
+    ATTENTION_SLICING = os.environ.get('ATTENTION_SLICING', 'auto')
+    CHANNELS_LAST = os.environ.get('CHANNELS_LAST', 'auto')
+    TORCH_COMPILE = os.environ.get('TORCH_COMPILE', 'auto')
+    QUANTIZE_BARK = os.environ.get('QUANTIZE_BARK', 'auto')
+
+    # Models are loaded from safetensors snapshots in this directory when present
+    # (see core/snapshot.py); empty loads them from the Hugging Face Hub
+    MODEL_SNAPSHOT_DIR = os.environ.get('MODEL_SNAPSHOT_DIR', '')
+    # Models loaded and warmed up at startup before /ready reports ready:
+    # 'all', 'none' or a comma-separated list of model names. None by default, so models load
+    # on first use; deployments opt in to the models they serve
+    WARMUP_MODELS = os.environ.get('WARMUP_MODELS', 'none')
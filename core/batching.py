@@ -0,0 +1,109 @@
+
+import asyncio
+import time
+from collections import deque
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class BatchScheduler:
+    """
+    Collects requests that arrive within a short window and runs compatible ones together.
+    - **run_batch**: Coroutine function taking a list of items and returning one result (or exception) per item.
+    - **max_batch_size**: A batch is dispatched as soon as it holds this many items.
+    - **max_wait**: Seconds the first item of a batch waits for company before dispatch.
+    Items are only batched with items submitted under the same key.
+    """
+
+    def __init__(self, run_batch, max_batch_size: int = 4, max_wait: float = 0.05, window: int = 1000):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queues = {}
+        self._timers = {}
+        self._batch_sizes = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+        self._started = None
+        self._items = 0
+        self._batches = 0
+
+    @property
+    def pending(self) -> int:
+        """
+        The number of items waiting for their batch to be dispatched.
+        """
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def submit(self, key, item):
+        """
+        Queues an item and waits for its result.
+        """
+        loop = asyncio.get_running_loop()
+        if self._started is None:
+            self._started = time.perf_counter()
+        future = loop.create_future()
+        queue = self._queues.setdefault(key, [])
+        queue.append((item, future, time.perf_counter()))
+        if len(queue) >= self.max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        queue = self._queues.get(key, [])
+        batch, rest = queue[:self.max_batch_size], queue[self.max_batch_size:]
+        if rest:
+            self._queues[key] = rest
+            self._timers[key] = asyncio.get_running_loop().call_later(self.max_wait, self._flush, key)
+        else:
+            self._queues.pop(key, None)
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        try:
+            results = await self.run_batch([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finished = time.perf_counter()
+        self._batches += 1
+        self._items += len(batch)
+        self._batch_sizes.append(len(batch))
+        for (_, future, enqueued), result in zip(batch, results):
+            self._latencies.append(finished - enqueued)
+            if future.done():
+                continue
+            # run_batch may fail individual items by returning their exception
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """
+        Reports throughput and latency over the recent batches.
+        """
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        latencies = list(self._latencies)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "items": self._items,
+            "mean_batch_size": sum(self._batch_sizes) / len(self._batch_sizes) if self._batch_sizes else 0.0,
+            "throughput_per_second": self._items / elapsed if elapsed else 0.0,
+            "latency_p50_ms": _percentile(latencies, 0.50) * 1000,
+            "latency_p95_ms": _percentile(latencies, 0.95) * 1000,
+        }
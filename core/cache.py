@@ -0,0 +1,189 @@
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import Config
+from .executor import ExecutorSaturated
+from .metrics import REQUESTS
+from .progress import GenerationCancelled
+from .scheduling import fair_scheduler
+
+# Fields that control how a request runs rather than what it produces
+_UNKEYED_FIELDS = {"seed", "deadline_seconds"}
+# Fields that change the output but not the derived seed, so a draft and its final render share one
+_UNSEEDED_FIELDS = {"quality"}
+# A lookup missing from the index rescans the directory for other processes' entries at most this often
+RESCAN_INTERVAL_SECONDS = 5.0
+
+
+def request_key(agent: str, request, inputs: dict = None) -> str:
+    """
+    Returns a canonical hash of a request: field order and formatting do not matter.
+    The seed is resolved first so that an omitted seed and its derived value share a key.
+    - **inputs**: Files passed to the generation besides the request, such as a narration track.
+      Cached files are named by their own key, so their paths identify their content.
+    """
+    fields = request.dict(exclude=_UNKEYED_FIELDS)
+    fields["seed"] = resolve_seed(request)
+    key = {"agent": agent, "request": fields}
+    if inputs:
+        key["inputs"] = inputs
+    payload = json.dumps(key, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def resolve_seed(request) -> int:
+    """
+    Returns the request's seed, or one derived from the other request fields when it is omitted,
+    so identical requests always produce identical output. The quality tier does not change it.
+    """
+    if request.seed is not None:
+        return request.seed
+    fields = request.dict(exclude=_UNKEYED_FIELDS | _UNSEEDED_FIELDS)
+    payload = json.dumps(fields, sort_keys=True, separators=(",", ":"), default=str)
+    return int(hashlib.sha256(payload.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _last_use(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return 0.0
+
+
+class ResultCache:
+    """
+    Stores generated files on disk under their request key.
+    When the total size exceeds max_bytes, the least recently used files are deleted.
+    A hit refreshes the file's modification time, which is what the eviction order is based on.
+    Worker processes sharing the directory share the cache: the index is refreshed from disk before
+    evicting, so max_bytes caps the directory rather than each process's share of it, and on a miss
+    at most every RESCAN_INTERVAL_SECONDS, so entries written by other processes are found soon after.
+    - **scheduler**: Orders the generations of cache misses; defaults to the shared fair scheduler.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, scheduler=fair_scheduler):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.scheduler = scheduler
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # key -> (path, size), rebuilt from disk so the cache survives restarts
+        self._index = {}
+        self._scanned_at = 0.0
+        self._scan()
+
+    def _scan(self):
+        index = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    index[os.path.splitext(entry.name)[0]] = (entry.path, entry.stat().st_size)
+                except FileNotFoundError:  # Evicted by another process meanwhile
+                    continue
+        self._index = index
+        self._scanned_at = time.monotonic()
+
+    def get(self, key: str):
+        """
+        Returns the cached file for the key, or None on a miss.
+        """
+        with self._lock:
+            if not self.max_bytes:
+                self.misses += 1
+                return None
+            if key not in self._index and time.monotonic() - self._scanned_at >= RESCAN_INTERVAL_SECONDS:
+                # Another process may have cached it since the last scan
+                self._scan()
+            entry = self._index.get(key)
+            try:
+                os.utime(entry[0])
+            except (TypeError, FileNotFoundError):
+                self._index.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, path: str) -> str:
+        """
+        Moves a generated file into the cache and returns its new location.
+        """
+        if not self.max_bytes:
+            return path
+        cached_path = os.path.join(self.directory, key + os.path.splitext(path)[1])
+        with self._lock:
+            os.replace(path, cached_path)
+            self._scan()
+            self._evict(keep=key)
+        return cached_path
+
+    def _evict(self, keep: str):
+        total = sum(size for _, size in self._index.values())
+        if total <= self.max_bytes:
+            return
+        by_last_use = sorted(self._index.items(), key=lambda item: _last_use(item[1][0]))
+        for key, (path, size) in by_last_use:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            else:
+                self.evictions += 1
+            del self._index[key]
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._scan()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "files": len(self._index),
+                "bytes": sum(size for _, size in self._index.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+    async def fetch(self, agent: str, request, generate, response_model, artifact_field: str, inputs: dict = None):
+        """
+        Returns the cached response for a request, or awaits generate(request) and caches its file.
+        Generation waits for its turn in the fair scheduler; cache hits do not.
+        - **inputs**: Additional input files the output depends on; see request_key.
+        Responses with a seed field report the seed the request was generated with.
+        """
+        key = request_key(agent, request, inputs)
+        seed = {"seed": resolve_seed(request)} if "seed" in response_model.model_fields else {}
+        path = self.get(key)
+        if path is not None:
+            REQUESTS.labels(agent, "cached").inc()
+            return response_model(**{artifact_field: path, "message": "Loaded from cache.", **seed})
+        try:
+            response = await self.scheduler.run(agent, request, generate)
+        except ExecutorSaturated:
+            REQUESTS.labels(agent, "rejected").inc()
+            raise
+        except GenerationCancelled:
+            REQUESTS.labels(agent, "cancelled").inc()
+            raise
+        except Exception:
+            REQUESTS.labels(agent, "failed").inc()
+            raise
+        REQUESTS.labels(agent, "generated").inc()
+        cached_path = self.put(key, getattr(response, artifact_field))
+        return response.copy(update={artifact_field: cached_path, **seed})
+
+
+result_cache = ResultCache(Config.RESULT_CACHE_DIR, Config.RESULT_CACHE_MAX_MB * 2**20)
@@ -0,0 +1,58 @@
+
+import asyncio
+
+
+def topological_order(stages: dict) -> list:
+    """
+    Returns the stage names so that every stage comes after its dependencies.
+    Raises ValueError for unknown dependencies and cycles.
+    """
+    order, visiting, done = [], set(), set()
+
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Stages form a cycle: {' -> '.join(path + [name])}")
+        if name not in stages:
+            raise ValueError(f"Stage '{path[-1]}' depends on unknown stage '{name}'.")
+        visiting.add(name)
+        for dependency in stages[name][0]:
+            visit(dependency, path + [name])
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in stages:
+        visit(name, [])
+    return order
+
+
+async def run_dag(stages: dict) -> dict:
+    """
+    Runs a graph of async stages, starting each one as soon as its dependencies have finished,
+    so independent branches overlap and the total time approaches that of the longest branch.
+    - **stages**: Maps a stage name to (dependencies, run), where run is an async function called
+      with a dict of the dependencies' results.
+    Returns the result of every stage. If a stage fails, the stages that have not finished are
+    cancelled and the error is raised.
+    """
+    order = topological_order(stages)
+    tasks = {}
+
+    async def run_stage(name):
+        dependencies, run = stages[name]
+        results = {dependency: await tasks[dependency] for dependency in dependencies}
+        return await run(results)
+
+    for name in order:
+        tasks[name] = asyncio.ensure_future(run_stage(name))
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        # Let the cancelled stages unwind before the error propagates
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return {name: task.result() for name, task in tasks.items()}
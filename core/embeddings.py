@@ -0,0 +1,85 @@
+
+import threading
+import weakref
+from collections import OrderedDict
+
+from config import Config
+from .metrics import PROMPT_EMBEDDINGS
+
+
+class PromptEmbeddingCache:
+    """
+    Keeps the text encoder output of recent prompts, keyed by model and text, in least-recently-used
+    order. Templated prompts and negative prompts repeat heavily, so most of them skip the encoder.
+    Entries of a model are dropped when its pipeline is replaced by one with another text encoder.
+    - **max_entries**: How many embeddings are kept. 0 disables the cache.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (model, text) -> embedding of shape (tokens, dim)
+        self._encoders = {}  # model -> weak reference to the text encoder the entries came from
+        self._lock = threading.Lock()
+
+    def encode(self, model: str, pipe, texts: list):
+        """
+        Returns the embeddings of texts, shaped (len(texts), tokens, dim), as pipe.encode_prompt
+        computes them without classifier-free guidance. Texts missing from the cache are encoded in
+        one batch. Pass the result as prompt_embeds or negative_prompt_embeds; use "" for an absent
+        negative prompt, which is what the pipelines encode in its place.
+        """
+        import torch
+
+        encoder = getattr(pipe, "text_encoder", None) or pipe
+        with self._lock:
+            if self._encoders.get(model, lambda: None)() is not encoder:
+                self._drop(model)
+                self._encoders[model] = weakref.ref(encoder)
+            found = {text: self._entries.get((model, text)) for text in texts}
+            for text, embedding in found.items():
+                if embedding is not None:
+                    self._entries.move_to_end((model, text))
+            missing = [text for text, embedding in found.items() if embedding is None]
+            misses = sum(found[text] is None for text in texts)
+            self._count(model, len(texts) - misses, misses)
+
+        if missing:
+            with torch.no_grad():
+                embeddings, _ = pipe.encode_prompt(missing, pipe.device, 1, False)
+            for text, embedding in zip(missing, embeddings):
+                found[text] = embedding
+            with self._lock:
+                if self.max_entries:
+                    for text in missing:
+                        self._entries[(model, text)] = found[text]
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return torch.stack([found[text] for text in texts])
+
+    def _count(self, model: str, hits: int, misses: int):
+        self.hits += hits
+        self.misses += misses
+        if hits:
+            PROMPT_EMBEDDINGS.labels(model, "hit").inc(hits)
+        if misses:
+            PROMPT_EMBEDDINGS.labels(model, "miss").inc(misses)
+
+    def _drop(self, model: str):
+        for key in [key for key in self._entries if key[0] == model]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+prompt_embedding_cache = PromptEmbeddingCache(Config.PROMPT_EMBEDDING_CACHE_SIZE)
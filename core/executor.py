@@ -0,0 +1,99 @@
+
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .metrics import IN_FLIGHT, QUEUE_DEPTH, gauge_function
+
+_executors = []
+
+
+class ExecutorSaturated(Exception):
+    """
+    Raised when an executor already holds as much work as its queue allows.
+    """
+
+
+class AgentExecutor:
+    """
+    Runs blocking inference calls off the event loop on a bounded pool.
+    - **name**: The agent the executor belongs to, used in messages.
+    - **max_workers**: How many calls run concurrently.
+    - **max_queue**: How many calls may wait for a free worker before new ones are rejected.
+    - **backend**: 'thread' or 'process'. Process workers load their own copy of the models.
+    - **inference**: Whether the calls run torch models; only those share the intra-op threads.
+    """
+
+    def __init__(self, name: str, max_workers: int = 1, max_queue: int = 4, backend: str = "thread", inference: bool = True):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown executor backend: {backend}")
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.backend = backend
+        self.inference = inference
+        self._pool = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        gauge_function(IN_FLIGHT.labels(name), lambda: self.in_flight)
+        gauge_function(QUEUE_DEPTH.labels(name), lambda: self.queued)
+        _executors.append(self)
+
+    @property
+    def in_flight(self) -> int:
+        return min(self._pending, self.max_workers)
+
+    @property
+    def queued(self) -> int:
+        return max(self._pending - self.max_workers, 0)
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.backend == "process":
+                # Spawn rather than fork so torch thread pools are not inherited mid-use
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-agent")
+        return self._pool
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) on the pool and waits for the result.
+        Raises ExecutorSaturated instead of queueing beyond max_queue.
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise ExecutorSaturated(f"The {self.name} agent is at capacity. Please retry later.")
+            self._pending += 1
+        try:
+            future = self._get_pool().submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        # Released when the call finishes rather than when the caller stops waiting: a cancelled
+        # caller leaves the call running, and it still occupies a worker
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def concurrent_calls() -> int:
+    """
+    Returns how many inference calls the executors of this process run at most at once.
+    """
+    return sum(executor.max_workers for executor in _executors if executor.inference)
+
+
+def shutdown_executors():
+    for executor in _executors:
+        executor.shutdown()
@@ -0,0 +1,228 @@
+import asyncio
+import itertools
+import re
+import time
+from collections import OrderedDict
+
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from config import Config
+from .metrics import GATEWAY_REQUESTS, WORKER_IN_FLIGHT, gauge_function
+
+# Hop-by-hop headers describe one connection and are not forwarded
+_HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers", "transfer-encoding", "upgrade", "host"}
+_JOB_PATH = re.compile(r"^jobs/([^/]+)")
+# How many job ids the gateway remembers the worker of
+_MAX_JOB_ROUTES = 10000
+
+
+class WorkersUnavailable(Exception):
+    """
+    Raised when no worker of an agent can take a request.
+    """
+
+
+def parse_workers(setting: str) -> dict:
+    """
+    Parses 'agent=url,url;agent=url' into a dict of agent -> list of worker URLs.
+    A URL is either http://host:port or unix:/path/to/socket.
+    """
+    workers = {}
+    for entry in setting.split(";"):
+        agent, _, urls = entry.partition("=")
+        urls = [url.strip().rstrip("/") for url in urls.split(",") if url.strip()]
+        if agent.strip() and urls:
+            workers[agent.strip()] = urls
+        elif entry.strip():
+            print(f"Warning: Ignoring malformed gateway workers entry '{entry.strip()}'.")
+    return workers
+
+
+def _client(url: str, transport=None):
+    import httpx
+
+    limits = httpx.Limits(max_connections=Config.GATEWAY_MAX_CONNECTIONS, max_keepalive_connections=Config.GATEWAY_MAX_CONNECTIONS, keepalive_expiry=60)
+    timeout = httpx.Timeout(Config.GATEWAY_TIMEOUT_SECONDS or None, connect=5.0)
+    if url.startswith("unix:"):
+        # The host only fills the Host header; the socket decides where the request goes
+        transport = transport or httpx.AsyncHTTPTransport(uds=url[len("unix:"):], limits=limits)
+        return httpx.AsyncClient(transport=transport, base_url="http://worker", timeout=timeout)
+    return httpx.AsyncClient(transport=transport, base_url=url, limits=limits, timeout=timeout)
+
+
+class _Instance:
+    def __init__(self, agent: str, url: str, transport=None):
+        self.url = url
+        self.client = _client(url, transport)
+        self.in_flight = 0
+        self.down_until = 0.0
+        gauge_function(WORKER_IN_FLIGHT.labels(agent, url), lambda: self.in_flight)
+
+
+class WorkerPool:
+    """
+    Forwards an agent's requests to its worker instances over pooled keep-alive connections.
+    Each request goes to the instance with the fewest requests in flight. An instance that
+    refuses connections is skipped for GATEWAY_RETRY_SECONDS, and a request an instance rejects
+    with 503 (at capacity) is retried on the others, so neither error reaches the client while
+    another instance can serve it. Background jobs stay on the instance that runs them.
+    - **transport**: Optional function mapping a URL to an httpx transport, for tests.
+    """
+
+    def __init__(self, agent: str, urls: list, transport=None):
+        self.agent = agent
+        self.instances = [_Instance(agent, url, transport(url) if transport else None) for url in urls]
+        self._rotation = itertools.count()
+        self._job_routes = OrderedDict()  # job id -> instance running it
+
+    def _candidates(self, path: str) -> list:
+        match = _JOB_PATH.match(path)
+        if match and match.group(1) in self._job_routes:
+            return [self._job_routes[match.group(1)]]
+        now = time.monotonic()
+        up = [instance for instance in self.instances if instance.down_until <= now] or self.instances
+        if match:
+            # A job the gateway has not seen (e.g. before a restart) is looked up on every instance
+            return up
+        # Least requests in flight first; the rotation spreads ties across instances
+        offset = next(self._rotation)
+        order = sorted(range(len(up)), key=lambda index: (up[index].in_flight, (index - offset) % len(up)))
+        return [up[index] for index in order]
+
+    def _remember_job(self, job_id: str, instance: _Instance):
+        self._job_routes[job_id] = instance
+        self._job_routes.move_to_end(job_id)
+        while len(self._job_routes) > _MAX_JOB_ROUTES:
+            self._job_routes.popitem(last=False)
+
+    async def forward(self, request: Request, path: str) -> Response:
+        """
+        Sends the request to a worker and streams its response back.
+        Raises WorkersUnavailable when no instance could be reached.
+        """
+        import httpx
+
+        body = await request.body()
+        headers = {name: value for name, value in request.headers.items() if name.lower() not in _HOP_BY_HOP}
+        url = httpx.URL(path=f"/{self.agent}/{path}", query=request.url.query.encode("utf-8"))
+        job_lookup = bool(_JOB_PATH.match(path))
+        candidates = self._candidates(path)
+        last_response = None
+        for index, instance in enumerate(candidates):
+            retry_possible = index + 1 < len(candidates)
+            instance.in_flight += 1
+            try:
+                upstream = await instance.client.send(
+                    instance.client.build_request(request.method, url, headers=headers, content=body),
+                    stream=True,
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                instance.in_flight -= 1
+                instance.down_until = time.monotonic() + Config.GATEWAY_RETRY_SECONDS
+                print(f"Warning: Worker {instance.url} of the {self.agent} agent is unreachable: {e}")
+                GATEWAY_REQUESTS.labels(self.agent, "unreachable").inc()
+                continue
+            except httpx.HTTPError as e:
+                # The worker may have started the work, so the request is not retried elsewhere
+                instance.in_flight -= 1
+                return self._failed(instance, e)
+            try:
+                if retry_possible and (upstream.status_code == 503 or (job_lookup and upstream.status_code == 404)):
+                    # Nothing was generated, so another instance may serve the request
+                    last_response = await self._read(upstream, instance)
+                    continue
+                if request.method == "POST" and path == "jobs" and upstream.status_code == 202:
+                    response = await self._read(upstream, instance)
+                    GATEWAY_REQUESTS.labels(self.agent, str(upstream.status_code)).inc()
+                    self._remember_job(response.json()["job_id"], instance)
+                    return Response(response.content, status_code=response.status_code, headers=self._response_headers(response, buffered=True))
+            except httpx.HTTPError as e:
+                # _read has released the instance
+                return self._failed(instance, e)
+            GATEWAY_REQUESTS.labels(self.agent, str(upstream.status_code)).inc()
+            if job_lookup and upstream.status_code < 400:
+                self._remember_job(_JOB_PATH.match(path).group(1), instance)
+            return StreamingResponse(
+                self._stream(upstream, instance),
+                status_code=upstream.status_code,
+                headers=self._response_headers(upstream),
+            )
+        if last_response is not None:
+            GATEWAY_REQUESTS.labels(self.agent, str(last_response.status_code)).inc()
+            return Response(last_response.content, status_code=last_response.status_code, headers=self._response_headers(last_response, buffered=True))
+        raise WorkersUnavailable(f"No worker of the {self.agent} agent is reachable. Please retry later.")
+
+    def _failed(self, instance: _Instance, error) -> Response:
+        """
+        Answers a request whose worker failed after accepting it: 504 if it timed out, 502 otherwise.
+        """
+        import httpx
+
+        timed_out = isinstance(error, httpx.TimeoutException)
+        print(f"Warning: Worker {instance.url} of the {self.agent} agent failed: {error!r}")
+        GATEWAY_REQUESTS.labels(self.agent, "timeout" if timed_out else "failed").inc()
+        detail = f"The {self.agent} worker did not respond in time." if timed_out else f"The {self.agent} worker failed to answer."
+        return JSONResponse({"detail": detail}, status_code=504 if timed_out else 502)
+
+    @staticmethod
+    async def _read(upstream, instance: _Instance):
+        try:
+            await upstream.aread()
+        finally:
+            await WorkerPool._release(upstream, instance)
+        return upstream
+
+    @staticmethod
+    async def _stream(upstream, instance: _Instance):
+        # Releasing here rather than in a background task also covers streams that fail or are abandoned
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await WorkerPool._release(upstream, instance)
+
+    @staticmethod
+    async def _release(upstream, instance: _Instance):
+        # Counted down first: closing may be interrupted when the client has gone away
+        instance.in_flight -= 1
+        await upstream.aclose()
+
+    @staticmethod
+    def _response_headers(upstream, buffered: bool = False) -> dict:
+        # A buffered body has been decoded, so its length and encoding are set anew
+        dropped = _HOP_BY_HOP | ({"content-length", "content-encoding"} if buffered else set())
+        return {name: value for name, value in upstream.headers.items() if name.lower() not in dropped}
+
+    async def ready(self) -> dict:
+        """
+        Returns the /ready status code of every instance, or 'unreachable'.
+        """
+        async def check(instance):
+            try:
+                response = await instance.client.get("/ready", timeout=Config.GATEWAY_READY_TIMEOUT_SECONDS)
+            except Exception:
+                return "unreachable"
+            return response.status_code
+
+        statuses = await asyncio.gather(*(check(instance) for instance in self.instances))
+        return {instance.url: status for instance, status in zip(self.instances, statuses)}
+
+    async def close(self):
+        await asyncio.gather(*(instance.client.aclose() for instance in self.instances))
+
+
+def create_gateway_router(pool: WorkerPool) -> APIRouter:
+    """
+    Creates a router that forwards every path under the agent's prefix to its workers.
+    """
+    router = APIRouter()
+
+    @router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"], include_in_schema=False)
+    async def forward(path: str, request: Request):
+        try:
+            return await pool.forward(request, path)
+        except WorkersUnavailable as e:
+            return JSONResponse({"detail": str(e)}, status_code=503, headers={"Retry-After": str(Config.GATEWAY_RETRY_SECONDS)})
+
+    return router
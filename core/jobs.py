@@ -0,0 +1,351 @@
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
+
+from config import Config
+from .executor import ExecutorSaturated
+from .progress import GenerationCancelled, ProgressTracker
+from .schemas import JobResponse
+
+PENDING_STATES = ("queued", "running")
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+EVENT_POLL_INTERVAL = 0.25
+# How often a running job publishes its progress and checks for cancellations made through other workers
+PROGRESS_SYNC_INTERVAL = 1.0
+
+
+class JobStore:
+    """
+    Persists generation jobs in a local SQLite database so they survive a worker restart.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    agent TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    progress TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            # Stores created before progress was shared between workers
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "progress" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+            if "cancel_requested" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0")
+
+    @property
+    def _conn(self):
+        # A connection must not be shared with forked worker processes, so each process opens its own
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.row_factory = sqlite3.Row
+            self._pid = os.getpid()
+        return self._connection
+
+    def create(self, agent: str, request: dict) -> dict:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, agent, status, request, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, agent, json.dumps(request), now, now),
+            )
+        return self.get(job_id)
+
+    def update(self, job_id: str, status: str, result: dict = None, error: str = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+            )
+
+    def record_progress(self, job_id: str, progress: dict):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET progress = ? WHERE job_id = ?", (json.dumps(progress), job_id))
+
+    def request_cancel(self, job_id: str) -> bool:
+        """
+        Flags a pending job for cancellation by the worker running it. Returns whether the job was pending.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status IN (?, ?)", (job_id, *PENDING_STATES)
+            )
+        return cursor.rowcount == 1
+
+    def claim(self, job_id: str, updated_at: float) -> bool:
+        """
+        Requeues a pending job unless it changed since updated_at. Returns whether this call claimed it,
+        so only one of several workers resuming at the same time restarts the job.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE job_id = ? AND updated_at = ?",
+                (time.time(), job_id, updated_at),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def pending(self) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", PENDING_STATES
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+
+class JobManager:
+    """
+    Runs submitted requests in the background and records their progress in a JobStore.
+    Each agent registers the request schema and the logic coroutine that handles it.
+    Worker processes sharing the store see each other's jobs: running jobs publish their progress
+    there, and a job cancelled through another worker stops within PROGRESS_SYNC_INTERVAL.
+    """
+
+    def __init__(self, store: JobStore, retry_interval: float = 1.0):
+        self.store = store
+        self.retry_interval = retry_interval
+        self._agents = {}
+        self._tasks = set()
+        self._progress = {}
+
+    def register(self, agent: str, request_model, logic, artifact_field: str):
+        self._agents[agent] = (request_model, logic, artifact_field)
+
+    def submit(self, agent: str, request) -> dict:
+        job = self.store.create(agent, request.dict())
+        self._start(job["job_id"], agent, request)
+        return job
+
+    def get(self, agent: str, job_id: str):
+        job = self.store.get(job_id)
+        if job is None or job["agent"] != agent:
+            return None
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a pending job. A running generation stops at its next step boundary.
+        """
+        tracker = self._progress.get(job_id)
+        if tracker is None:
+            # Running in another worker process, or left pending by a stopped one
+            return self.store.request_cancel(job_id)
+        tracker.cancel()
+        return True
+
+    def progress(self, job_id: str):
+        """
+        Returns the progress of a job that is still pending, or None.
+        """
+        tracker = self._progress.get(job_id)
+        if tracker is not None:
+            return tracker.snapshot()
+        job = self.store.get(job_id)
+        return job["progress"] if job and job["status"] in PENDING_STATES else None
+
+    def artifact(self, job: dict):
+        _, _, artifact_field = self._agents[job["agent"]]
+        return (job["result"] or {}).get(artifact_field)
+
+    def resume(self, started_at: float = None) -> int:
+        """
+        Restarts the jobs that were queued or running when the previous worker stopped.
+        - **started_at**: When the server started. Only jobs last updated before then are resumed,
+          so a worker started next to others does not take over the jobs they are running.
+        """
+        resumed = 0
+        for job in self.store.pending():
+            if job["agent"] not in self._agents:
+                continue
+            if started_at and job["updated_at"] >= started_at:
+                continue
+            if not self.store.claim(job["job_id"], job["updated_at"]):
+                continue
+            if job["cancel_requested"]:
+                self.store.update(job["job_id"], "cancelled", error=str(GenerationCancelled("cancelled")))
+                continue
+            request_model, _, _ = self._agents[job["agent"]]
+            self._start(job["job_id"], job["agent"], request_model(**job["request"]))
+            resumed += 1
+        if resumed:
+            print(f"Resumed {resumed} pending job(s).")
+        return resumed
+
+    def _start(self, job_id: str, agent: str, request):
+        self._progress[job_id] = ProgressTracker(getattr(request, "deadline_seconds", None))
+        task = asyncio.get_running_loop().create_task(self._run(job_id, agent, request))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job_id: str, agent: str, request):
+        _, logic, _ = self._agents[agent]
+        tracker = self._progress[job_id]
+        sync = asyncio.get_running_loop().create_task(self._sync(job_id, tracker))
+        try:
+            while True:
+                try:
+                    tracker.check()
+                    self.store.update(job_id, "running")
+                    response = await logic(request, progress=tracker)
+                except ExecutorSaturated:
+                    # Jobs wait for capacity instead of failing like synchronous requests do
+                    self.store.update(job_id, "queued")
+                    await asyncio.sleep(self.retry_interval)
+                    continue
+                except GenerationCancelled as e:
+                    print(f"Job {job_id} {e.reason}.")
+                    self.store.update(job_id, "cancelled", error=str(e))
+                    return
+                except Exception as e:
+                    print(f"Job {job_id} failed: {e}")
+                    self.store.update(job_id, "failed", error=str(e))
+                    return
+                self.store.update(job_id, "succeeded", result=response.dict())
+                return
+        finally:
+            sync.cancel()
+            self._progress.pop(job_id, None)
+
+    async def _sync(self, job_id: str, tracker: ProgressTracker):
+        version = None
+        while not tracker.cancelled:
+            await asyncio.sleep(PROGRESS_SYNC_INTERVAL)
+            if tracker.version != version:
+                version = tracker.version
+                self.store.record_progress(job_id, tracker.snapshot())
+            job = self.store.get(job_id)
+            if job and job["cancel_requested"]:
+                tracker.cancel()
+
+
+job_manager = JobManager(JobStore(Config.JOB_STORE_PATH))
+
+
+def _validate_text(request):
+    if not request.text:
+        raise HTTPException(status_code=400, detail="Text cannot be empty.")
+
+
+def create_job_router(agent: str, request_model, logic, artifact_field: str, validate=_validate_text) -> APIRouter:
+    """
+    Creates the submit/status/result endpoints for an agent and registers it with the job manager.
+    - **validate**: Called with each submitted request; raises HTTPException to reject it.
+      Defaults to rejecting requests with empty text.
+    """
+    job_manager.register(agent, request_model, logic, artifact_field)
+    router = APIRouter()
+
+    @router.post("/jobs", response_model=JobResponse, status_code=202)
+    async def submit_job(request: request_model):
+        """
+        Queues a generation job and returns its id immediately.
+        """
+        validate(request)
+        return job_manager.submit(agent, request)
+
+    @router.get("/jobs/{job_id}", response_model=JobResponse)
+    async def get_job(job_id: str):
+        """
+        Reports the state of a job and, once it has succeeded, its result.
+        """
+        job = job_manager.get(agent, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found.")
+        return job
+
+    @router.post("/jobs/{job_id}/cancel", response_model=JobResponse)
+    async def cancel_job(job_id: str):
+        """
+        Cancels a queued or running job. Running generations stop at their next step boundary,
+        so the job may still report "running" briefly.
+        """
+        job = job_manager.get(agent, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found.")
+        if not job_manager.cancel(job_id):
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}.")
+        return job_manager.get(agent, job_id)
+
+    @router.get("/jobs/{job_id}/events")
+    async def job_events(job_id: str, http_request: Request):
+        """
+        Streams the progress of a job as server-sent events until it finishes.
+        Each event carries the job status and its current stage, step, total steps and ETA.
+        """
+        if job_manager.get(agent, job_id) is None:
+            raise HTTPException(status_code=404, detail="Job not found.")
+
+        async def events():
+            last = None
+            while True:
+                job = job_manager.get(agent, job_id)
+                event = {"job_id": job_id, "status": job["status"], "error": job["error"]}
+                event.update(job_manager.progress(job_id) or {})
+                # Timings change on every poll, so only emit when the job has moved on
+                key = (event["status"], event.get("stage"), event.get("step"), event.get("cancelled"))
+                if key != last:
+                    yield f"data: {json.dumps(event)}\n\n"
+                    last = key
+                if job["status"] in TERMINAL_STATES or await http_request.is_disconnected():
+                    return
+                await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    @router.get("/jobs/{job_id}/result")
+    async def get_job_result(job_id: str):
+        """
+        Downloads the file generated by a finished job.
+        """
+        job = job_manager.get(agent, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found.")
+        if job["status"] != "succeeded":
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}.")
+        artifact = job_manager.artifact(job)
+        if not artifact or not os.path.exists(artifact):
+            raise HTTPException(status_code=410, detail="The generated file is no longer available.")
+        return FileResponse(artifact)
+
+    return router
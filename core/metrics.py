@@ -0,0 +1,151 @@
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+# Set (by gunicorn.conf.py) when several worker processes serve one scrape target: every process
+# then writes its metrics to files in this directory and /metrics aggregates them
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+# How often each worker writes the current value of its function gauges in multiprocess mode
+GAUGE_SAMPLE_SECONDS = 1.0
+
+# Image and video sides are labeled by the nearest of these, so clients cannot create new series
+STANDARD_SIDES = (256, 512, 768, 1024, 1536, 2048)
+# How far, as a fraction, a side may be from its standard size and still be labeled with it
+SIDE_TOLERANCE = 0.125
+# Stages range from milliseconds (mixing, file writes) to minutes (video denoising)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+STAGE_SECONDS = Histogram(
+    "kalasetu_stage_duration_seconds",
+    "Time spent in each generation stage.",
+    ["agent", "stage", "resolution", "enhance", "ambience"],
+    buckets=STAGE_BUCKETS,
+)
+MODEL_LOAD_SECONDS = Histogram(
+    "kalasetu_model_load_seconds",
+    "Time spent loading a model into memory.",
+    ["model"],
+    buckets=STAGE_BUCKETS,
+)
+REQUESTS = Counter(
+    "kalasetu_requests_total",
+    "Generation attempts by outcome: cached, generated, cancelled, failed or rejected (agent at capacity).",
+    ["agent", "outcome"],
+)
+PROMPT_EMBEDDINGS = Counter(
+    "kalasetu_prompt_embeddings_total",
+    "Prompt embedding lookups by model and outcome: hit (served from the cache) or miss (encoded).",
+    ["model", "outcome"],
+)
+# Gauges are summed over the live worker processes in multiprocess mode
+QUEUE_DEPTH = Gauge("kalasetu_queue_depth", "Calls waiting for a free worker.", ["agent"], multiprocess_mode="livesum")
+IN_FLIGHT = Gauge("kalasetu_in_flight", "Calls running on a worker.", ["agent"], multiprocess_mode="livesum")
+BATCH_PENDING = Gauge("kalasetu_batch_pending", "Requests waiting in the batch scheduler for their batch to fill.", ["agent"], multiprocess_mode="livesum")
+SCHEDULER_COST = Gauge("kalasetu_scheduler_cost_seconds", "Estimated seconds of work waiting in and admitted by the fair scheduler.", ["state"], multiprocess_mode="livesum")
+SCHEDULER_WAIT_SECONDS = Histogram(
+    "kalasetu_scheduler_wait_seconds",
+    "Time requests wait in the fair scheduler before they start.",
+    ["agent"],
+    buckets=STAGE_BUCKETS,
+)
+GATEWAY_REQUESTS = Counter(
+    "kalasetu_gateway_requests_total",
+    "Requests the gateway forwarded to workers, by agent and response status (or 'unreachable', 'timeout', 'failed').",
+    ["agent", "outcome"],
+)
+WORKER_IN_FLIGHT = Gauge("kalasetu_worker_in_flight", "Requests the gateway is waiting on, by agent and worker.", ["agent", "worker"], multiprocess_mode="livesum")
+# Preloaded models are shared between workers, so the largest process is reported rather than the sum
+LOADED_MODEL_BYTES = Gauge("kalasetu_loaded_model_bytes", "Estimated size of the models held in memory.", multiprocess_mode="livemax")
+
+_sampled_gauges = []  # (gauge, function) pairs written by the sampler in multiprocess mode
+
+
+def gauge_function(gauge, function):
+    """
+    Reports function() as the value of a gauge (or labeled gauge child). A single process evaluates
+    it on every scrape; in multiprocess mode, where /metrics reads the values other processes wrote,
+    each worker's sampler thread writes it every GAUGE_SAMPLE_SECONDS (see start_gauge_sampler).
+    """
+    if MULTIPROCESS_DIR:
+        _sampled_gauges.append((gauge, function))
+    else:
+        gauge.set_function(function)
+
+
+def sample_gauges():
+    for gauge, function in list(_sampled_gauges):
+        gauge.set(function())
+
+
+def start_gauge_sampler():
+    """
+    Starts the thread writing this process's function gauges in multiprocess mode. Threads do not
+    survive a fork, so each worker starts its own after forking.
+    """
+    if not MULTIPROCESS_DIR:
+        return
+
+    def sample():
+        while True:
+            try:
+                sample_gauges()
+            except Exception as e:
+                print(f"Warning: Could not sample gauges: {e}")
+            time.sleep(GAUGE_SAMPLE_SECONDS)
+
+    threading.Thread(target=sample, name="gauge-sampler", daemon=True).start()
+
+
+def resolution_label(width: int, height: int) -> str:
+    """
+    Returns the 'WIDTHxHEIGHT' label of the standard size nearest to an image or video frame,
+    or 'other' when a side is not close to any standard size.
+    """
+    sides = []
+    for side in (width, height):
+        nearest = min(STANDARD_SIDES, key=lambda standard: abs(standard - side))
+        if abs(nearest - side) > nearest * SIDE_TOLERANCE:
+            return "other"
+        sides.append(nearest)
+    return f"{sides[0]}x{sides[1]}"
+
+
+def observe_stage(agent: str, stage: str, seconds: float, resolution: str = "", enhance=None, ambience: str = ""):
+    """
+    Records the duration of one stage of a generation.
+    - **resolution**: A resolution_label for image and video stages.
+    - **enhance**: Whether the request asked for upscaling, if the agent supports it.
+    - **ambience**: The ambience track of a voice request.
+    """
+    enhance = "" if enhance is None else str(bool(enhance)).lower()
+    STAGE_SECONDS.labels(agent, stage, resolution, enhance, ambience).observe(seconds)
+
+
+@contextmanager
+def stage_timer(agent: str, stage: str, **labels):
+    """
+    Times the enclosed block as a stage of a generation; see observe_stage for the labels.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(agent, stage, time.perf_counter() - start, **labels)
+
+
+def render_metrics():
+    """
+    Returns the metrics in the Prometheus text format, with its content type: those of this process,
+    or in multiprocess mode those of all worker processes combined.
+    """
+    if not MULTIPROCESS_DIR:
+        return generate_latest(), CONTENT_TYPE_LATEST
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
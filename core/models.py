@@ -0,0 +1,21 @@
+
+from .profiles import get_profile, prepare_pipeline
+from .registry import registry
+from .snapshot import load_pretrained, register_snapshot
+
+UPSCALER = "x4-upscaler"
+
+
+def _load_upscaler_weights(source, **kwargs):
+    from diffusers import StableDiffusionUpscalePipeline
+
+    return StableDiffusionUpscalePipeline.from_pretrained(source, torch_dtype=get_profile().torch_dtype, **kwargs)
+
+
+def _load_upscaler():
+    return prepare_pipeline(load_pretrained(UPSCALER))
+
+
+# The upscaler is shared between the graphics and video agents
+registry.register(UPSCALER, _load_upscaler)
+register_snapshot(UPSCALER, "stabilityai/stable-diffusion-x4-upscaler", _load_upscaler_weights)
@@ -0,0 +1,163 @@
+
+import os
+import threading
+from dataclasses import dataclass
+
+from config import Config
+
+_DTYPES = ("fp32", "bf16", "fp16")
+
+
+@dataclass
+class ExecutionProfile:
+    """
+    How models are placed and run on this host.
+    - **device**: 'cuda' or 'cpu'.
+    - **dtype**: Weight and activation precision: 'fp32', 'bf16' or 'fp16' (fp16 on GPU only).
+    - **intra_op_threads** / **inter_op_threads**: torch thread pool sizes.
+    - **attention_slicing**: Computes attention in slices to cap peak memory.
+    - **channels_last**: Uses the channels-last memory format for the 2D convolution models.
+    - **compile**: Wraps the denoising models with torch.compile.
+    - **quantize_bark**: Applies dynamic int8 quantization to Bark's linear layers (CPU, fp32 only).
+    """
+    device: str
+    dtype: str
+    intra_op_threads: int
+    inter_op_threads: int
+    attention_slicing: bool
+    channels_last: bool
+    compile: bool
+    quantize_bark: bool
+
+    @property
+    def torch_dtype(self):
+        import torch
+        return {"fp32": torch.float32, "bf16": torch.bfloat16, "fp16": torch.float16}[self.dtype]
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _has_native_bf16() -> bool:
+    import torch
+    try:
+        return torch.cpu._is_avx512_bf16_supported() or torch.cpu._is_amx_tile_supported()
+    except AttributeError:
+        return False
+
+
+def _flag(value: str, default: bool) -> bool:
+    if value == "auto":
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def default_profile() -> ExecutionProfile:
+    """
+    Picks a profile for the host: fp16 on GPU; on CPU, bf16 where the CPU supports it natively
+    and fp32 otherwise, with one intra-op thread per available core and int8 Bark.
+    """
+    import torch
+
+    if torch.cuda.is_available():
+        return ExecutionProfile("cuda", "fp16", _cpu_count(), 1, False, False, False, False)
+    dtype = "bf16" if _has_native_bf16() else "fp32"
+    return ExecutionProfile("cpu", dtype, _cpu_count(), 1, False, True, False, dtype == "fp32")
+
+
+def load_profile() -> ExecutionProfile:
+    """
+    Returns the default profile for the host with the overrides set in Config.
+    """
+    profile = default_profile()
+    if Config.EXECUTION_DTYPE != "auto":
+        if Config.EXECUTION_DTYPE not in _DTYPES:
+            raise ValueError(f"Unknown EXECUTION_DTYPE: {Config.EXECUTION_DTYPE}")
+        profile.dtype = Config.EXECUTION_DTYPE
+    if profile.device == "cpu" and profile.dtype == "fp16":
+        print("Warning: fp16 is not supported on CPU. Using fp32.")
+        profile.dtype = "fp32"
+    profile.intra_op_threads = Config.TORCH_INTRA_OP_THREADS or profile.intra_op_threads
+    profile.inter_op_threads = Config.TORCH_INTER_OP_THREADS or profile.inter_op_threads
+    profile.attention_slicing = _flag(Config.ATTENTION_SLICING, profile.attention_slicing)
+    profile.channels_last = _flag(Config.CHANNELS_LAST, profile.channels_last)
+    profile.compile = _flag(Config.TORCH_COMPILE, profile.compile)
+    profile.quantize_bark = _flag(Config.QUANTIZE_BARK, profile.quantize_bark) and profile.dtype == "fp32" and profile.device == "cpu"
+    return profile
+
+
+_profile = None
+_profile_lock = threading.Lock()
+
+
+def get_profile() -> ExecutionProfile:
+    """
+    Returns the process-wide profile, applying its thread settings the first time.
+    Unless TORCH_INTRA_OP_THREADS sets them, the intra-op threads are shared between the calls the
+    agents' executors may run at once: torch's thread pool is process-wide, so each concurrent call
+    running with every core would oversubscribe the CPU.
+    """
+    global _profile
+    with _profile_lock:
+        if _profile is None:
+            import torch
+
+            from .executor import concurrent_calls
+
+            _profile = load_profile()
+            if not Config.TORCH_INTRA_OP_THREADS:
+                _profile.intra_op_threads = max(_profile.intra_op_threads // max(concurrent_calls(), 1), 1)
+            torch.set_num_threads(_profile.intra_op_threads)
+            try:
+                torch.set_num_interop_threads(_profile.inter_op_threads)
+            except RuntimeError:
+                # Can only be set before the first parallel work has started
+                pass
+            print(f"Execution profile: {_profile}")
+        return _profile
+
+
+def prepare_pipeline(pipe, profile: ExecutionProfile = None):
+    """
+    Moves a diffusers pipeline to the profile's device and applies its optimizations.
+    """
+    import torch
+
+    profile = profile or get_profile()
+    pipe = pipe.to(profile.device)
+    if profile.attention_slicing:
+        pipe.enable_attention_slicing()
+    for name in ("unet", "vae"):
+        module = getattr(pipe, name, None)
+        if module is None:
+            continue
+        if profile.channels_last:
+            try:
+                module.to(memory_format=torch.channels_last)
+            except RuntimeError:
+                # 3D (video) models have 5D weights that channels_last does not apply to
+                pass
+    if profile.compile:
+        pipe.unet = torch.compile(pipe.unet)
+    return pipe
+
+
+def prepare_bark(model, profile: ExecutionProfile = None):
+    """
+    Moves Bark to the profile's device and precision, quantizing its linear layers if enabled.
+    """
+    import torch
+
+    profile = profile or get_profile()
+    model = model.to(profile.device, dtype=profile.torch_dtype)
+    if profile.quantize_bark:
+        for name in ("semantic", "coarse_acoustics", "fine_acoustics"):
+            submodel = getattr(model, name)
+            setattr(model, name, torch.ao.quantization.quantize_dynamic(submodel, {torch.nn.Linear}, dtype=torch.qint8))
+    if profile.compile:
+        model.codec_model = torch.compile(model.codec_model)
+    return model
@@ -0,0 +1,154 @@
+
+import asyncio
+import threading
+import time
+
+
+class GenerationCancelled(Exception):
+    """
+    Raised at a step boundary once a generation has been cancelled or has run past its deadline.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(f"Generation {reason}.")
+        self.reason = reason
+
+
+class ProgressTracker:
+    """
+    Follows a generation through its stages and steps, and carries its cancellation.
+    The engines call step() at every step boundary (diffusers callbacks use the adapters below),
+    which raises GenerationCancelled once cancel() was called or the deadline has passed.
+    """
+
+    def __init__(self, deadline_seconds: float = None):
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline_seconds if deadline_seconds else None
+        self.stage = None
+        self.step_count = 0
+        self.total_steps = None
+        self.version = 0
+        self._stage_started = self.started
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self.version += 1
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise GenerationCancelled("cancelled")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise GenerationCancelled("exceeded its deadline")
+
+    def begin_stage(self, stage: str, total_steps: int = None):
+        self.check()
+        self.stage = stage
+        self.step_count = 0
+        self.total_steps = total_steps
+        self._stage_started = time.monotonic()
+        self.version += 1
+
+    def step(self, step: int = None):
+        """
+        Records that a step finished (step is zero-based) and aborts if the generation was cancelled.
+        """
+        self.step_count = step + 1 if step is not None else self.step_count + 1
+        self.version += 1
+        self.check()
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        eta = None
+        if self.total_steps and self.step_count:
+            per_step = (now - self._stage_started) / self.step_count
+            eta = per_step * max(self.total_steps - self.step_count, 0)
+        return {
+            "stage": self.stage,
+            "step": self.step_count,
+            "total_steps": self.total_steps,
+            "elapsed_seconds": round(now - self.started, 3),
+            "eta_seconds": round(eta, 3) if eta is not None else None,
+            "cancelled": self.cancelled,
+        }
+
+    def on_step_end(self, pipe, step, timestep, callback_kwargs):
+        """
+        Adapter for the callback_on_step_end argument of newer diffusers pipelines.
+        """
+        self.step(step)
+        return callback_kwargs
+
+    def callback(self, step, timestep, latents):
+        """
+        Adapter for the legacy callback argument (text-to-video and upscaler pipelines).
+        """
+        self.step(step)
+
+
+class BatchProgress(ProgressTracker):
+    """
+    Drives the trackers of every request in a batch from one pipeline call.
+    The batch is only aborted once all of its requests are cancelled.
+    """
+
+    def __init__(self, trackers: list):
+        super().__init__()
+        self.trackers = [tracker for tracker in trackers if tracker is not None]
+
+    def check(self):
+        if self.trackers and all(_is_cancelled(tracker) for tracker in self.trackers):
+            self.trackers[0].check()
+
+    def begin_stage(self, stage: str, total_steps: int = None):
+        for tracker in self.trackers:
+            if not _is_cancelled(tracker):
+                tracker.begin_stage(stage, total_steps)
+        super().begin_stage(stage, total_steps)
+
+    def step(self, step: int = None):
+        for tracker in self.trackers:
+            tracker.step_count = step + 1 if step is not None else tracker.step_count + 1
+            tracker.version += 1
+        super().step(step)
+
+
+class BranchProgress(ProgressTracker):
+    """
+    Follows one branch of a larger generation (e.g. one stage of a campaign) with its own steps.
+    The branch stops when it is cancelled itself or when its parent is cancelled or times out.
+    """
+
+    def __init__(self, parent: ProgressTracker = None):
+        super().__init__()
+        self.parent = parent
+
+    def check(self):
+        if self.parent is not None:
+            self.parent.check()
+        super().check()
+
+
+def _is_cancelled(tracker: ProgressTracker) -> bool:
+    try:
+        tracker.check()
+    except GenerationCancelled:
+        return True
+    return False
+
+
+async def cancel_on_disconnect(http_request, tracker: ProgressTracker, awaitable, poll_interval: float = 0.5):
+    """
+    Awaits a generation and cancels it at the next step boundary if the client disconnects first.
+    """
+    task = asyncio.ensure_future(awaitable)
+    while not task.done():
+        await asyncio.wait([task], timeout=poll_interval)
+        if not task.done() and await http_request.is_disconnected():
+            print("Client disconnected. Cancelling generation.")
+            tracker.cancel()
+    return task.result()
@@ -0,0 +1,27 @@
+
+import threading
+import weakref
+
+# Request quality tiers, from the fastest preview to the slowest render
+QUALITY_TIERS = ("draft", "standard", "final")
+
+_fast_pipelines = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def with_fast_scheduler(pipe):
+    """
+    Returns a pipeline sharing pipe's models that samples with DPM-Solver++, which needs far
+    fewer steps than the default schedulers for a comparable image. Draft and final renders both
+    use it, so a final render with a draft's seed refines the same composition.
+    The pipeline is created once and dropped when pipe is evicted from the registry.
+    """
+    from diffusers import DPMSolverMultistepScheduler
+
+    with _lock:
+        fast = _fast_pipelines.get(pipe)
+        if fast is None:
+            scheduler = DPMSolverMultistepScheduler.from_config(pipe.scheduler.config)
+            fast = _fast_pipelines[pipe] = type(pipe).from_pipe(pipe, scheduler=scheduler)
+            fast.set_progress_bar_config(disable=True)
+        return fast
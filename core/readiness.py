@@ -0,0 +1,79 @@
+
+import time
+
+from config import Config
+from .registry import registry
+
+
+def warm_up_model(name: str, run) -> dict:
+    """
+    Loads a model and runs one small inference through run(model) so the first request
+    does not pay for lazy initialization. Returns how long each part took.
+    """
+    started = time.perf_counter()
+    model = registry.get(name)
+    loaded = time.perf_counter()
+    run(model)
+    return {"load_seconds": round(loaded - started, 3), "warmup_seconds": round(time.perf_counter() - loaded, 3)}
+
+
+class Readiness:
+    """
+    Tracks which models have been loaded and warmed up since startup.
+    Each model is warmed up on the executor of the agent that serves it, so process workers
+    warm their own copy.
+    """
+
+    def __init__(self):
+        self._models = {}  # name -> (executor, run)
+        self._status = {}
+
+    def register(self, name: str, executor, run):
+        """
+        - **run**: A module-level function taking the loaded model and running a minimal inference.
+        """
+        self._models[name] = (executor, run)
+        self._status[name] = {"status": "pending", "agent": executor.name}
+
+    def selected(self, setting: str = None) -> list:
+        setting = (setting if setting is not None else Config.WARMUP_MODELS).strip()
+        if setting == "all":
+            return list(self._models)
+        if setting in ("", "none"):
+            return []
+        names = [name.strip() for name in setting.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self._models]
+        if unknown:
+            print(f"Warning: Unknown models in WARMUP_MODELS: {', '.join(unknown)}.")
+        return [name for name in names if name in self._models]
+
+    async def warm_up(self, names: list = None):
+        """
+        Loads and warms up the models one at a time, so they do not compete for memory and cores.
+        A failure is recorded and keeps the replica unready rather than stopping the server.
+        """
+        names = self.selected() if names is None else names
+        for name in self._models:
+            if name not in names:
+                self._status[name]["status"] = "skipped"
+        for name in names:
+            executor, run = self._models[name]
+            self._status[name]["status"] = "warming"
+            try:
+                timings = await executor.run(warm_up_model, name, run)
+            except Exception as e:
+                print(f"Warning: Warm-up of model '{name}' failed: {e}")
+                self._status[name].update(status="failed", error=str(e))
+                continue
+            self._status[name].update(status="ready", **timings)
+            print(f"Model '{name}' is warm (loaded in {timings['load_seconds']:.1f}s, warmed up in {timings['warmup_seconds']:.1f}s).")
+
+    def report(self) -> dict:
+        """
+        Returns whether every selected model is warm, with the status of each model.
+        """
+        ready = all(status["status"] in ("ready", "skipped") for status in self._status.values())
+        return {"ready": ready, "models": {name: dict(status) for name, status in self._status.items()}}
+
+
+readiness = Readiness()
@@ -0,0 +1,114 @@
+
+import threading
+from collections import OrderedDict
+
+from config import Config
+from .metrics import LOADED_MODEL_BYTES, MODEL_LOAD_SECONDS, gauge_function
+
+
+def estimate_model_size(obj) -> int:
+    """
+    Estimates the resident size in bytes of a loaded model.
+    Handles torch modules, diffusers pipelines (through their components) and
+    tuples/lists of either, e.g. a (processor, model) pair.
+    """
+    if isinstance(obj, (tuple, list)):
+        return sum(estimate_model_size(item) for item in obj)
+    components = getattr(obj, "components", None)
+    if isinstance(components, dict):
+        return sum(estimate_model_size(component) for component in components.values())
+    if hasattr(obj, "parameters") and hasattr(obj, "buffers"):
+        size = 0
+        for tensor in list(obj.parameters()) + list(obj.buffers()):
+            size += tensor.numel() * tensor.element_size()
+        return size
+    return 0
+
+
+class ModelRegistry:
+    """
+    Loads models on first use and keeps them in least-recently-used order.
+    When the total estimated size of the loaded models exceeds the memory budget,
+    the least recently used models are dropped until the budget is met again.
+    The model that was just requested is never evicted.
+    """
+
+    def __init__(self, memory_budget_bytes: int = 0):
+        self.memory_budget_bytes = memory_budget_bytes  # 0 means unlimited
+        self._loaders = {}
+        self._models = OrderedDict()  # name -> (model, size in bytes)
+        self._lock = threading.RLock()
+        self._load_locks = {}
+
+    def register(self, name: str, loader, replace: bool = False):
+        """
+        Registers a zero-argument loader function under the given name.
+        """
+        with self._lock:
+            if name in self._loaders and not replace:
+                return
+            self._loaders[name] = loader
+            self._load_locks.setdefault(name, threading.Lock())
+            if replace:
+                self._models.pop(name, None)
+
+    def get(self, name: str):
+        """
+        Returns the model registered under the given name, loading it if needed.
+        """
+        with self._lock:
+            if name not in self._loaders:
+                raise KeyError(f"No model registered under '{name}'.")
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name][0]
+            load_lock = self._load_locks[name]
+
+        # Load outside the registry lock so other models stay available meanwhile.
+        with load_lock:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name][0]
+            print(f"Loading model '{name}'...")
+            with MODEL_LOAD_SECONDS.labels(name).time():
+                model = self._loaders[name]()
+            size = estimate_model_size(model)
+            with self._lock:
+                self._models[name] = (model, size)
+                self._evict(keep=name)
+            print(f"Loaded model '{name}' ({size / 2**20:.1f} MiB).")
+            return model
+
+    def evict(self, name: str) -> bool:
+        """
+        Drops a loaded model. Returns whether it was loaded.
+        """
+        with self._lock:
+            return self._models.pop(name, None) is not None
+
+    def loaded(self) -> list:
+        """
+        Returns the names of the loaded models, least recently used first.
+        """
+        with self._lock:
+            return list(self._models)
+
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    def _evict(self, keep: str):
+        if not self.memory_budget_bytes:
+            return
+        while self.memory_usage() > self.memory_budget_bytes:
+            victim = next((name for name in self._models if name != keep), None)
+            if victim is None:
+                print(f"Warning: Model '{keep}' alone exceeds the memory budget.")
+                return
+            print(f"Evicting model '{victim}' to stay within the memory budget.")
+            del self._models[victim]
+
+
+registry = ModelRegistry(memory_budget_bytes=Config.MODEL_MEMORY_BUDGET_MB * 2**20)
+gauge_function(LOADED_MODEL_BYTES, registry.memory_usage)
@@ -0,0 +1,174 @@
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+
+from config import Config
+from .executor import ExecutorSaturated
+from .metrics import SCHEDULER_COST, SCHEDULER_WAIT_SECONDS, gauge_function
+
+# Set per HTTP request from the X-Tenant-ID or X-Session-ID header (see app.py); background
+# jobs inherit the value of the request that submitted them
+current_tenant = contextvars.ContextVar("current_tenant", default="anonymous")
+
+
+class OverBudget(ExecutorSaturated):
+    """
+    Raised when the work already waiting leaves no room for a request's estimated cost.
+    """
+
+
+def parse_weights(setting: str) -> dict:
+    """
+    Parses 'agent=weight,...' into a dict, ignoring malformed entries.
+    """
+    weights = {}
+    for entry in setting.split(","):
+        name, _, value = entry.partition("=")
+        try:
+            weights[name.strip()] = float(value)
+        except ValueError:
+            if entry.strip():
+                print(f"Warning: Ignoring malformed scheduler weight '{entry.strip()}'.")
+    return {name: weight for name, weight in weights.items() if name and weight > 0}
+
+
+class _Ticket:
+    def __init__(self, agent: str, tenant: str, cost: float, charge: float, future):
+        self.agent = agent
+        self.tenant = tenant
+        self.cost = cost
+        self.charge = charge
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+
+class FairScheduler:
+    """
+    Orders generations of all agents by weighted fair queuing before they reach the executors.
+    Each request's cost is estimated from its fields, in seconds of work on a reference CPU, by the
+    estimator its agent registered. Every (agent, tenant) pair is a flow; the next request to start
+    is the waiting one with the smallest virtual finish time, so a flow's share of the work is
+    proportional to its agent's weight and short requests overtake long ones.
+    - **capacity**: Estimated seconds of work that may run at once. A request starts when its cost
+      fits in what is left; one request is charged at most half the capacity, so an expensive
+      request never takes all of it. 0 disables the scheduler.
+    - **max_backlog**: Estimated seconds of work that may be running or waiting. Requests that do not fit are
+      rejected with OverBudget (a 503 with Retry-After) rather than queued.
+    - **weights**: Relative share of each agent; agents not listed get 1.
+    """
+
+    def __init__(self, capacity: float, max_backlog: float, weights: dict = None):
+        self.capacity = capacity
+        self.max_backlog = max_backlog
+        self.weights = weights or {}
+        self._estimators = {}
+        self._queue = []  # (finish tag, sequence, ticket)
+        self._finish_tags = {}  # (agent, tenant) -> finish tag of the flow's last request
+        self._virtual_time = 0.0
+        self._sequence = itertools.count()
+        self.queued_cost = 0.0
+        self.running_cost = 0.0
+        self.running = 0
+        self._charged = 0.0  # Capacity held by the running requests
+        self.rejected = 0
+
+    def register(self, agent: str, estimate):
+        """
+        - **estimate**: A function taking the agent's request and returning its estimated cost.
+        """
+        self._estimators[agent] = estimate
+
+    def estimate(self, agent: str, request) -> float:
+        return max(float(self._estimators[agent](request)), 0.0)
+
+    async def run(self, agent: str, request, generate):
+        """
+        Waits for the request's turn, then returns await generate(request). Agents without an
+        estimator run immediately.
+        """
+        if not self.capacity or agent not in self._estimators:
+            return await generate(request)
+        cost = self.estimate(agent, request)
+        ticket = self._admit(agent, current_tenant.get(), cost)
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if not ticket.future.cancelled():
+                # Started just as the caller went away
+                self._finish(ticket)
+            else:
+                self.queued_cost -= ticket.cost
+                self._dispatch()
+            raise
+        SCHEDULER_WAIT_SECONDS.labels(agent).observe(time.perf_counter() - ticket.queued_at)
+        try:
+            return await generate(request)
+        finally:
+            self._finish(ticket)
+
+    def _admit(self, agent: str, tenant: str, cost: float) -> _Ticket:
+        outstanding = self.queued_cost + self.running_cost
+        if outstanding and outstanding + cost > self.max_backlog:
+            self.rejected += 1
+            raise OverBudget(f"The server has {outstanding:.0f}s of work outstanding; this {agent} request adds about {cost:.0f}s. Please retry later.")
+        flow = (agent, tenant)
+        start = max(self._virtual_time, self._finish_tags.get(flow, 0.0))
+        finish = start + cost / self.weights.get(agent, 1.0)
+        self._finish_tags[flow] = finish
+        ticket = _Ticket(agent, tenant, cost, min(cost, self.capacity / 2), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, (finish, next(self._sequence), ticket))
+        self.queued_cost += cost
+        self._dispatch()
+        return ticket
+
+    def _dispatch(self):
+        while self._queue:
+            finish, _, ticket = self._queue[0]
+            if ticket.future.done():
+                heapq.heappop(self._queue)
+                continue
+            if self.running and self._charged + ticket.charge > self.capacity:
+                return
+            heapq.heappop(self._queue)
+            self._virtual_time = max(self._virtual_time, finish - ticket.cost / self.weights.get(ticket.agent, 1.0))
+            self.queued_cost -= ticket.cost
+            self.running_cost += ticket.cost
+            self._charged += ticket.charge
+            self.running += 1
+            ticket.future.set_result(None)
+        # Flows that have fallen behind the virtual time start afresh on their next request
+        self._finish_tags = {flow: tag for flow, tag in self._finish_tags.items() if tag > self._virtual_time}
+
+    def _finish(self, ticket: _Ticket):
+        self.running_cost -= ticket.cost
+        self._charged -= ticket.charge
+        self.running -= 1
+        self._dispatch()
+
+    def stats(self) -> dict:
+        waiting = {}
+        for _, _, ticket in self._queue:
+            if not ticket.future.done():
+                waiting[ticket.agent] = waiting.get(ticket.agent, 0) + 1
+        return {
+            "capacity_seconds": self.capacity,
+            "max_backlog_seconds": self.max_backlog,
+            "running": self.running,
+            "running_cost_seconds": round(self.running_cost, 3),
+            "queued": waiting,
+            "queued_cost_seconds": round(self.queued_cost, 3),
+            "rejected": self.rejected,
+            "weights": self.weights,
+        }
+
+
+fair_scheduler = FairScheduler(
+    Config.SCHEDULER_CAPACITY_SECONDS,
+    Config.SCHEDULER_MAX_BACKLOG_SECONDS,
+    parse_weights(Config.SCHEDULER_WEIGHTS),
+)
+gauge_function(SCHEDULER_COST.labels("queued"), lambda: fair_scheduler.queued_cost)
+gauge_function(SCHEDULER_COST.labels("running"), lambda: fair_scheduler.running_cost)
@@ -0,0 +1,12 @@
+
+from pydantic import BaseModel
+from typing import Optional, Dict, Literal
+
+class JobResponse(BaseModel):
+    job_id: str
+    agent: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
@@ -0,0 +1,53 @@
+
+import gc
+
+from config import Config
+from .profiles import get_profile
+from .readiness import readiness
+from .registry import registry
+
+
+def preload_models(names: list = None) -> list:
+    """
+    Loads models in the current process before it forks its request workers, which then share
+    the weights copy-on-write instead of each loading a copy. Models that fail to load are left
+    to the workers, whose warm-up reports the failure on /ready.
+    - **names**: Defaults to the models selected by WARMUP_MODELS.
+    Returns the names of the loaded models.
+    """
+    loaded = []
+    for name in readiness.selected() if names is None else names:
+        try:
+            registry.get(name)
+        except Exception as e:
+            print(f"Warning: Could not preload model '{name}': {e}")
+            continue
+        loaded.append(name)
+    return loaded
+
+
+def freeze_heap():
+    """
+    Moves every object allocated so far into the permanent generation, so garbage collection in
+    the forked workers does not write to (and thereby copy) the pages holding the shared models.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def configure_worker(workers: int):
+    """
+    Splits the host's resources between its request workers: the profile's intra-op threads,
+    unless TORCH_INTRA_OP_THREADS sets them explicitly, and the fair scheduler's capacity and
+    backlog, which each worker process enforces on its own.
+    """
+    import torch
+
+    from .scheduling import fair_scheduler
+
+    profile = get_profile()
+    if not Config.TORCH_INTRA_OP_THREADS:
+        profile.intra_op_threads = max(profile.intra_op_threads // workers, 1)
+    torch.set_num_threads(profile.intra_op_threads)
+    fair_scheduler.capacity /= workers
+    fair_scheduler.max_backlog /= workers
@@ -0,0 +1,105 @@
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+from config import Config
+from .profiles import get_profile
+
+MANIFEST = "snapshot.json"
+
+# name -> (Hub repository, keyword arguments for the Hub, weight loader)
+_sources = {}
+
+
+def register_snapshot(name: str, repo_id: str, load_weights, **hub_kwargs):
+    """
+    Declares how a registry model's weights are loaded, so they can be snapshotted.
+    - **load_weights**: Called as load_weights(source, **kwargs) with either the Hub repository
+      and hub_kwargs or a snapshot directory. Returns the model (or a tuple of processor and model)
+      before any runtime preparation such as quantization or compilation.
+    """
+    _sources[name] = (repo_id, hub_kwargs, load_weights)
+
+
+def snapshot_path(name: str, directory: str = None):
+    """
+    Returns the snapshot directory of a model, or None if it has not been snapshotted.
+    """
+    directory = directory if directory is not None else Config.MODEL_SNAPSHOT_DIR
+    if not directory:
+        return None
+    path = os.path.join(directory, name)
+    return path if os.path.isfile(os.path.join(path, MANIFEST)) else None
+
+
+def load_pretrained(name: str):
+    """
+    Loads a model's weights from its snapshot when there is one, and from the Hub otherwise.
+    Snapshots hold safetensors files in the serving precision, which the loaders memory-map
+    instead of reading and converting the original checkpoint.
+    """
+    repo_id, hub_kwargs, load_weights = _sources[name]
+    path = snapshot_path(name)
+    if path is None:
+        return load_weights(repo_id, **hub_kwargs)
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest["dtype"] != get_profile().dtype:
+        print(f"Warning: Snapshot of '{name}' is {manifest['dtype']} but the profile uses {get_profile().dtype}. Converting on load.")
+    print(f"Loading '{name}' from snapshot {path}")
+    return load_weights(path)
+
+
+def save_snapshot(name: str, directory: str) -> str:
+    """
+    Downloads a model's weights from the Hub in the current profile's precision and saves them
+    as a snapshot in directory/name.
+    """
+    repo_id, hub_kwargs, load_weights = _sources[name]
+    weights = load_weights(repo_id, **hub_kwargs)
+    path = os.path.join(directory, name)
+    partial_path = path + ".partial"
+    shutil.rmtree(partial_path, ignore_errors=True)
+    # A processor and its model are saved side by side in the same directory
+    for component in weights if isinstance(weights, tuple) else (weights,):
+        component.save_pretrained(partial_path)
+    with open(os.path.join(partial_path, MANIFEST), "w") as f:
+        json.dump({"name": name, "source": repo_id, "dtype": get_profile().dtype, "created_at": time.time()}, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(partial_path, path)
+    return path
+
+
+def snapshot_names() -> list:
+    return list(_sources)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Saves the agents' models as local safetensors snapshots.")
+    parser.add_argument("--output", default=Config.MODEL_SNAPSHOT_DIR or "models", help="Snapshot directory (MODEL_SNAPSHOT_DIR at serving time).")
+    parser.add_argument("--models", nargs="+", help="Models to snapshot. Defaults to all of them.")
+    parser.add_argument("--force", action="store_true", help="Replace existing snapshots.")
+    args = parser.parse_args(argv)
+
+    # Importing the app registers every agent's models
+    import app  # noqa: F401
+
+    os.makedirs(args.output, exist_ok=True)
+    for name in args.models or snapshot_names():
+        if name not in _sources:
+            parser.error(f"Unknown model: {name}. Choose from {', '.join(snapshot_names())}.")
+        if snapshot_path(name, args.output) and not args.force:
+            print(f"Snapshot of '{name}' already exists. Skipping.")
+            continue
+        started = time.perf_counter()
+        path = save_snapshot(name, args.output)
+        print(f"Saved snapshot of '{name}' to {path} in {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    # Run the imported module's main so the agents register with the same module instance
+    from core.snapshot import main as snapshot_main
+    snapshot_main()
@@ -0,0 +1,135 @@
+
+import numpy as np
+from PIL import Image
+
+from config import Config
+from .embeddings import prompt_embedding_cache
+from .models import UPSCALER
+
+SCALE = 4
+# Rough seconds of CPU work per input pixel at the upscaler's default 75 steps, whose latents have
+# the input's full resolution; used for the fair scheduler's cost estimates
+SECONDS_PER_PIXEL = 4e-3
+
+
+def tile_positions(size: int, tile: int, overlap: int) -> list:
+    """
+    Returns the start offsets of tiles of the given size that cover [0, size) with at least
+    the given overlap. The last tile is shifted back so every tile lies fully inside.
+    """
+    if size <= tile:
+        return [0]
+    stride = max(tile - overlap, 1)
+    positions = list(range(0, size - tile, stride))
+    positions.append(size - tile)
+    return positions
+
+
+def feather_weights(height: int, width: int, ramp: int) -> np.ndarray:
+    """
+    Returns per-pixel blending weights for one tile that fall off linearly over ramp pixels at each edge.
+    Weights stay above zero so pixels covered by a single tile keep their value after normalization.
+    """
+    def axis(length):
+        weights = np.ones(length, dtype=np.float32)
+        n = min(ramp, length // 2)
+        if n:
+            edge = np.linspace(1.0 / (n + 1), 1.0, n, dtype=np.float32)
+            weights[:n] = edge
+            weights[length - n:] = edge[::-1]
+        return weights
+    return np.outer(axis(height), axis(width))[..., None]
+
+
+def estimate_upscale_seconds(width: int, height: int, frames: int = 1) -> float:
+    """
+    Estimates the work of upscaling frames of the given size, counting the overlap between tiles.
+    """
+    tile_h, tile_w = min(Config.UPSCALE_TILE_SIZE, height), min(Config.UPSCALE_TILE_SIZE, width)
+    tiles = len(tile_positions(height, tile_h, Config.UPSCALE_TILE_OVERLAP)) * len(tile_positions(width, tile_w, Config.UPSCALE_TILE_OVERLAP))
+    return frames * tiles * tile_h * tile_w * SECONDS_PER_PIXEL
+
+
+def upscale_frames(upscaler, frames, prompt: str, negative_prompt: str = None, seed: int = 0, tile_size: int = None, overlap: int = None, batch_size: int = None, progress=None):
+    """
+    Upscales frames 4x with the Stable Diffusion x4 upscaler and yields them in order as uint8 arrays.
+    The prompt is encoded once for all frames, or taken from the prompt embedding cache. Each frame is cut into overlapping tiles so peak memory
+    depends on the tile size rather than the resolution; tiles from consecutive frames are upscaled
+    together in batches and the seams are blended with feathered weights.
+    - **progress**: Optional ProgressTracker; the "upscale" stage counts tile batches.
+    """
+    import torch
+
+    tile_size = tile_size or Config.UPSCALE_TILE_SIZE
+    overlap = overlap if overlap is not None else Config.UPSCALE_TILE_OVERLAP
+    batch_size = batch_size or Config.UPSCALE_BATCH_SIZE
+
+    prompt_embeds, negative_prompt_embeds = prompt_embedding_cache.encode(UPSCALER, upscaler, [prompt, negative_prompt or ""]).chunk(2)
+    generator = torch.Generator("cpu").manual_seed(seed)
+
+    canvases = {}
+    pending_tiles = []
+    next_frame = 0
+
+    def run_batch(tiles):
+        count = len(tiles)
+        output = upscaler(
+            image=[Image.fromarray(tile) for _, _, _, tile in tiles],
+            prompt_embeds=prompt_embeds.repeat(count, 1, 1),
+            negative_prompt_embeds=negative_prompt_embeds.repeat(count, 1, 1),
+            generator=generator,
+            output_type="np",
+            callback=(lambda step, timestep, latents: progress.check()) if progress else None,
+        ).images
+        if progress:
+            progress.step()
+        for (index, y, x, tile), upscaled in zip(tiles, output):
+            canvas, weight_sum, remaining = canvases[index]
+            h, w = upscaled.shape[:2]
+            weights = feather_weights(h, w, overlap * SCALE)
+            canvas[y * SCALE:y * SCALE + h, x * SCALE:x * SCALE + w] += upscaled * weights
+            weight_sum[y * SCALE:y * SCALE + h, x * SCALE:x * SCALE + w] += weights
+            canvases[index] = (canvas, weight_sum, remaining - 1)
+
+    def finished_frames():
+        nonlocal next_frame
+        while next_frame in canvases and canvases[next_frame][2] == 0:
+            canvas, weight_sum, _ = canvases.pop(next_frame)
+            next_frame += 1
+            yield (np.clip(canvas / weight_sum, 0.0, 1.0) * 255).round().astype(np.uint8)
+
+    for index, frame in enumerate(frames):
+        frame = np.asarray(frame)
+        if frame.dtype != np.uint8:
+            frame = (np.clip(frame, 0.0, 1.0) * 255).round().astype(np.uint8)
+        height, width = frame.shape[:2]
+        tile_h, tile_w = min(tile_size, height), min(tile_size, width)
+        tiles = [
+            (index, y, x, frame[y:y + tile_h, x:x + tile_w, :3])
+            for y in tile_positions(height, tile_h, overlap)
+            for x in tile_positions(width, tile_w, overlap)
+        ]
+        if index == 0 and progress:
+            total = -(-len(frames) * len(tiles) // batch_size) if hasattr(frames, "__len__") else None
+            progress.begin_stage("upscale", total)
+        canvases[index] = (
+            np.zeros((height * SCALE, width * SCALE, 3), dtype=np.float32),
+            np.zeros((height * SCALE, width * SCALE, 1), dtype=np.float32),
+            len(tiles),
+        )
+        pending_tiles.extend(tiles)
+        while len(pending_tiles) >= batch_size:
+            run_batch(pending_tiles[:batch_size])
+            pending_tiles = pending_tiles[batch_size:]
+            yield from finished_frames()
+
+    if pending_tiles:
+        run_batch(pending_tiles)
+    yield from finished_frames()
+
+
+def upscale_image(upscaler, image: Image.Image, prompt: str, negative_prompt: str = None, seed: int = 0, progress=None) -> Image.Image:
+    """
+    Upscales a single image 4x through the tiled upscaler.
+    """
+    return Image.fromarray(next(upscale_frames(upscaler, [image], prompt, negative_prompt=negative_prompt, seed=seed, progress=progress)))
@@ -1,53 +1,193 @@
 
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import time
+
 import torch
 from datasets import load_dataset
 from transformers import AutoTokenizer, AutoModelForCausalLM
 from peft import PeftModel
-import pandas as pd
 
-def evaluate_model(model_path, dataset_name, output_file):
+FIELDNAMES = ["index", "input_text", "generated_text", "label"]
+
+
+def shard_path(output_file: str, shard_index: int, num_shards: int) -> str:
+    root, ext = os.path.splitext(output_file)
+    return f"{root}.shard-{shard_index:03d}-of-{num_shards:03d}{ext or '.csv'}"
+
+
+def shard_indices(num_rows: int, shard_index: int, num_shards: int) -> list:
     """
-    Evaluates a fine-tuned model on a given dataset and logs the results.
-    - **model_path**: The path to the fine-tuned model.
-    - **dataset_name**: The name of the dataset to use for evaluation.
-    - **output_file**: The file to save the evaluation results.
+    Returns the dataset rows of one contiguous shard.
     """
-    # Load dataset
-    dataset = load_dataset(dataset_name, split="test")
+    size, extra = divmod(num_rows, num_shards)
+    start = shard_index * size + min(shard_index, extra)
+    return list(range(start, start + size + (shard_index < extra)))
+
+
+def length_buckets(indices: list, lengths: list, batch_size: int) -> list:
+    """
+    Groups rows into batches of similar token length so little compute is spent on padding.
+    Batches are returned longest first, so an out-of-memory error shows up on the first batch.
+    """
+    ordered = [index for _, index in sorted(zip(lengths, indices), reverse=True)]
+    return [ordered[start:start + batch_size] for start in range(0, len(ordered), batch_size)]
+
+
+def completed_indices(path: str) -> set:
+    """
+    Returns the dataset rows already recorded in a results file.
+    A row torn by a crash mid-write is dropped from the file so the batch is evaluated again.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline="", encoding="utf-8") as f:
+        content = f.read()
+    rows = list(csv.DictReader(io.StringIO(content)))
+    if content and not content.endswith("\n"):
+        rows = rows[:-1]
+        _write_rows(path, rows, mode="w")
+    return {int(row["index"]) for row in rows}
+
+
+def _write_rows(path: str, rows: list, mode: str = "a"):
+    # Each batch is written and flushed in one call so a crash loses at most the batch in progress
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDNAMES)
+    if mode == "w" or not os.path.exists(path) or os.path.getsize(path) == 0:
+        writer.writeheader()
+    writer.writerows(rows)
+    with open(path, mode, newline="", encoding="utf-8") as f:
+        f.write(buffer.getvalue())
+        f.flush()
+        os.fsync(f.fileno())
+
 
-    # Load tokenizer and model
+def load_model(model_path: str, adapter_path: str = None):
     tokenizer = AutoTokenizer.from_pretrained(model_path)
+    # Decoder-only models continue from the last position, so prompts are padded on the left
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
     model = AutoModelForCausalLM.from_pretrained(model_path)
 
-    # If using PEFT, load the PeftModel
-    # model = PeftModel.from_pretrained(model, model_path)
+    # If using PEFT, load the adapter on top of the base model
+    if adapter_path:
+        model = PeftModel.from_pretrained(model, adapter_path)
+    return tokenizer, model.eval()
 
-    results = []
-    for entry in dataset:
-        # This is a simplified example. A real evaluation would be more complex.
-        inputs = tokenizer(entry['text'], return_tensors="pt")
+
+def evaluate_shard(model_path, dataset_name, output_file, shard_index=0, num_shards=1, batch_size=8, max_new_tokens=None, adapter_path=None, num_threads=None):
+    """
+    Evaluates one shard of the test split, appending each finished batch to the shard's CSV file.
+    Rows already in the file are skipped, so an interrupted run resumes where it stopped.
+    Returns the path of the shard's results.
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    path = shard_path(output_file, shard_index, num_shards) if num_shards > 1 else output_file
+    dataset = load_dataset(dataset_name, split="test")
+    done = completed_indices(path)
+    indices = [index for index in shard_indices(len(dataset), shard_index, num_shards) if index not in done]
+    if not indices:
+        print(f"Shard {shard_index}: nothing left to evaluate.")
+        return path
+    if done:
+        print(f"Shard {shard_index}: resuming after {len(done)} completed rows.")
+
+    tokenizer, model = load_model(model_path, adapter_path)
+    shard = dataset.select(indices)
+    texts = dict(zip(indices, list(shard["text"])))
+    labels = dict(zip(indices, list(shard["label"])))
+    lengths = [len(ids) for ids in tokenizer([texts[index] for index in indices])["input_ids"]]
+    batches = length_buckets(indices, lengths, batch_size)
+
+    generate_kwargs = {"pad_token_id": tokenizer.pad_token_id}
+    if max_new_tokens:
+        generate_kwargs["max_new_tokens"] = max_new_tokens
+
+    started = time.perf_counter()
+    evaluated = 0
+    for number, batch in enumerate(batches, start=1):
+        batch_started = time.perf_counter()
+        inputs = tokenizer([texts[index] for index in batch], return_tensors="pt", padding=True)
         with torch.no_grad():
-            outputs = model.generate(**inputs)
-        generated_text = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        
-        results.append({
-            "input_text": entry['text'],
-            "generated_text": generated_text,
-            "label": entry['label']
-        })
-
-    # Save results to a CSV file
-    df = pd.DataFrame(results)
-    df.to_csv(output_file, index=False)
+            outputs = model.generate(**inputs, **generate_kwargs)
+        generated_texts = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        _write_rows(path, [
+            {"index": index, "input_text": texts[index], "generated_text": generated_text, "label": labels[index]}
+            for index, generated_text in zip(batch, generated_texts)
+        ])
+
+        evaluated += len(batch)
+        elapsed = time.perf_counter() - batch_started
+        new_tokens = (outputs.shape[1] - inputs["input_ids"].shape[1]) * len(batch)
+        print(
+            f"Shard {shard_index}: batch {number}/{len(batches)}, {len(batch)} examples in {elapsed:.2f}s "
+            f"({len(batch) / elapsed:.2f} examples/s, {new_tokens / elapsed:.1f} tokens/s, "
+            f"{evaluated / (time.perf_counter() - started):.2f} examples/s overall)"
+        )
+    return path
+
+
+def merge_shards(paths: list, output_file: str):
+    """
+    Combines the shard results into one CSV in dataset order.
+    """
+    rows = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows.extend(csv.DictReader(f))
+    rows.sort(key=lambda row: int(row["index"]))
+    _write_rows(output_file, rows, mode="w")
+
+
+def evaluate_model(model_path, dataset_name, output_file, batch_size=8, num_shards=1, max_new_tokens=None, adapter_path=None):
+    """
+    Evaluates a fine-tuned model on a given dataset and logs the results.
+    - **model_path**: The path to the fine-tuned model.
+    - **dataset_name**: The name of the dataset to use for evaluation.
+    - **output_file**: The file to save the evaluation results.
+    - **batch_size**: How many examples of similar length are generated together.
+    - **num_shards**: How many processes split the dataset. The available cores are divided between them.
+    - **max_new_tokens**: Caps the generated length. Defaults to the model's generation config.
+    - **adapter_path**: A PEFT adapter to load on top of the model.
+    Results are appended to disk after every batch; rerunning the same command resumes an interrupted run.
+    """
+    if num_shards <= 1:
+        evaluate_shard(model_path, dataset_name, output_file, batch_size=batch_size, max_new_tokens=max_new_tokens, adapter_path=adapter_path)
+    else:
+        num_threads = max((os.cpu_count() or 1) // num_shards, 1)
+        arguments = [
+            (model_path, dataset_name, output_file, shard_index, num_shards, batch_size, max_new_tokens, adapter_path, num_threads)
+            for shard_index in range(num_shards)
+        ]
+        # Spawn rather than fork so each worker starts with fresh torch thread pools
+        with multiprocessing.get_context("spawn").Pool(num_shards) as pool:
+            paths = pool.starmap(evaluate_shard, arguments)
+        merge_shards(paths, output_file)
     print(f"Evaluation results saved to {output_file}")
 
+
 if __name__ == '__main__':
-    # Example of how to test this module directly
-    # This is a placeholder and will not run without a proper environment and data
-    print("Testing model evaluation...")
-    # evaluate_model(
-    #     model_path="./fine-tuned-model",
-    -    # dataset_name="imdb",
-    #     output_file="./evaluation_results.csv"
-    # )
-    print("Evaluation script is set up.")
+    parser = argparse.ArgumentParser(description="Evaluates a fine-tuned model on the test split of a dataset.")
+    parser.add_argument("--model-path", default="./fine-tuned-model")
+    parser.add_argument("--dataset-name", default="imdb")
+    parser.add_argument("--output-file", default="./evaluation_results.csv")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--num-shards", type=int, default=1)
+    parser.add_argument("--max-new-tokens", type=int)
+    parser.add_argument("--adapter-path")
+    args = parser.parse_args()
+    evaluate_model(
+        model_path=args.model_path,
+        dataset_name=args.dataset_name,
+        output_file=args.output_file,
+        batch_size=args.batch_size,
+        num_shards=args.num_shards,
+        max_new_tokens=args.max_new_tokens,
+        adapter_path=args.adapter_path,
+    )
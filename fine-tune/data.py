@@ -0,0 +1,165 @@
+
+import hashlib
+import json
+import os
+import shutil
+
+import pyarrow.compute as pc
+import torch
+from datasets import load_dataset, load_from_disk
+
+# Bump when the layout of the packed records changes, so stale caches are not reused
+PACKING_VERSION = 1
+IGNORE_INDEX = -100
+
+
+def tokenizer_fingerprint(tokenizer) -> str:
+    """
+    Identifies a tokenizer by its vocabulary and special tokens rather than by its name.
+    """
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        definition = backend.to_str()
+    else:
+        definition = json.dumps(tokenizer.get_vocab(), sort_keys=True)
+    payload = json.dumps({
+        "name": tokenizer.name_or_path,
+        "definition": hashlib.sha256(definition.encode("utf-8")).hexdigest(),
+        "special_tokens": tokenizer.special_tokens_map,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_key(dataset, tokenizer, max_seq_length: int, text_field: str) -> str:
+    payload = json.dumps({
+        "dataset": dataset._fingerprint,
+        "tokenizer": tokenizer_fingerprint(tokenizer),
+        "max_seq_length": max_seq_length,
+        "text_field": text_field,
+        "version": PACKING_VERSION,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def pack_examples(sequences: list, max_seq_length: int) -> list:
+    """
+    Packs token sequences into as few rows of at most max_seq_length tokens as possible
+    (first fit, longest first). Examples are never split; longer ones are truncated.
+    Returns the packed rows as lists of sequences.
+    """
+    rows, free = [], []
+    for sequence in sorted((sequence[:max_seq_length] for sequence in sequences), key=len, reverse=True):
+        for index, space in enumerate(free):
+            if len(sequence) <= space:
+                rows[index].append(sequence)
+                free[index] -= len(sequence)
+                break
+        else:
+            rows.append([sequence])
+            free.append(max_seq_length - len(sequence))
+    return rows
+
+
+def _tokenize(batch, tokenizer, text_field):
+    # Every example ends with EOS so the model learns where documents stop
+    encoded = tokenizer(batch[text_field], add_special_tokens=True)
+    return {"input_ids": [ids + [tokenizer.eos_token_id] for ids in encoded["input_ids"]]}
+
+
+def _pack(batch, max_seq_length):
+    packed = {"input_ids": [], "labels": [], "position_ids": []}
+    for row in pack_examples(batch["input_ids"], max_seq_length):
+        input_ids, labels, position_ids = [], [], []
+        for sequence in row:
+            input_ids.extend(sequence)
+            # The first token of an example is not predicted from the previous example
+            labels.extend([IGNORE_INDEX] + sequence[1:])
+            # Positions restart at every example, which also marks where each example begins
+            position_ids.extend(range(len(sequence)))
+        packed["input_ids"].append(input_ids)
+        packed["labels"].append(labels)
+        packed["position_ids"].append(position_ids)
+    return packed
+
+
+def prepare_dataset(dataset_name, tokenizer, max_seq_length: int, cache_dir: str = "./data-cache", text_field: str = "text", split: str = "train", num_proc: int = None):
+    """
+    Tokenizes and packs a dataset split once and caches it on disk, keyed by the dataset version,
+    the tokenizer and the packing settings. Later calls with the same inputs memory-map the cache
+    instead of tokenizing again.
+    - **max_seq_length**: Length of the packed rows. Examples are packed whole until a row is full.
+    - **num_proc**: Processes used for tokenizing and packing. Defaults to one per CPU.
+    Each row has input_ids, labels (ignored at example boundaries) and position_ids that restart at
+    every example; PackedCollator turns the restarts into an attention mask that keeps examples apart.
+    """
+    dataset = load_dataset(dataset_name, split=split)
+    path = os.path.join(cache_dir, cache_key(dataset, tokenizer, max_seq_length, text_field))
+    if os.path.isdir(path):
+        print(f"Loading packed dataset from {path}")
+        return load_from_disk(path)
+
+    num_proc = num_proc or os.cpu_count() or 1
+    tokenized = dataset.map(
+        _tokenize,
+        batched=True,
+        num_proc=num_proc,
+        remove_columns=dataset.column_names,
+        fn_kwargs={"tokenizer": tokenizer, "text_field": text_field},
+        desc="Tokenizing",
+    )
+    packed = tokenized.map(
+        _pack,
+        batched=True,
+        batch_size=1000,
+        num_proc=num_proc,
+        remove_columns=tokenized.column_names,
+        fn_kwargs={"max_seq_length": max_seq_length},
+        desc="Packing",
+    )
+
+    # Write to a temporary directory first so an interrupted run never leaves a partial cache behind
+    partial_path = path + ".partial"
+    shutil.rmtree(partial_path, ignore_errors=True)
+    packed.save_to_disk(partial_path)
+    os.replace(partial_path, path)
+    packed = load_from_disk(path)
+    tokens = pc.sum(pc.list_value_length(packed.data.column("input_ids"))).as_py()
+    print(f"Packed {len(dataset)} examples into {len(packed)} rows ({tokens / (len(packed) * max_seq_length):.0%} full) at {path}")
+    return packed
+
+
+def packed_attention_mask(position_ids: torch.Tensor) -> torch.Tensor:
+    """
+    Returns the block-diagonal causal mask of packed rows, shaped (batch, 1, length, length):
+    a token attends to the earlier tokens of its own example only. Examples start where the
+    position ids restart at 0. True marks allowed positions, as scaled_dot_product_attention expects.
+    """
+    length = position_ids.shape[1]
+    segments = (position_ids == 0).cumsum(dim=1)
+    same_example = segments[:, :, None] == segments[:, None, :]
+    causal = torch.ones(length, length, dtype=torch.bool).tril()
+    return (same_example & causal)[:, None]
+
+
+class PackedCollator:
+    """
+    Pads packed rows to the longest row in the batch, and adds the 4D attention mask that keeps
+    packed examples from attending to each other (see packed_attention_mask). Padding is ignored
+    by the loss and forms an example of its own, so it never attends to or from real tokens.
+    The mask is used as given by the sdpa attention implementation.
+    """
+
+    def __init__(self, pad_token_id: int):
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, features: list) -> dict:
+        length = max(len(feature["input_ids"]) for feature in features)
+        batch = {"input_ids": [], "labels": [], "position_ids": []}
+        for feature in features:
+            padding = length - len(feature["input_ids"])
+            batch["input_ids"].append(list(feature["input_ids"]) + [self.pad_token_id] * padding)
+            batch["labels"].append(list(feature["labels"]) + [IGNORE_INDEX] * padding)
+            batch["position_ids"].append(list(feature["position_ids"]) + list(range(padding)))
+        batch = {name: torch.tensor(values, dtype=torch.long) for name, values in batch.items()}
+        batch["attention_mask"] = packed_attention_mask(batch["position_ids"])
+        return batch
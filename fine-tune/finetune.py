@@ -1,27 +1,35 @@
 
 import torch
-from datasets import load_dataset
 from transformers import AutoTokenizer, AutoModelForCausalLM, TrainingArguments, Trainer
 from peft import LoraConfig, get_peft_model
 from unsloth import FastLanguageModel
 
-def finetune_model(model_name, dataset_name, output_dir):
+from data import PackedCollator, prepare_dataset
+
+MAX_SEQ_LENGTH = 2048
+
+def finetune_model(model_name, dataset_name, output_dir, data_cache_dir="./data-cache", num_proc=None):
     """
     Fine-tunes a model on a given dataset using PEFT and Unsloth.
     - **model_name**: The name of the model to fine-tune.
     - **dataset_name**: The name of the dataset to use for fine-tuning.
     - **output_dir**: The directory to save the fine-tuned model.
+    - **data_cache_dir**: Where the tokenized, packed dataset is cached between runs.
+    - **num_proc**: Processes used to tokenize and pack the dataset. Defaults to one per CPU.
     """
-    # Load dataset
-    dataset = load_dataset(dataset_name, split="train")
-
     # Load tokenizer and model with Unsloth
     model, tokenizer = FastLanguageModel.from_pretrained(
         model_name,
-        max_seq_length=2048,
+        max_seq_length=MAX_SEQ_LENGTH,
         dtype=None,
         load_in_4bit=True,
+        # Packed examples are kept apart by the collator's 4D block-diagonal mask, which sdpa applies as given
+        attn_implementation="sdpa",
     )
+    model.config.use_cache = False
+
+    # Tokenize and pack the dataset into full-length rows, or load it from the cache of an earlier run
+    dataset = prepare_dataset(dataset_name, tokenizer, MAX_SEQ_LENGTH, cache_dir=data_cache_dir, num_proc=num_proc)
 
     # Configure PEFT with LoRA
     config = LoraConfig(
@@ -49,6 +57,8 @@ def finetune_model(model_name, dataset_name, output_dir):
         weight_decay=0.01,
         lr_scheduler_type="linear",
         seed=42,
+        # The packed rows carry position_ids, which must reach the model along with the attention mask
+        remove_unused_columns=False,
     )
 
     # Create Trainer
@@ -56,6 +66,7 @@ def finetune_model(model_name, dataset_name, output_dir):
         model=model,
         args=training_args,
         train_dataset=dataset,
+        data_collator=PackedCollator(tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id),
         tokenizer=tokenizer,
     )
 
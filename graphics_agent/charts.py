@@ -0,0 +1,519 @@
+
+import functools
+import math
+import re
+from base64 import b64encode
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont, ImageOps
+
+# chart_type values drawn by the chart engine instead of diffusion, by layout
+CHART_KINDS = {
+    "bar_chart": "bar",
+    "bar": "bar",
+    "line_chart": "line",
+    "line": "line",
+    "pie_chart": "pie",
+    "pie": "pie",
+    "infographic": "infographic",
+}
+# How much of a diffusion backdrop shows through the chart's background colour
+BACKDROP_OPACITY = 0.45
+# PNGs are drawn at this multiple of their size and downsampled, which anti-aliases the shapes
+SUPERSAMPLING = 2
+
+_PLAYFUL_TONES = {"playful", "fun", "friendly", "cheerful", "energetic", "vibrant", "whimsical"}
+_FORMAL_TONES = {"formal", "professional", "corporate", "serious", "academic", "technical"}
+
+
+@dataclass
+class Theme:
+    """
+    Colours and shapes of a chart.
+    - **palette**: Series and slice colours, in order.
+    - **outline**: Width of the dark outline around bars, slices and tiles (0 for none).
+    - **radius**: Corner radius of bars and tiles, as a fraction of their width.
+    """
+    background: str
+    foreground: str
+    grid: str
+    palette: List[str]
+    outline: int
+    radius: float
+
+    def colors(self, count: int) -> List[str]:
+        """
+        Returns count colours, extending the palette with lighter shades of it when it is too short.
+        """
+        return [_mix(self.palette[index % len(self.palette)], self.background, min(0.3 * (index // len(self.palette)), 0.7)) for index in range(count)]
+
+
+# One theme per style_preset; color_scheme and tone adjust it (see chart_theme)
+STYLE_THEMES = {
+    "photorealistic": Theme("#ffffff", "#1f2933", "#e4e7eb", ["#2563eb", "#f59e0b", "#10b981", "#ef4444", "#8b5cf6", "#14b8a6", "#f97316", "#64748b"], 0, 0.05),
+    "anime": Theme("#fff7fb", "#3a2a4a", "#f3dde9", ["#ff6fae", "#7ec8ff", "#ffd166", "#9b5de5", "#00c2a8", "#ff9f68"], 2, 0.3),
+    "impressionism": Theme("#f6f1e7", "#4a4238", "#e4dccb", ["#7b9acc", "#e6a57e", "#9cbf8f", "#d98fa0", "#c9b458", "#8fb8c9"], 0, 0.15),
+    "digital-art": Theme("#0f172a", "#e2e8f0", "#1e293b", ["#22d3ee", "#a78bfa", "#f472b6", "#34d399", "#fbbf24", "#60a5fa"], 0, 0.2),
+    "comic-book": Theme("#fffbea", "#111111", "#f0e3b0", ["#e63946", "#1d70e0", "#ffd60a", "#2a9d8f", "#f77f00", "#7b2cbf"], 3, 0.0),
+}
+
+
+def chart_kind(chart_type: str) -> Optional[str]:
+    """
+    Returns the layout ('bar', 'line', 'pie' or 'infographic') of a chart_type, or None if it is not a chart.
+    """
+    return CHART_KINDS.get(re.sub(r"[\s-]+", "_", chart_type.strip().lower()))
+
+
+class ChartData:
+    """
+    Values of one or more series over shared labels.
+    - **series**: Series name -> one value per label. A single unnamed series has the name ''.
+    - **unit**: Appended to the values shown on the chart (e.g. '%').
+    """
+
+    def __init__(self, labels: List[str], series: Dict[str, List[float]], unit: str = ""):
+        self.labels = labels
+        self.series = series
+        self.unit = unit
+
+
+def _number(value) -> float:
+    if isinstance(value, bool):
+        raise ValueError(f"{value!r} is not a number.")
+    try:
+        number = float(value.replace(",", "")) if isinstance(value, str) else float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{value!r} is not a number.")
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} is not a finite number.")
+    return number
+
+
+def parse_chart_data(data: dict, kind: str = "bar") -> ChartData:
+    """
+    Reads a request's data into a ChartData. Accepted shapes:
+    - {"label": value, ...}: one series.
+    - {"labels": [...], "values": [...]}: one series.
+    - {"labels": [...], "series": {"name": [...], ...}} or {"labels": [...], "name": [...], ...}: several series.
+    An optional "unit" entry is shown after the values. Raises ValueError if the data cannot be drawn as this kind of chart.
+    """
+    data = dict(data)
+    unit = str(data.pop("unit", ""))
+    labels = data.pop("labels", None)
+    if "series" in data:
+        series = data.pop("series")
+    elif "values" in data:
+        series = {"": data.pop("values")}
+    elif data and all(isinstance(values, (list, tuple)) for values in data.values()):
+        series, data = data, {}
+    elif labels is None:
+        labels, series, data = list(data), {"": list(data.values())}, {}
+    else:
+        raise ValueError("With 'labels', the values must be given as 'values', 'series' or lists.")
+    if data:
+        raise ValueError(f"Unexpected data entries: {', '.join(map(str, data))}.")
+    if not isinstance(series, dict) or not series or not all(isinstance(values, (list, tuple)) for values in series.values()):
+        raise ValueError("Every series must be a list of values.")
+
+    series = {str(name): [_number(value) for value in values] for name, values in series.items()}
+    length = max(len(values) for values in series.values())
+    labels = [str(label) for label in labels] if labels is not None else [str(index + 1) for index in range(length)]
+    if not labels:
+        raise ValueError("The data has no values.")
+    if any(len(values) != len(labels) for values in series.values()):
+        raise ValueError("Every series needs exactly one value per label.")
+    if kind == "pie":
+        values = next(iter(series.values()))
+        if min(values) < 0 or not sum(values):
+            raise ValueError("A pie chart needs non-negative values with a positive total.")
+    return ChartData(labels, series, unit)
+
+
+def _rgb(color: str) -> tuple:
+    return ImageColor.getrgb(color)[:3]
+
+
+def _mix(color: str, other: str, amount: float) -> str:
+    """
+    Returns color moved the given fraction of the way towards other.
+    """
+    return "#" + "".join(f"{round(a + (b - a) * amount):02x}" for a, b in zip(_rgb(color), _rgb(other)))
+
+
+def _luminance(color: str) -> float:
+    red, green, blue = _rgb(color)
+    return (0.299 * red + 0.587 * green + 0.114 * blue) / 255
+
+
+def _scheme_colors(color_scheme: str) -> list:
+    colors = []
+    for word in re.findall(r"#[0-9a-f]{6}\b|#[0-9a-f]{3}\b|[a-z]+", color_scheme.lower()):
+        # 'deep purples and blues' names purple and blue
+        for name in (word, word[:-1] if word.endswith("s") else None):
+            if name and name not in colors:
+                try:
+                    ImageColor.getrgb(name)
+                except ValueError:
+                    continue
+                colors.append(name)
+                break
+    return [_mix(color, color, 0) for color in colors]
+
+
+def chart_theme(style_preset: str = "digital-art", color_scheme: str = "default", tone: str = "neutral") -> Theme:
+    """
+    Returns the theme of a style preset with the colours named in color_scheme (CSS colour names or
+    hex codes, e.g. 'blue and gold'; 'dark', 'light' and 'pastel' also apply) and the tone's corners:
+    playful tones round bars and tiles, formal ones square them.
+    """
+    base = STYLE_THEMES.get(style_preset, STYLE_THEMES["digital-art"])
+    theme = Theme(base.background, base.foreground, base.grid, list(base.palette), base.outline, base.radius)
+    words = set(re.findall(r"[a-z]+", color_scheme.lower()))
+    colors = _scheme_colors(color_scheme)
+    if colors:
+        theme.palette = colors
+    if "dark" in words and _luminance(theme.background) > 0.5:
+        theme.background, theme.foreground, theme.grid = "#111827", "#f3f4f6", "#273244"
+    elif "light" in words and _luminance(theme.background) < 0.5:
+        theme.background, theme.foreground, theme.grid = "#ffffff", "#1f2933", "#e4e7eb"
+    if "pastel" in words:
+        theme.palette = [_mix(color, "#ffffff", 0.4) for color in theme.palette]
+
+    tones = set(re.findall(r"[a-z]+", tone.lower()))
+    if tones & _PLAYFUL_TONES:
+        theme.radius = max(theme.radius, 0.35)
+    elif tones & _FORMAL_TONES:
+        theme.radius = 0.0
+    return theme
+
+
+@functools.lru_cache(maxsize=32)
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has no sized default font
+        return ImageFont.load_default()
+
+
+def text_width(text: str, size: float) -> float:
+    return _font(max(round(size), 1)).getlength(text)
+
+
+def _fit(text: str, size: float, max_width: float) -> str:
+    """
+    Shortens text with an ellipsis until it is at most max_width wide.
+    """
+    if text_width(text, size) <= max_width:
+        return text
+    while text and text_width(text + "...", size) > max_width:
+        text = text[:-1]
+    return text + "..." if text else ""
+
+
+def format_value(value: float, unit: str = "") -> str:
+    magnitude = abs(value)
+    for limit, suffix in ((1e9, "B"), (1e6, "M"), (1e4, "k")):
+        if magnitude >= limit:
+            return f"{value / limit:.3g}{suffix}{unit}"
+    return f"{value:.6g}{unit}" if magnitude >= 100 or value == int(value) else f"{value:.3g}{unit}"
+
+
+def _ticks(low: float, high: float, count: int = 5) -> list:
+    """
+    Returns evenly spaced round values (1, 2, 2.5 or 5 times a power of ten apart) covering low..high.
+    """
+    if high <= low:
+        high = low + 1
+    raw = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(multiple * magnitude for multiple in (1, 2, 2.5, 5, 10) if multiple * magnitude >= raw)
+    start = math.floor(low / step + 1e-9) * step
+    steps = math.ceil(high / step - 1e-9) - math.floor(low / step + 1e-9)
+    return [start + index * step for index in range(steps + 1)]
+
+
+class PngCanvas:
+    """
+    Draws shapes with PIL at SUPERSAMPLING times the size; save() downsamples them.
+    """
+
+    def __init__(self, width: int, height: int, background: str, backdrop: Image.Image = None):
+        self.size = (width, height)
+        scaled = (width * SUPERSAMPLING, height * SUPERSAMPLING)
+        self.image = Image.new("RGB", scaled, background)
+        if backdrop is not None:
+            self.image = Image.blend(self.image, ImageOps.fit(backdrop.convert("RGB"), scaled), BACKDROP_OPACITY)
+        self.draw = ImageDraw.Draw(self.image)
+
+    def _scale(self, *values):
+        return [value * SUPERSAMPLING for value in values]
+
+    def rect(self, x0, y0, x1, y1, fill, radius=0.0, outline=None, width=0):
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        radius = min(radius, (x1 - x0) / 2, (y1 - y0) / 2)
+        self.draw.rounded_rectangle(self._scale(x0, y0, x1, y1), radius=round(radius * SUPERSAMPLING), fill=fill, outline=outline if width else None, width=round(width * SUPERSAMPLING))
+
+    def line(self, points, color, width):
+        self.draw.line([tuple(self._scale(x, y)) for x, y in points], fill=color, width=max(round(width * SUPERSAMPLING), 1), joint="curve")
+
+    def circle(self, x, y, radius, fill, outline=None, width=0):
+        self.draw.ellipse(self._scale(x - radius, y - radius, x + radius, y + radius), fill=fill, outline=outline if width else None, width=round(width * SUPERSAMPLING))
+
+    def wedge(self, x, y, radius, start, end, fill, outline=None, width=0):
+        # Angles in degrees, clockwise from three o'clock
+        self.draw.pieslice(self._scale(x - radius, y - radius, x + radius, y + radius), start, end, fill=fill, outline=outline if width else None, width=round(width * SUPERSAMPLING))
+
+    def text(self, x, y, text, size, color, align="middle"):
+        anchor = {"start": "lm", "middle": "mm", "end": "rm"}[align]
+        self.draw.text(tuple(self._scale(x, y)), text, font=_font(max(round(size * SUPERSAMPLING), 1)), fill=color, anchor=anchor)
+
+    def save(self, path: str):
+        # A box filter over each SUPERSAMPLING square is enough for anti-aliasing, and fast
+        self.image.reduce(SUPERSAMPLING).save(path)
+
+
+class SvgCanvas:
+    """
+    Writes the same shapes as PngCanvas as SVG elements.
+    """
+
+    def __init__(self, width: int, height: int, background: str, backdrop: Image.Image = None):
+        self.width = width
+        self.height = height
+        self.elements = [f'<rect width="{width}" height="{height}" fill="{background}"/>']
+        if backdrop is not None:
+            buffer = BytesIO()
+            ImageOps.fit(backdrop.convert("RGB"), (width, height)).save(buffer, format="PNG")
+            self.elements = [
+                f'<image width="{width}" height="{height}" href="data:image/png;base64,{b64encode(buffer.getvalue()).decode("ascii")}"/>',
+                f'<rect width="{width}" height="{height}" fill="{background}" fill-opacity="{1 - BACKDROP_OPACITY:g}"/>',
+            ]
+
+    @staticmethod
+    def _stroke(outline, width) -> str:
+        return f' stroke="{outline}" stroke-width="{width:g}"' if outline and width else ""
+
+    def rect(self, x0, y0, x1, y1, fill, radius=0.0, outline=None, width=0):
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        radius = min(radius, (x1 - x0) / 2, (y1 - y0) / 2)
+        self.elements.append(f'<rect x="{x0:.1f}" y="{y0:.1f}" width="{x1 - x0:.1f}" height="{y1 - y0:.1f}" rx="{radius:.1f}" fill="{fill}"{self._stroke(outline, width)}/>')
+
+    def line(self, points, color, width):
+        coordinates = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+        self.elements.append(f'<polyline points="{coordinates}" fill="none" stroke="{color}" stroke-width="{width:g}" stroke-linejoin="round" stroke-linecap="round"/>')
+
+    def circle(self, x, y, radius, fill, outline=None, width=0):
+        self.elements.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{radius:.1f}" fill="{fill}"{self._stroke(outline, width)}/>')
+
+    def wedge(self, x, y, radius, start, end, fill, outline=None, width=0):
+        if end - start >= 360:
+            self.circle(x, y, radius, fill, outline, width)
+            return
+        x0, y0 = x + radius * math.cos(math.radians(start)), y + radius * math.sin(math.radians(start))
+        x1, y1 = x + radius * math.cos(math.radians(end)), y + radius * math.sin(math.radians(end))
+        large = 1 if end - start > 180 else 0
+        self.elements.append(
+            f'<path d="M{x:.1f},{y:.1f} L{x0:.1f},{y0:.1f} A{radius:.1f},{radius:.1f} 0 {large} 1 {x1:.1f},{y1:.1f} Z" fill="{fill}"{self._stroke(outline, width)}/>'
+        )
+
+    def text(self, x, y, text, size, color, align="middle"):
+        self.elements.append(f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size:.1f}" fill="{color}" text-anchor="{align}" dominant-baseline="central">{escape(text)}</text>')
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}" viewBox="0 0 {self.width} {self.height}" font-family="sans-serif">\n')
+            f.write("\n".join(self.elements))
+            f.write("\n</svg>\n")
+
+
+def _legend_rows(names: list, size: float, max_width: float) -> tuple:
+    swatch = size * 0.8
+    widths = [swatch + size * 0.4 + min(text_width(name, size), max_width / 2) for name in names]
+    rows = [[]]
+    used = 0.0
+    for index, width in enumerate(widths):
+        if rows[-1] and used + width > max_width:
+            rows.append([])
+            used = 0.0
+        rows[-1].append(index)
+        used += width + size
+    return rows, widths
+
+
+def _legend_height(names: list, size: float, max_width: float) -> float:
+    return len(_legend_rows(names, size, max_width)[0]) * size * 1.6
+
+
+def _legend(canvas, names: list, colors: list, left: float, top: float, max_width: float, size: float, theme: Theme):
+    """
+    Draws centered rows of colour swatches and names from (left, top), _legend_height high.
+    """
+    swatch = size * 0.8
+    rows, widths = _legend_rows(names, size, max_width)
+    for row_index, row in enumerate(rows):
+        x = left + (max_width - sum(widths[index] for index in row) - size * (len(row) - 1)) / 2
+        y = top + (row_index + 0.5) * size * 1.6
+        for index in row:
+            canvas.rect(x, y - swatch / 2, x + swatch, y + swatch / 2, colors[index], radius=swatch * 0.2)
+            canvas.text(x + swatch + size * 0.4, y, _fit(names[index], size, max_width / 2), size, theme.foreground, align="start")
+            x += widths[index] + size
+
+
+def _draw_axes_chart(canvas, kind: str, data: ChartData, theme: Theme, left: float, top: float, right: float, bottom: float, unit: float):
+    label_size = max(unit * 2.6, 8)
+    names = list(data.series)
+    colors = theme.colors(len(names))
+    if len(names) > 1:
+        legend_height = _legend_height(names, label_size, right - left)
+        _legend(canvas, names, colors, left, bottom - legend_height, right - left, label_size, theme)
+        bottom -= legend_height + label_size * 0.5
+
+    values = [value for series in data.series.values() for value in series]
+    low, high = min(values), max(values)
+    # Bars always start at zero; lines only include it when it does not flatten them
+    if kind == "bar" or 0 <= low <= high / 2:
+        low, high = min(low, 0), max(high, 0)
+    ticks = _ticks(low, high)
+    low, high = ticks[0], ticks[-1]
+    tick_labels = [format_value(tick, data.unit) for tick in ticks]
+    plot_left = left + max(text_width(label, label_size) for label in tick_labels) + label_size
+    plot_bottom = bottom - label_size * 2
+    plot_top = top + label_size
+
+    def y_of(value):
+        return plot_bottom - (value - low) / (high - low) * (plot_bottom - plot_top)
+
+    for tick, label in zip(ticks, tick_labels):
+        canvas.line([(plot_left, y_of(tick)), (right, y_of(tick))], theme.grid, max(unit * 0.2, 1))
+        canvas.text(plot_left - label_size * 0.5, y_of(tick), label, label_size, theme.foreground, align="end")
+    baseline = y_of(min(max(0, low), high))
+    canvas.line([(plot_left, baseline), (right, baseline)], theme.foreground, max(unit * 0.25, 1))
+
+    count = len(data.labels)
+    group = (right - plot_left) / count
+    # Only every n-th label is shown when they would overlap
+    every = math.ceil((max(text_width(label, label_size) for label in data.labels) + label_size) / group)
+    every = min(max(every, 1), math.ceil(count / max(int((right - plot_left) // (label_size * 6)), 1)))
+    for index, label in enumerate(data.labels):
+        if index % every == 0:
+            canvas.text(plot_left + (index + 0.5) * group, plot_bottom + label_size, _fit(label, label_size, group * every - label_size * 0.5), label_size, theme.foreground)
+
+    if kind == "bar":
+        inner = group * 0.7
+        width = inner / len(names)
+        for series_index, series in enumerate(data.series.values()):
+            for index, value in enumerate(series):
+                x0 = plot_left + index * group + (group - inner) / 2 + series_index * width
+                canvas.rect(x0 + width * 0.05, baseline, x0 + width * 0.95, y_of(value), colors[series_index], radius=theme.radius * width, outline=theme.foreground, width=theme.outline)
+                if len(names) == 1 and count <= 12:
+                    # Below a negative bar the label would meet the axis labels, so it goes inside the bar's end
+                    if value >= 0:
+                        canvas.text(x0 + width / 2, y_of(value) - label_size * 0.8, format_value(value, data.unit), label_size, theme.foreground)
+                    else:
+                        text_color = "#111111" if _luminance(colors[series_index]) > 0.55 else "#ffffff"
+                        canvas.text(x0 + width / 2, y_of(value) - label_size * 0.8, format_value(value, data.unit), label_size, text_color)
+        return
+    for series_index, series in enumerate(data.series.values()):
+        points = [(plot_left + (index + 0.5) * group, y_of(value)) for index, value in enumerate(series)]
+        if theme.outline:
+            canvas.line(points, theme.foreground, unit * 0.6 + 2 * theme.outline)
+        canvas.line(points, colors[series_index], unit * 0.6)
+        if count <= 30:
+            for x, y in points:
+                canvas.circle(x, y, unit * 0.9, colors[series_index], outline=theme.background, width=max(unit * 0.3, 1))
+
+
+def _draw_pie(canvas, data: ChartData, theme: Theme, left: float, top: float, right: float, bottom: float, unit: float):
+    label_size = max(unit * 2.6, 8)
+    values = next(iter(data.series.values()))
+    total = sum(values)
+    colors = theme.colors(len(values))
+    names = [f"{label} ({format_value(value, data.unit)})" for label, value in zip(data.labels, values)]
+    # The legend goes beside a wide chart and below a tall one
+    if right - left > (bottom - top) * 1.2:
+        legend_width = min((right - left) * 0.4, max(text_width(name, label_size) for name in names) + label_size * 2)
+        for index, name in enumerate(names):
+            y = top + (bottom - top) / 2 + (index - (len(names) - 1) / 2) * label_size * 1.6
+            if top <= y <= bottom:
+                canvas.rect(right - legend_width, y - label_size * 0.4, right - legend_width + label_size * 0.8, y + label_size * 0.4, colors[index], radius=label_size * 0.16)
+                canvas.text(right - legend_width + label_size * 1.2, y, _fit(name, label_size, legend_width - label_size * 1.2), label_size, theme.foreground, align="start")
+        right -= legend_width + label_size
+    else:
+        legend_height = _legend_height(names, label_size, right - left)
+        _legend(canvas, names, colors, left, bottom - legend_height, right - left, label_size, theme)
+        bottom -= legend_height + label_size
+
+    radius = min(right - left, bottom - top) / 2
+    x, y = (left + right) / 2, (top + bottom) / 2
+    start = -90.0
+    for index, value in enumerate(values):
+        if not value:
+            continue
+        sweep = 360 * value / total
+        canvas.wedge(x, y, radius, start, start + sweep, colors[index], outline=theme.foreground if theme.outline else theme.background, width=theme.outline or max(unit * 0.4, 1))
+        if sweep >= 15:
+            middle = math.radians(start + sweep / 2)
+            share = f"{100 * value / total:.0f}%"
+            text_color = "#111111" if _luminance(colors[index]) > 0.55 else "#ffffff"
+            canvas.text(x + radius * 0.65 * math.cos(middle), y + radius * 0.65 * math.sin(middle), share, label_size, text_color)
+        start += sweep
+
+
+def _draw_infographic(canvas, data: ChartData, theme: Theme, left: float, top: float, right: float, bottom: float, unit: float):
+    """
+    One tile per label with its value, its name and a bar showing its share of the largest value.
+    """
+    values = next(iter(data.series.values()))
+    items = list(zip(data.labels, values))[:12]
+    columns = 1 if len(items) == 1 else 2 if len(items) <= 4 else 3 if len(items) <= 9 else 4
+    rows = math.ceil(len(items) / columns)
+    gap = unit * 3
+    tile_width = (right - left - gap * (columns - 1)) / columns
+    tile_height = min((bottom - top - gap * (rows - 1)) / rows, tile_width * 0.8)
+    top += (bottom - top - rows * tile_height - gap * (rows - 1)) / 2
+    largest = max(abs(value) for _, value in items) or 1
+    colors = theme.colors(len(items))
+    for index, (label, value) in enumerate(items):
+        x0 = left + (index % columns) * (tile_width + gap)
+        y0 = top + (index // columns) * (tile_height + gap)
+        padding = min(tile_width, tile_height) * 0.1
+        canvas.rect(x0, y0, x0 + tile_width, y0 + tile_height, _mix(colors[index], theme.background, 0.82), radius=theme.radius * tile_height * 0.5, outline=theme.foreground, width=theme.outline)
+        canvas.rect(x0 + padding * 0.5, y0 + padding, x0 + padding, y0 + tile_height - padding, colors[index], radius=padding)
+        value_text = format_value(value, data.unit)
+        value_size = min(tile_height * 0.32, (tile_width - 3 * padding) / max(len(value_text) * 0.6, 1))
+        canvas.text(x0 + tile_width / 2, y0 + tile_height * 0.36, value_text, value_size, theme.foreground)
+        label_size = max(min(tile_height * 0.12, unit * 3.2), 8)
+        canvas.text(x0 + tile_width / 2, y0 + tile_height * 0.64, _fit(label, label_size, tile_width - 2 * padding), label_size, theme.foreground)
+        bar_top, bar_bottom = y0 + tile_height * 0.8, y0 + tile_height * 0.8 + max(tile_height * 0.06, 2)
+        canvas.rect(x0 + padding * 1.5, bar_top, x0 + tile_width - padding, bar_bottom, theme.grid, radius=tile_height)
+        canvas.rect(x0 + padding * 1.5, bar_top, x0 + padding * 1.5 + (tile_width - 2.5 * padding) * abs(value) / largest, bar_bottom, colors[index], radius=tile_height)
+
+
+def render_chart(path: str, kind: str, data: ChartData, title: str, theme: Theme, width: int, height: int, backdrop: Image.Image = None):
+    """
+    Draws a chart and writes it to path, as SVG if the path ends in .svg and as a PNG otherwise.
+    - **kind**: 'bar', 'line', 'pie' or 'infographic' (see chart_kind).
+    - **backdrop**: An image shown through the chart's background, e.g. a generated illustration.
+    """
+    canvas = (SvgCanvas if path.lower().endswith(".svg") else PngCanvas)(width, height, theme.background, backdrop)
+    unit = min(width, height) / 100
+    margin = unit * 6
+    top = margin
+    if title:
+        title_size = max(unit * 4.5, 10)
+        canvas.text(width / 2, top + title_size / 2, _fit(title, title_size, width - 2 * margin), title_size, theme.foreground)
+        top += title_size * 2
+    area = (margin, top, width - margin, height - margin)
+    if kind == "pie":
+        _draw_pie(canvas, data, theme, *area, unit)
+    elif kind == "infographic":
+        _draw_infographic(canvas, data, theme, *area, unit)
+    else:
+        _draw_axes_chart(canvas, kind, data, theme, *area, unit)
+    canvas.save(path)
@@ -1,56 +1,264 @@
 
 import asyncio
+import functools
 import os
-import torch
-from diffusers import StableDiffusionPipeline
+import uuid
+from typing import List, Optional
+from PIL import Image
+from config import Config
+from core.batching import BatchScheduler
+from core.cache import resolve_seed, result_cache
+from core.embeddings import prompt_embedding_cache
+from core.executor import AgentExecutor, ExecutorSaturated
+from core.metrics import BATCH_PENDING, gauge_function, resolution_label, stage_timer
+from core.models import UPSCALER
+from core.profiles import get_profile, prepare_pipeline
+from core.progress import BatchProgress, GenerationCancelled, ProgressTracker
+from core.quality import with_fast_scheduler
+from core.readiness import readiness
+from core.registry import registry
+from core.scheduling import fair_scheduler
+from core.snapshot import load_pretrained, register_snapshot
+from core.upscale import estimate_upscale_seconds, upscale_image
+from .charts import ChartData, chart_kind, chart_theme, parse_chart_data, render_chart
 from .schemas import TextToGraphicsRequest, TextToGraphicsResponse
 
 # Ensure the output directory exists
 output_dir = os.path.join(os.path.dirname(__file__), "outputs")
 os.makedirs(output_dir, exist_ok=True)
 
-# Load the model
 model_id = "stabilityai/stable-diffusion-2-1"
-pipe = StableDiffusionPipeline.from_pretrained(model_id, torch_dtype=torch.float16)
+STABLE_DIFFUSION = "stable-diffusion"
+# Rough seconds of CPU work per latent pixel (1/8 of the image in each direction) and denoising step
+DENOISE_SECONDS_PER_LATENT_PIXEL = 2e-4
+# Rough seconds of work to draw a chart from data
+CHART_SECONDS = 0.05
 
-# Load upscaler model
-upscaler = StableDiffusionPipeline.from_pretrained("stabilityai/stable-diffusion-x4-upscaler", torch_dtype=torch.float16)
 
-# Set device
-device = "cuda" if torch.cuda.is_available() else "cpu"
-pipe = pipe.to(device)
-upscaler = upscaler.to(device)
+def _load_stable_diffusion_weights(source, **kwargs):
+    from diffusers import StableDiffusionPipeline
 
-async def generate_graphics_logic(request: TextToGraphicsRequest) -> TextToGraphicsResponse:
+    return StableDiffusionPipeline.from_pretrained(source, torch_dtype=get_profile().torch_dtype, **kwargs)
+
+
+def _load_stable_diffusion():
+    return prepare_pipeline(load_pretrained(STABLE_DIFFUSION))
+
+
+def _warm_up_stable_diffusion(pipe):
+    pipe("warm-up", num_inference_steps=1)
+
+
+def _warm_up_upscaler(upscaler):
+    upscaler(prompt="warm-up", image=Image.new("RGB", (32, 32)), num_inference_steps=1)
+
+
+# Models are loaded on first use, or at startup by the warm-up; the upscaler is shared with the video agent
+registry.register(STABLE_DIFFUSION, _load_stable_diffusion)
+register_snapshot(STABLE_DIFFUSION, model_id, _load_stable_diffusion_weights)
+
+executor = AgentExecutor(
+    "graphics",
+    max_workers=Config.GRAPHICS_MAX_WORKERS,
+    max_queue=Config.GRAPHICS_MAX_QUEUE,
+    backend=Config.GRAPHICS_EXECUTOR_BACKEND,
+)
+readiness.register(STABLE_DIFFUSION, executor, _warm_up_stable_diffusion)
+readiness.register(UPSCALER, executor, _warm_up_upscaler)
+# Charts take milliseconds, so they are drawn on an executor of their own rather than queued behind diffusion
+chart_executor = AgentExecutor("charts", max_workers=Config.CHART_MAX_WORKERS, max_queue=Config.CHART_MAX_QUEUE, inference=False)
+
+
+def denoise_settings(request: TextToGraphicsRequest) -> tuple:
     """
-    Core logic for generating graphics from text using Stable Diffusion.
+    Returns the step count of a request's quality tier and whether it samples with DPM-Solver++.
+    Draft and final use it at GRAPHICS_DRAFT_STEPS and at least GRAPHICS_FINAL_STEPS, so a
+    final render of a draft's seed keeps its composition; standard runs the request as given.
     """
+    if request.quality == "draft":
+        return min(request.num_inference_steps, Config.GRAPHICS_DRAFT_STEPS), True
+    if request.quality == "final":
+        return max(request.num_inference_steps, Config.GRAPHICS_FINAL_STEPS), True
+    return request.num_inference_steps, False
+
+
+def _enhances(request: TextToGraphicsRequest) -> bool:
+    # Drafts are previews, so they are never upscaled
+    return request.enhance_image and request.quality != "draft"
+
+
+def chart_data(request: TextToGraphicsRequest, warn: bool = False) -> Optional[ChartData]:
+    """
+    Returns the request's data if it is drawn by the chart engine: its chart_type is a chart
+    (see charts.CHART_KINDS) and its data can be charted. Otherwise the graphic is generated by
+    diffusion, with the data in the prompt, and None is returned.
+    """
+    kind = chart_kind(request.chart_type)
+    if not request.data or kind is None:
+        return None
+    try:
+        return parse_chart_data(request.data, kind)
+    except ValueError as e:
+        if warn:
+            print(f"Warning: Cannot chart the data ({e}); generating the {request.chart_type} with diffusion.")
+        return None
+
+
+def estimate_cost(request: TextToGraphicsRequest) -> float:
+    """
+    Estimates the seconds of work a request needs from its size, step count and enhancement.
+    """
+    if chart_data(request) is not None and not request.chart_background:
+        return CHART_SECONDS
+    steps, _ = denoise_settings(request)
+    cost = (request.width // 8) * (request.height // 8) * steps * DENOISE_SECONDS_PER_LATENT_PIXEL
+    if _enhances(request):
+        cost += estimate_upscale_seconds(request.width, request.height)
+    return cost
+
+
+fair_scheduler.register("graphics", estimate_cost)
+
+def _build_prompt(request: TextToGraphicsRequest) -> str:
     prompt = f"{request.chart_type} about '{request.text}'. Style: {request.style_preset}, {request.tone} tone, color scheme: {request.color_scheme}, subject: {request.subject}."
     if request.data:
         prompt += f" Data points: {request.data}."
+    return prompt
+
+
+def _generate_graphics_batch(requests: List[TextToGraphicsRequest], trackers: List[Optional[ProgressTracker]] = None) -> list:
+    """
+    Core logic for generating graphics from text using Stable Diffusion.
+    All requests must share width, height and denoise settings; they run as one batched pipeline call.
+    Returns one response per request, or the GenerationCancelled error of a request that was cancelled.
+    """
+    import torch
+
+    trackers = trackers or [None] * len(requests)
+    progress = BatchProgress(trackers)
+    steps, fast = denoise_settings(requests[0])
+    progress.begin_stage("denoise", steps)
+
+    prompts = [_build_prompt(request) for request in requests]
+    for prompt in prompts:
+        print(f"Generating graphics with prompt: '{prompt}'")
+
+    negative_prompts = [request.negative_prompt or "" for request in requests]
+    generators = [torch.Generator("cpu").manual_seed(resolve_seed(request)) for request in requests]
+
+    # Generate low-res images; the batch stops early only if every request in it was cancelled
+    pipe = registry.get(STABLE_DIFFUSION)
+    if fast:
+        pipe = with_fast_scheduler(pipe)
+    resolution = resolution_label(requests[0].width, requests[0].height)
+    with stage_timer("graphics", "denoise", resolution=resolution, enhance=any(_enhances(request) for request in requests)):
+        # Templated prompts and negative prompts repeat, so their encodings usually come from the cache
+        embeddings = prompt_embedding_cache.encode(STABLE_DIFFUSION, pipe, prompts + negative_prompts)
+        low_res_images = pipe(
+            prompt_embeds=embeddings[:len(prompts)],
+            negative_prompt_embeds=embeddings[len(prompts):],
+            width=requests[0].width,
+            height=requests[0].height,
+            num_inference_steps=steps,
+            generator=generators,
+            callback_on_step_end=progress.on_step_end,
+        ).images
 
-    print(f"Generating graphics with prompt: '{prompt}'")
+    results = []
+    for request, tracker, prompt, low_res_img in zip(requests, trackers, prompts, low_res_images):
+        try:
+            if tracker is not None:
+                tracker.check()
+            if _enhances(request):
+                print("Enhancing image...")
+                upscaler = registry.get(UPSCALER)
+                with stage_timer("graphics", "upscale", resolution=resolution, enhance=True):
+                    image = upscale_image(upscaler, low_res_img, prompt, negative_prompt=request.negative_prompt, seed=resolve_seed(request), progress=tracker)
+            else:
+                image = low_res_img
+        except GenerationCancelled as e:
+            results.append(e)
+            continue
 
-    # Generate low-res image
-    low_res_img = pipe(
-        prompt,
-        negative_prompt=request.negative_prompt,
-        width=request.width,
-        height=request.height
-    ).images[0]
+        # Save the image; batched requests may share a chart type, so names must be unique
+        graphics_file_name = f"generated_graphic_{request.chart_type}_{uuid.uuid4().hex[:8]}.png"
+        graphics_file_path = os.path.join(output_dir, graphics_file_name)
+        with stage_timer("graphics", "write", resolution=resolution, enhance=_enhances(request)):
+            image.save(graphics_file_path)
+        results.append(TextToGraphicsResponse(graphics_file=graphics_file_path, message="Graphics generated successfully."))
 
-    if request.enhance_image:
-        print("Enhancing image...")
-        image = upscaler(prompt=prompt, image=low_res_img).images[0]
-    else:
-        image = low_res_img
+    return results
 
-    # Save the image
-    graphics_file_name = f"generated_graphic_{request.chart_type}.png"
-    graphics_file_path = os.path.join(output_dir, graphics_file_name)
-    image.save(graphics_file_path)
 
-    return TextToGraphicsResponse(graphics_file=graphics_file_path, message="Graphics generated successfully.")
+async def _run_batch(items: list) -> list:
+    requests = [request for request, _ in items]
+    # Trackers cannot cross process boundaries, so progress is only reported for thread workers
+    trackers = [tracker if executor.backend == "thread" else None for _, tracker in items]
+    return await executor.run(_generate_graphics_batch, requests, trackers)
+
+
+scheduler = BatchScheduler(
+    _run_batch,
+    max_batch_size=Config.GRAPHICS_MAX_BATCH_SIZE,
+    max_wait=Config.GRAPHICS_MAX_BATCH_WAIT_MS / 1000,
+)
+gauge_function(BATCH_PENDING.labels("graphics"), lambda: scheduler.pending)
+
+async def _submit_to_scheduler(request: TextToGraphicsRequest, progress: ProgressTracker = None) -> TextToGraphicsResponse:
+    key = (request.width, request.height) + denoise_settings(request)
+    return await scheduler.submit(key, (request, progress))
+
+def _draw_chart(request: TextToGraphicsRequest, data: ChartData, backdrop_file: str = None) -> TextToGraphicsResponse:
+    """
+    Draws the request's data as a chart, optionally over a generated backdrop, which is deleted.
+    """
+    backdrop = None
+    if backdrop_file:
+        with Image.open(backdrop_file) as image:
+            backdrop = image.convert("RGB")
+        os.remove(backdrop_file)
+    graphics_file_path = os.path.join(output_dir, f"generated_graphic_{request.chart_type}_{uuid.uuid4().hex[:8]}.{request.image_format}")
+    theme = chart_theme(request.style_preset, request.color_scheme, request.tone)
+    with stage_timer("graphics", "chart", resolution=resolution_label(request.width, request.height), enhance=False):
+        render_chart(graphics_file_path, chart_kind(request.chart_type), data, request.text, theme, request.width, request.height, backdrop)
+    return TextToGraphicsResponse(graphics_file=graphics_file_path, message="Chart rendered successfully.")
+
+
+async def _generate(request: TextToGraphicsRequest, progress: ProgressTracker) -> TextToGraphicsResponse:
+    data = chart_data(request, warn=True)
+    if data is None:
+        return await _submit_to_scheduler(request, progress)
+    backdrop_file = None
+    if request.chart_background:
+        # Only the backdrop is generated by diffusion; it is asked for without text, which diffusion garbles
+        backdrop = request.model_copy(update={
+            "chart_type": "background illustration",
+            "data": None,
+            "negative_prompt": request.negative_prompt or "text, letters, numbers, chart, watermark",
+            "image_format": "png",
+            "chart_background": False,
+        })
+        backdrop_file = (await _submit_to_scheduler(backdrop, progress)).graphics_file
+    progress.check()
+    try:
+        return await chart_executor.run(_draw_chart, request, data, backdrop_file)
+    except ExecutorSaturated:
+        if backdrop_file:
+            os.remove(backdrop_file)
+        raise
+
+async def generate_graphics_logic(request: TextToGraphicsRequest, progress: ProgressTracker = None) -> TextToGraphicsResponse:
+    """
+    Queues the request with the batch scheduler; requests with the same size and denoise settings
+    that arrive within the batching window share one pipeline call on the graphics executor.
+    Charts with data are drawn by the chart engine instead (see chart_data).
+    Repeated requests are answered from the result cache.
+    - **progress**: Receives per-step progress and carries cancellation. Defaults to a tracker
+      enforcing the request's deadline_seconds.
+    """
+    progress = progress or ProgressTracker(request.deadline_seconds)
+    generate = functools.partial(_generate, progress=progress)
+    return await result_cache.fetch("graphics", request, generate, TextToGraphicsResponse, "graphics_file")
 
 async def test_generate_graphics_logic():
     print("Testing basic graphics generation logic...")
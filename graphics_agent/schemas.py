@@ -13,8 +13,15 @@ class TextToGraphicsRequest(BaseModel):
     negative_prompt: Optional[str] = None
     width: int = 768
     height: int = 768
+    num_inference_steps: int = 50
+    seed: Optional[int] = None  # Derived from the request when omitted
     enhance_image: bool = False
+    deadline_seconds: Optional[float] = None  # Generation is aborted once it runs longer
+    quality: Literal["draft", "standard", "final"] = "standard"  # Draft renders a fast preview
+    image_format: Literal["png", "svg"] = "png"  # SVG only for charts drawn from data
+    chart_background: bool = False  # Draw the chart over a generated illustration
 
 class TextToGraphicsResponse(BaseModel):
     graphics_file: str
     message: str
+    seed: Optional[int] = None  # Re-render a draft at final quality with this seed
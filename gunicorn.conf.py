@@ -0,0 +1,48 @@
+# Gunicorn settings for serving the app with several worker processes:
+#   gunicorn wsgi:app --config gunicorn.conf.py
+# The app and the models selected by WARMUP_MODELS are loaded once in the master process and shared
+# copy-on-write with the forked workers, so more workers add CPU parallelism without multiplying memory.
+import os
+import tempfile
+import time
+
+# BIND takes precedence, e.g. unix:/run/kalasetu/voice.sock for a worker service behind the gateway
+bind = os.environ.get("BIND") or f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# Requests wait for inference on executor threads, so the event loop keeps answering heartbeats
+timeout = 120
+graceful_timeout = 60
+
+# Jobs left pending by a previous server are resumed once, by whichever worker claims them first;
+# workers that replace a crashed one leave the jobs of their siblings alone
+os.environ.setdefault("SERVER_STARTED_AT", str(time.time()))
+
+# Workers write their metrics to files here so that /metrics, answered by any one worker, reports
+# all of them. Set before the app is loaded; a directory given explicitly must be empty at startup
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="kalasetu-metrics-")
+
+
+def on_starting(server):
+    from core.serving import freeze_heap, preload_models
+
+    loaded = preload_models()
+    server.log.info("Preloaded models: %s", ", ".join(loaded) or "none")
+    freeze_heap()
+
+
+def post_fork(server, worker):
+    from core.metrics import start_gauge_sampler
+    from core.serving import configure_worker
+
+    configure_worker(server.cfg.workers)
+    start_gauge_sampler()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Drops the gauges of the exited worker; its counters and histograms keep counting in the totals
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,4 +1,15 @@
+import os
+import tempfile
+
 import pytest
+
+# Keep the job store and result cache of the test run out of the working tree
+state_dir = tempfile.mkdtemp()
+os.environ.setdefault("JOB_STORE_PATH", os.path.join(state_dir, "jobs.sqlite3"))
+os.environ.setdefault("RESULT_CACHE_DIR", os.path.join(state_dir, "cache"))
+# Models are not downloaded or warmed up during tests
+os.environ.setdefault("WARMUP_MODELS", "none")
+
 from fastapi.testclient import TestClient
 from app import app
 
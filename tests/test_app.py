@@ -7,3 +7,9 @@ def test_read_main():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Welcome to the Kalasetu API"}
+
+def test_metrics_are_exposed():
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "kalasetu_queue_depth" in response.text
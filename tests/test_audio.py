@@ -0,0 +1,139 @@
+import numpy as np
+import scipy.io.wavfile as wavfile
+
+from voice_agent.audio import AmbienceLibrary, Crossfader, crossfade_concat, mix_ambience, split_sentences, wav_header
+
+
+def test_split_sentences_merges_short_and_wraps_long_sentences():
+    text = "Hi. How are you? " + "word " * 60
+    chunks = split_sentences(text, max_chars=40)
+    assert chunks[0] == "Hi. How are you?"
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_split_sentences_handles_danda_and_cjk_punctuation():
+    assert split_sentences("नमस्ते। आप कैसे हैं।", max_chars=8) == ["नमस्ते।", "आप कैसे", "हैं।"]
+    assert split_sentences("你好。再见！", max_chars=3) == ["你好。", "再见！"]
+
+
+def test_crossfade_streaming_matches_batch_join():
+    chunks = [np.ones(100, dtype=np.float32), np.full(80, 0.5, dtype=np.float32), np.zeros(60, dtype=np.float32)]
+    joined = crossfade_concat(chunks, fade_samples=10)
+    assert len(joined) == 240 - 2 * 10
+
+    crossfader = Crossfader(fade_samples=10)
+    streamed = np.concatenate([crossfader.push(chunk) for chunk in chunks] + [crossfader.flush()])
+    np.testing.assert_allclose(streamed, joined)
+    assert np.all(np.diff(joined[90:100]) < 0)
+
+
+def test_wav_header_is_44_bytes():
+    assert len(wav_header(24000, 10)) == 44
+    assert len(wav_header(24000)) == 44
+
+
+def test_mix_ambience_loops_attenuates_and_fades():
+    speech = np.zeros(1000, dtype=np.float32)
+    ambience = np.ones(300, dtype=np.float32)
+    mixed = mix_ambience(speech, ambience, gain_db=-20, fade_samples=100)
+    assert len(mixed) == 1000
+    assert mixed[0] == 0
+    np.testing.assert_allclose(mixed[500], 0.1, rtol=1e-5)
+    assert mixed[-1] == 0
+
+
+def test_ambience_library_decodes_once_and_resamples(tmp_path):
+    wavfile.write(str(tmp_path / "cafe.wav"), 48000, np.full((4800, 2), 16384, dtype=np.int16))
+    library = AmbienceLibrary(str(tmp_path))
+    track = library.get("cafe", 24000)
+    assert len(track) == 2400
+    np.testing.assert_allclose(track[1000:1400], 0.5, atol=1e-3)
+    assert library.get("cafe", 24000) is track
+    assert library.get("nature", 24000) is None
+
+
+def test_seeded_synthesis_is_reproducible_under_concurrency(monkeypatch):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    import torch
+
+    from voice_agent import engine
+    from voice_agent.schemas import TextToAudioRequest
+
+    class FakeBark:
+        # Samples from the global RNG in several steps, like Bark's sub-models
+        def generate(self, input_ids, **kwargs):
+            steps = []
+            for _ in range(5):
+                steps.append(torch.rand(1))
+                time.sleep(0.002)
+            return torch.cat(steps)[None], [5]
+
+    class FakeRegistry:
+        def get(self, name):
+            return (lambda chunks, **kwargs: {"input_ids": None}), FakeBark()
+
+    monkeypatch.setattr(engine, "registry", FakeRegistry())
+    request = TextToAudioRequest(text="Hello")
+    expected = {seed: engine._synthesize(["Hello"], "v2/en_speaker_6", request, seed)[0] for seed in range(4)}
+    barrier = threading.Barrier(4)
+
+    def synthesize(seed):
+        barrier.wait()
+        return engine._synthesize(["Hello"], "v2/en_speaker_6", request, seed)[0]
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(synthesize, range(4)))
+    assert all(np.array_equal(result, expected[seed]) for seed, result in enumerate(results))
+
+
+def test_streamed_sentences_take_turns_in_the_fair_scheduler(monkeypatch):
+    import asyncio
+    import types
+
+    import torch
+
+    from core.scheduling import FairScheduler, OverBudget
+    from voice_agent import engine
+    from voice_agent.schemas import TextToAudioRequest
+
+    class FakeBark:
+        generation_config = types.SimpleNamespace(sample_rate=24000)
+
+        def generate(self, input_ids, **kwargs):
+            return torch.zeros(1, 2400), [2400]
+
+    class FakeRegistry:
+        def get(self, name):
+            return (lambda chunks, **kwargs: {"input_ids": None}), FakeBark()
+
+    class RecordingScheduler(FairScheduler):
+        def __init__(self):
+            super().__init__(capacity=600, max_backlog=3600)
+            self.costs = []
+
+        async def run(self, agent, request, generate):
+            self.costs.append(self.estimate(agent, request))
+            if len(self.costs) == 2:
+                raise OverBudget("Busy.")
+            return await super().run(agent, request, generate)
+
+    scheduler = RecordingScheduler()
+    scheduler.register("voice", engine.estimate_cost)
+    monkeypatch.setattr(engine, "registry", FakeRegistry())
+    monkeypatch.setattr(engine, "fair_scheduler", scheduler)
+    monkeypatch.setattr(engine, "STREAM_RETRY_SECONDS", 0)
+    request = TextToAudioRequest(text="First sentence here. " + "Second one. " * 30)
+
+    async def main():
+        return [chunk async for chunk in engine.stream_audio_logic(request)]
+
+    chunks = asyncio.run(main())
+    sentences = split_sentences(request.text, engine.Config.VOICE_MAX_CHUNK_CHARS)
+    assert len(chunks) == len(sentences) + 1
+    # The rejected second sentence was retried rather than ending the stream
+    assert len(scheduler.costs) == len(sentences) + 1
+    assert scheduler.costs[0] == engine.estimate_cost(request.model_copy(update={"text": sentences[0]}))
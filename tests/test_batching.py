@@ -0,0 +1,40 @@
+import asyncio
+
+from core.batching import BatchScheduler
+
+
+def test_compatible_requests_share_a_batch():
+    batches = []
+
+    async def run_batch(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    scheduler = BatchScheduler(run_batch, max_batch_size=3, max_wait=0.05)
+
+    async def main():
+        return await asyncio.gather(
+            scheduler.submit("512", 1),
+            scheduler.submit("512", 2),
+            scheduler.submit("768", 3),
+            scheduler.submit("512", 4),
+            scheduler.submit("512", 5),
+        )
+
+    assert asyncio.run(main()) == [10, 20, 30, 40, 50]
+    assert sorted(batches) == [[1, 2, 4], [3], [5]]
+    stats = scheduler.stats()
+    assert stats["batches"] == 3
+    assert stats["items"] == 5
+
+
+def test_batch_failure_reaches_every_caller():
+    async def run_batch(items):
+        raise RuntimeError("boom")
+
+    scheduler = BatchScheduler(run_batch, max_batch_size=2, max_wait=0.01)
+
+    async def main():
+        return await asyncio.gather(scheduler.submit("a", 1), scheduler.submit("a", 2), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(main()))
@@ -0,0 +1,31 @@
+from benchmarks.run import build_payload, compare, summarize
+
+
+def test_summary_reports_percentiles_and_throughput():
+    result = summarize("graphics", 2, [0.1, 0.2, 0.3, 0.4], {"503": 1}, wall_seconds=2.0, peak_rss=512 * 2**20)
+    assert result["requests"] == 5
+    assert result["succeeded"] == 4
+    assert result["latency_p50_ms"] == 250.0
+    assert result["throughput_per_second"] == 2.0
+    assert result["peak_rss_mb"] == 512
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = [summarize("voice", 1, [1.0, 1.0], {}, wall_seconds=2.0, peak_rss=2**30)]
+    slower = [summarize("voice", 1, [1.5, 1.5], {}, wall_seconds=3.0, peak_rss=2**30)]
+    assert compare(baseline, baseline, tolerance=0.1) == []
+    regressions = compare(slower, baseline, tolerance=0.1)
+    assert len(regressions) == 3  # p50, p95 and throughput
+    assert all(regression.startswith("voice (standard) at concurrency 1") for regression in regressions)
+
+
+def test_payloads_have_distinct_seeds():
+    assert build_payload("video", 1)["seed"] != build_payload("video", 2)["seed"]
+    assert build_payload("charts", 1)["data"] != build_payload("charts", 2)["data"]
+
+
+def test_quality_tiers_are_compared_separately():
+    baseline = [summarize("voice", 1, [1.0], {}, wall_seconds=1.0, peak_rss=2**30, quality="final")]
+    draft = [summarize("voice", 1, [2.0], {}, wall_seconds=2.0, peak_rss=2**30, quality="draft")]
+    assert compare(draft, baseline, tolerance=0.1) == []
+    assert build_payload("graphics", 1, quality="draft")["quality"] == "draft"
@@ -0,0 +1,83 @@
+import asyncio
+import os
+
+from pydantic import BaseModel
+from typing import Optional
+
+from core import cache as cache_module
+from core.cache import ResultCache, request_key, resolve_seed
+from core.scheduling import FairScheduler
+
+
+class FileRequest(BaseModel):
+    text: str
+    seed: Optional[int] = None
+
+
+class FileResponse(BaseModel):
+    file: str
+    message: str
+
+
+def write_file(path, size):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return path
+
+
+def test_request_key_is_canonical_and_seeded():
+    assert request_key("voice", FileRequest(text="hi")) == request_key("voice", FileRequest(text="hi", seed=resolve_seed(FileRequest(text="hi"))))
+    assert request_key("voice", FileRequest(text="hi", seed=1)) != request_key("voice", FileRequest(text="hi", seed=2))
+    assert request_key("voice", FileRequest(text="hi")) != request_key("video", FileRequest(text="hi"))
+
+
+def test_repeated_request_is_served_from_cache(tmp_path):
+    # A scheduler of its own, without the voice agent's estimator for real voice requests
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=1024, scheduler=FairScheduler(capacity=0, max_backlog=0))
+    calls = []
+
+    async def generate(request):
+        calls.append(request)
+        path = write_file(str(tmp_path / f"output_{len(calls)}.bin"), 10)
+        return FileResponse(file=path, message="Generated.")
+
+    async def main():
+        first = await cache.fetch("voice", FileRequest(text="hi"), generate, FileResponse, "file")
+        second = await cache.fetch("voice", FileRequest(text="hi"), generate, FileResponse, "file")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert len(calls) == 1
+    assert first.file == second.file
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=25)
+    a = cache.put("a", write_file(str(tmp_path / "a.bin"), 10))
+    b = cache.put("b", write_file(str(tmp_path / "b.bin"), 10))
+    os.utime(a, (1, 1))
+    os.utime(b, (2, 2))
+    cache.get("a")
+    cache.put("c", write_file(str(tmp_path / "c.bin"), 10))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_caches_sharing_a_directory_share_entries_and_size_cap(tmp_path, monkeypatch):
+    directory = str(tmp_path / "cache")
+    first, second = ResultCache(directory, max_bytes=25), ResultCache(directory, max_bytes=25)
+    a = first.put("a", write_file(str(tmp_path / "a.bin"), 10))
+    # Misses rescan the directory only once the last scan is old enough
+    assert second.get("a") is None
+    monkeypatch.setattr(cache_module, "RESCAN_INTERVAL_SECONDS", 0)
+    assert second.get("a") == a
+
+    os.utime(a, (1, 1))
+    second.put("b", write_file(str(tmp_path / "b.bin"), 10))
+    first.put("c", write_file(str(tmp_path / "c.bin"), 10))
+    assert sorted(os.listdir(directory)) == ["b.bin", "c.bin"]
+    assert second.get("a") is None
@@ -0,0 +1,56 @@
+import asyncio
+
+from campaign_agent import engine
+from campaign_agent.schemas import CampaignRequest, CampaignResponse
+from core.jobs import job_manager
+from graphics_agent.schemas import TextToGraphicsResponse
+from video_agent.schemas import TextToVideoResponse
+from voice_agent.schemas import TextToAudioResponse
+
+
+def test_stage_requests_share_the_brief_and_seed():
+    voice, graphics, video = engine.build_stage_requests(CampaignRequest(brief="Solar purifier", tone="hopeful"))
+    assert voice.text == graphics.text == video.text == "Solar purifier"
+    assert graphics.tone == video.tone == "hopeful"
+    assert voice.seed == graphics.seed == video.seed is not None
+
+
+def test_video_uses_the_narration_and_graphic(monkeypatch):
+    calls = []
+
+    async def audio_logic(request, progress=None):
+        calls.append("voice-start")
+        await asyncio.sleep(0.05)
+        calls.append("voice-end")
+        return TextToAudioResponse(audio_file="narration.wav", message="")
+
+    async def graphics_logic(request, progress=None):
+        calls.append("graphics-start")
+        await asyncio.sleep(0.05)
+        calls.append("graphics-end")
+        return TextToGraphicsResponse(graphics_file="card.png", message="")
+
+    async def video_logic(request, progress=None, narration_file=None, title_card_file=None):
+        calls.append(("video", narration_file, title_card_file))
+        return TextToVideoResponse(video_file="video.mp4", message="")
+
+    monkeypatch.setattr(engine, "generate_audio_logic", audio_logic)
+    monkeypatch.setattr(engine, "generate_graphics_logic", graphics_logic)
+    monkeypatch.setattr(engine, "generate_video_logic", video_logic)
+
+    response = asyncio.run(engine.generate_campaign_logic(CampaignRequest(brief="Solar purifier")))
+    assert calls[:2] == ["voice-start", "graphics-start"]
+    assert calls[-1] == ("video", "narration.wav", "card.png")
+    assert response.video_file == "video.mp4"
+    assert set(response.stage_seconds) == {"voice", "graphics", "video"}
+
+
+def test_campaign_jobs_are_validated_by_their_brief(test_client, monkeypatch):
+    async def campaign_logic(request, progress=None):
+        return CampaignResponse(audio_file="a.wav", graphics_file="g.png", video_file="v.mp4", stage_seconds={}, total_seconds=0.0, message="")
+
+    monkeypatch.setitem(job_manager._agents, "campaign", (CampaignRequest, campaign_logic, "video_file"))
+    response = test_client.post("/campaign/jobs", json={"brief": "Solar purifier"})
+    assert response.status_code == 202
+    assert response.json()["agent"] == "campaign"
+    assert test_client.post("/campaign/jobs", json={"brief": ""}).status_code == 400
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import threading
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+from PIL import Image
+
+from core.executor import AgentExecutor, ExecutorSaturated
+from core.progress import ProgressTracker
+from graphics_agent import engine
+from graphics_agent.charts import chart_kind, chart_theme, format_value, parse_chart_data, render_chart
+from graphics_agent.engine import CHART_SECONDS, _draw_chart, chart_data, estimate_cost
+from graphics_agent.schemas import TextToGraphicsRequest
+
+
+def test_data_shapes_are_parsed_into_series():
+    single = parse_chart_data({"Q1": 10, "Q2": "1,250.5"})
+    assert single.labels == ["Q1", "Q2"] and single.series == {"": [10.0, 1250.5]}
+
+    several = parse_chart_data({"labels": ["Jan", "Feb"], "series": {"2023": [1, 2], "2024": [3, 4]}, "unit": "%"})
+    assert list(several.series) == ["2023", "2024"] and several.unit == "%"
+    assert parse_chart_data({"labels": ["Jan", "Feb"], "2023": [1, 2]}).series == {"2023": [1.0, 2.0]}
+    assert parse_chart_data({"values": [5, 6, 7]}).labels == ["1", "2", "3"]
+
+
+@pytest.mark.parametrize("data, kind", [
+    ({"Q1": "many"}, "bar"),
+    ({"labels": ["a", "b"], "values": [1]}, "bar"),
+    ({"theme": "growth", "values": [1]}, "bar"),
+    ({"a": 3, "b": -1}, "pie"),
+    ({}, "bar"),
+])
+def test_data_that_cannot_be_charted_is_rejected(data, kind):
+    with pytest.raises(ValueError):
+        parse_chart_data(data, kind)
+
+
+def test_themes_follow_the_request():
+    assert chart_kind("Bar Chart") == "bar" and chart_kind("illustration") is None
+    assert chart_theme(color_scheme="deep purples and blues").palette == ["#800080", "#0000ff"]
+    assert chart_theme("photorealistic", "dark").background != chart_theme("photorealistic").background
+    assert chart_theme(tone="playful").radius > chart_theme(tone="formal").radius == 0
+    assert chart_theme().colors(10)[6] != chart_theme().colors(10)[0]
+
+
+def test_values_and_ticks_are_formatted():
+    assert format_value(4200000) == "4.2M"
+    assert format_value(1250) == "1250"
+    assert format_value(0.125, "%") == "0.125%"
+
+
+@pytest.mark.parametrize("kind", ["bar", "line", "pie", "infographic"])
+def test_charts_render_to_png_and_svg(tmp_path, kind):
+    data = parse_chart_data({"labels": ["North", "South", "East"], "series": {"Online": [5, 7, 3], "Retail": [4, 2, 6]}}, kind)
+    png, svg = str(tmp_path / "chart.png"), str(tmp_path / "chart.svg")
+    render_chart(png, kind, data, "Sales by region", chart_theme(), 320, 240)
+    render_chart(svg, kind, data, "Sales by region", chart_theme(), 320, 240)
+    with Image.open(png) as image:
+        assert image.size == (320, 240)
+        assert len(image.getcolors(2**16)) > 10
+    root = ElementTree.parse(svg).getroot()
+    assert root.get("width") == "320" and "North" in ElementTree.tostring(root, encoding="unicode")
+
+
+def test_only_chart_types_with_chartable_data_skip_diffusion():
+    chart = TextToGraphicsRequest(text="Revenue", chart_type="bar_chart", data={"Q1": 1, "Q2": 2})
+    assert chart_data(chart) is not None
+    assert estimate_cost(chart) == CHART_SECONDS
+    assert estimate_cost(chart.model_copy(update={"chart_background": True})) > CHART_SECONDS
+    assert chart_data(chart.model_copy(update={"chart_type": "illustration"})) is None
+    assert chart_data(chart.model_copy(update={"data": {"mood": "upbeat"}})) is None
+
+
+def test_chart_is_drawn_over_a_backdrop(tmp_path):
+    backdrop = str(tmp_path / "backdrop.png")
+    Image.new("RGB", (64, 64), "red").save(backdrop)
+    request = TextToGraphicsRequest(text="Revenue", chart_type="pie_chart", data={"a": 1, "b": 3}, width=128, height=96)
+    response = _draw_chart(request, chart_data(request), backdrop)
+    assert not os.path.exists(backdrop)
+    with Image.open(response.graphics_file) as image:
+        red, green, blue = image.getpixel((1, 1))
+        assert red > green and red > blue
+    os.remove(response.graphics_file)
+
+
+def test_charts_are_served_without_the_diffusion_model(test_client):
+    payload = {"text": "Quarterly revenue", "chart_type": "bar_chart", "data": {"Q1": 120, "Q2": 340}, "width": 256, "height": 192, "image_format": "svg"}
+    response = test_client.post("/graphics/generate_graphics", json=payload)
+    assert response.status_code == 200
+    assert response.json()["graphics_file"].endswith(".svg")
+
+    response = test_client.post("/graphics/generate_graphics", json={"text": "A sunset", "chart_type": "illustration", "image_format": "svg"})
+    assert response.status_code == 400
+
+
+def test_chart_bursts_are_bounded_by_the_chart_executor(monkeypatch):
+    release = threading.Event()
+
+    def draw_chart(request, data, backdrop_file=None):
+        release.wait(5)
+        return "drawn"
+
+    chart_executor = AgentExecutor("charts-test", max_workers=1, max_queue=1, inference=False)
+    monkeypatch.setattr(engine, "chart_executor", chart_executor)
+    monkeypatch.setattr(engine, "_draw_chart", draw_chart)
+    request = TextToGraphicsRequest(text="Revenue", chart_type="bar_chart", data={"Q1": 1, "Q2": 2})
+
+    async def main():
+        accepted = [asyncio.ensure_future(engine._generate(request, ProgressTracker())) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(ExecutorSaturated):
+                await engine._generate(request, ProgressTracker())
+        finally:
+            release.set()
+        return await asyncio.gather(*accepted)
+
+    assert asyncio.run(main()) == ["drawn", "drawn"]
+    chart_executor.shutdown()
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+from core.dag import run_dag, topological_order
+
+
+def sleeper(seconds, value):
+    async def run(results):
+        await asyncio.sleep(seconds)
+        return (value, sorted(results))
+    return run
+
+
+def test_independent_stages_overlap():
+    stages = {
+        "voice": ((), sleeper(0.2, "audio")),
+        "graphics": ((), sleeper(0.2, "image")),
+        "video": (("voice", "graphics"), sleeper(0.1, "video")),
+    }
+    started = time.perf_counter()
+    results = asyncio.run(run_dag(stages))
+    elapsed = time.perf_counter() - started
+
+    assert results["video"] == ("video", ["graphics", "voice"])
+    assert elapsed < 0.45  # 0.3 s along the longest path, not 0.5 s in sequence
+
+
+def test_failed_stage_cancels_the_rest():
+    finished = []
+
+    async def fail(results):
+        raise RuntimeError("boom")
+
+    async def slow(results):
+        await asyncio.sleep(1)
+        finished.append("slow")
+
+    stages = {"fail": ((), fail), "slow": ((), slow), "after": (("fail",), sleeper(0, "after"))}
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_dag(stages))
+    assert finished == []
+
+
+def test_cycles_and_unknown_dependencies_are_rejected():
+    with pytest.raises(ValueError):
+        topological_order({"a": (("b",), None), "b": (("a",), None)})
+    with pytest.raises(ValueError):
+        topological_order({"a": (("missing",), None)})
+    assert topological_order({"b": (("a",), None), "a": ((), None)}) == ["a", "b"]
@@ -0,0 +1,64 @@
+import torch
+
+from core.embeddings import PromptEmbeddingCache
+
+
+class FakeEncoderPipeline:
+    device = "cpu"
+
+    def __init__(self):
+        self.text_encoder = torch.nn.Identity()
+        self.encoded = []
+
+    def encode_prompt(self, prompt, device, num_images_per_prompt, do_classifier_free_guidance):
+        self.encoded.append(list(prompt))
+        return torch.stack([torch.full((4, 8), float(len(text))) for text in prompt]), None
+
+
+def test_repeated_texts_skip_the_encoder():
+    cache = PromptEmbeddingCache(max_entries=8)
+    pipe = FakeEncoderPipeline()
+
+    first = cache.encode("sd", pipe, ["a cat", ""])
+    second = cache.encode("sd", pipe, ["a dog", "", "a cat"])
+    assert pipe.encoded == [["a cat", ""], ["a dog"]]
+    assert first.shape == (2, 4, 8)
+    assert torch.equal(second[2], first[0])
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 3
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PromptEmbeddingCache(max_entries=2)
+    pipe = FakeEncoderPipeline()
+    cache.encode("sd", pipe, ["a"])
+    cache.encode("sd", pipe, ["b"])
+    cache.encode("sd", pipe, ["a"])
+    cache.encode("sd", pipe, ["c"])
+    cache.encode("sd", pipe, ["a", "b"])
+    assert pipe.encoded == [["a"], ["b"], ["c"], ["b"]]
+    assert cache.stats()["entries"] == 2
+
+
+def test_replaced_pipeline_does_not_reuse_embeddings():
+    cache = PromptEmbeddingCache(max_entries=8)
+    old, new = FakeEncoderPipeline(), FakeEncoderPipeline()
+    cache.encode("sd", old, ["a"])
+    cache.encode("sd", new, ["a"])
+    assert new.encoded == [["a"]]
+
+
+def test_cached_embeddings_reproduce_the_pipeline_output():
+    from benchmarks.stand_ins import build_stable_diffusion
+
+    pipe = build_stable_diffusion()
+    cache = PromptEmbeddingCache(max_entries=8)
+
+    def generate(**kwargs):
+        return pipe(width=64, height=64, num_inference_steps=2, generator=torch.Generator("cpu").manual_seed(0), output_type="np", **kwargs).images
+
+    expected = generate(prompt=["a chart"])
+    cache.encode("sd", pipe, ["a chart", ""])
+    embeddings = cache.encode("sd", pipe, ["a chart", ""])
+    assert cache.stats()["hits"] == 2
+    assert (generate(prompt_embeds=embeddings[:1], negative_prompt_embeds=embeddings[1:]) == expected).all()
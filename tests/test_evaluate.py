@@ -0,0 +1,32 @@
+from evals.evaluate import _write_rows, completed_indices, length_buckets, merge_shards, shard_indices
+
+
+def test_shards_cover_every_row_once():
+    shards = [shard_indices(10, index, 3) for index in range(3)]
+    assert shards == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+
+
+def test_batches_group_similar_lengths():
+    batches = length_buckets([0, 1, 2, 3, 4], [3, 50, 4, 48, 5], batch_size=2)
+    assert batches == [[1, 3], [4, 2], [0]]
+
+
+def test_resume_drops_a_torn_row(tmp_path):
+    path = str(tmp_path / "results.csv")
+    _write_rows(path, [{"index": 0, "input_text": "a", "generated_text": "b", "label": 1}])
+    _write_rows(path, [{"index": 1, "input_text": "c", "generated_text": "d", "label": 0}])
+    with open(path, "a") as f:
+        f.write('2,"e","unfinished')
+    assert completed_indices(path) == {0, 1}
+    assert completed_indices(path) == {0, 1}
+
+
+def test_merged_results_are_in_dataset_order(tmp_path):
+    first, second = str(tmp_path / "a.csv"), str(tmp_path / "b.csv")
+    _write_rows(first, [{"index": 2, "input_text": "x", "generated_text": "y", "label": 0}])
+    _write_rows(second, [{"index": 1, "input_text": "x", "generated_text": "y", "label": 0}])
+    output = str(tmp_path / "merged.csv")
+    merge_shards([second, first], output)
+    assert completed_indices(output) == {1, 2}
+    with open(output) as f:
+        assert [line.split(",")[0] for line in f.read().splitlines()] == ["index", "1", "2"]
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.executor import AgentExecutor, ExecutorSaturated
+
+
+def test_run_executes_off_the_event_loop():
+    executor = AgentExecutor("test", max_workers=1, max_queue=0)
+
+    async def main():
+        return await executor.run(threading.get_ident)
+
+    assert asyncio.run(main()) != threading.get_ident()
+    executor.shutdown()
+
+
+def test_run_rejects_work_beyond_the_queue_limit():
+    executor = AgentExecutor("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        waiting = asyncio.ensure_future(executor.run(time.sleep, 0))
+        await asyncio.sleep(0.05)
+        assert executor.in_flight == 1
+        assert executor.queued == 1
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(time.sleep, 0)
+        release.set()
+        await asyncio.gather(running, waiting)
+
+    asyncio.run(main())
+    executor.shutdown()
+
+
+def test_cancelled_callers_hold_their_slot_until_the_call_finishes():
+    executor = AgentExecutor("test", max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def main():
+        # The blocked call gives up after a few seconds, so a regression fails instead of hanging
+        running = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(ExecutorSaturated):
+                await executor.run(time.sleep, 0)
+        finally:
+            release.set()
+        await asyncio.sleep(0.05)
+        assert executor.in_flight == 0
+        await executor.run(time.sleep, 0)
+
+    asyncio.run(asyncio.wait_for(main(), timeout=10))
+    executor.shutdown()
@@ -0,0 +1,75 @@
+import importlib.util
+import os
+
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+# fine-tune/ is a script directory rather than a package, so load the module from its path
+spec = importlib.util.spec_from_file_location("finetune_data", os.path.join(os.path.dirname(__file__), "..", "fine-tune", "data.py"))
+data = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(data)
+
+
+def make_tokenizer():
+    vocab = {"<eos>": 0, "[UNK]": 1, "a": 2, "b": 3, "c": 4}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token="<eos>", unk_token="[UNK]")
+
+
+def test_examples_are_packed_whole_and_longest_first():
+    rows = data.pack_examples([[1] * 3, [2] * 6, [3] * 2, [4] * 12], max_seq_length=8)
+    assert rows == [[[4] * 8], [[2] * 6, [3] * 2], [[1] * 3]]
+
+
+def test_packed_rows_mark_example_boundaries():
+    packed = data._pack({"input_ids": [[5, 6, 0], [7, 0]]}, max_seq_length=8)
+    assert packed["input_ids"] == [[5, 6, 0, 7, 0]]
+    assert packed["labels"] == [[-100, 6, 0, -100, 0]]
+    assert packed["position_ids"] == [[0, 1, 2, 0, 1]]
+
+
+def test_collator_pads_without_joining_examples():
+    batch = data.PackedCollator(pad_token_id=0)([
+        {"input_ids": [5, 6, 7], "labels": [-100, 6, 7], "position_ids": [0, 1, 2]},
+        {"input_ids": [8], "labels": [-100], "position_ids": [0]},
+    ])
+    assert batch["input_ids"].tolist() == [[5, 6, 7], [8, 0, 0]]
+    assert batch["labels"][1].tolist() == [-100, -100, -100]
+    assert batch["position_ids"][1].tolist() == [0, 0, 1]
+    # The padding only attends to itself
+    assert batch["attention_mask"][1, 0].tolist() == [[True, False, False], [False, True, False], [False, True, True]]
+
+
+def test_packed_examples_cannot_attend_to_each_other():
+    torch.manual_seed(0)
+    config = LlamaConfig(vocab_size=16, hidden_size=32, intermediate_size=64, num_hidden_layers=2, num_attention_heads=4, num_key_value_heads=4)
+    config._attn_implementation = "sdpa"
+    model = LlamaForCausalLM(config).eval()
+    batch = data.PackedCollator(pad_token_id=0)([
+        {"input_ids": [5, 6, 7, 8, 9, 3], "labels": [-100, 6, 7, -100, 9, 3], "position_ids": [0, 1, 2, 0, 1, 2]},
+    ])
+    assert batch["attention_mask"][0, 0, 3].tolist() == [False, False, False, True, False, False]
+
+    with torch.no_grad():
+        packed = model(input_ids=batch["input_ids"], position_ids=batch["position_ids"], attention_mask=batch["attention_mask"]).logits
+        alone = model(input_ids=torch.tensor([[8, 9, 3]])).logits
+    assert torch.allclose(packed[0, 3:], alone[0], atol=1e-5)
+
+
+def test_prepared_dataset_is_cached(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "train.csv").write_text("text\na b c\nb c\na\nc c c c\n")
+    tokenizer = make_tokenizer()
+    cache_dir = str(tmp_path / "cache")
+
+    packed = data.prepare_dataset(str(source), tokenizer, max_seq_length=8, cache_dir=cache_dir, num_proc=1)
+    assert sum(len(row) for row in packed["input_ids"]) == 14  # 10 tokens and 4 EOS
+    assert len(os.listdir(cache_dir)) == 1
+
+    again = data.prepare_dataset(str(source), tokenizer, max_seq_length=8, cache_dir=cache_dir, num_proc=1)
+    assert list(again["input_ids"]) == list(packed["input_ids"])
+    data.prepare_dataset(str(source), tokenizer, max_seq_length=16, cache_dir=cache_dir, num_proc=1)
+    assert len(os.listdir(cache_dir)) == 2
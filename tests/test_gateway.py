@@ -0,0 +1,113 @@
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from core.gateway import WorkerPool, create_gateway_router, parse_workers
+
+
+def make_worker(name: str, saturated: bool = False):
+    worker = FastAPI()
+    jobs = set()
+
+    @worker.post("/voice/generate_audio")
+    async def generate(body: dict):
+        if saturated:
+            raise HTTPException(status_code=503, detail="At capacity.", headers={"Retry-After": "5"})
+        return {"worker": name, "text": body["text"]}
+
+    @worker.post("/voice/stream_audio")
+    async def stream():
+        return StreamingResponse(iter([b"RIFF", name.encode()]), media_type="audio/wav")
+
+    @worker.post("/voice/jobs", status_code=202)
+    async def submit():
+        job_id = f"{name}-{len(jobs)}"
+        jobs.add(job_id)
+        return {"job_id": job_id}
+
+    @worker.get("/voice/jobs/{job_id}")
+    async def get_job(job_id: str):
+        if job_id not in jobs:
+            raise HTTPException(status_code=404, detail="Job not found.")
+        return {"job_id": job_id, "worker": name}
+
+    return worker
+
+
+def make_gateway(workers: dict):
+    transports = {url: httpx.ASGITransport(app=worker) for url, worker in workers.items()}
+    pool = WorkerPool("voice", list(workers), transport=lambda url: transports[url])
+    gateway = FastAPI()
+    gateway.include_router(create_gateway_router(pool), prefix="/voice")
+    return TestClient(gateway), pool
+
+
+def test_parse_workers():
+    setting = "voice=http://127.0.0.1:8101, unix:/tmp/voice.sock;video=http://127.0.0.1:8103/;bad"
+    assert parse_workers(setting) == {
+        "voice": ["http://127.0.0.1:8101", "unix:/tmp/voice.sock"],
+        "video": ["http://127.0.0.1:8103"],
+    }
+
+
+def test_requests_are_spread_across_workers_and_streamed():
+    client, pool = make_gateway({"http://a": make_worker("a"), "http://b": make_worker("b")})
+    served = [client.post("/voice/generate_audio", json={"text": "hi"}).json()["worker"] for _ in range(4)]
+    assert sorted(served) == ["a", "a", "b", "b"]
+
+    response = client.post("/voice/stream_audio", json={"text": "hi"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "audio/wav"
+    assert response.content in (b"RIFFa", b"RIFFb")
+    assert all(instance.in_flight == 0 for instance in pool.instances)
+
+
+def test_saturated_and_unreachable_workers_are_skipped():
+    client, pool = make_gateway({"http://busy": make_worker("busy", saturated=True), "http://free": make_worker("free")})
+    assert all(client.post("/voice/generate_audio", json={"text": "hi"}).json()["worker"] == "free" for _ in range(3))
+
+    client, pool = make_gateway({"http://busy": make_worker("busy", saturated=True)})
+    response = client.post("/voice/generate_audio", json={"text": "hi"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+    def refuse(request):
+        raise httpx.ConnectError("Connection refused", request=request)
+
+    pool = WorkerPool("voice", ["http://down"], transport=lambda url: httpx.MockTransport(refuse))
+    gateway = FastAPI()
+    gateway.include_router(create_gateway_router(pool), prefix="/voice")
+    response = TestClient(gateway).post("/voice/generate_audio", json={"text": "hi"})
+    assert response.status_code == 503
+    assert pool.instances[0].down_until > 0
+
+
+def test_jobs_are_routed_to_the_worker_running_them():
+    workers = {"http://a": make_worker("a"), "http://b": make_worker("b")}
+    client, pool = make_gateway(workers)
+    job_ids = [client.post("/voice/jobs", json={"text": "hi"}).json()["job_id"] for _ in range(4)]
+    for job_id in job_ids:
+        assert client.get(f"/voice/jobs/{job_id}").json()["worker"] == job_id.split("-")[0]
+
+    # A gateway that did not see the submission finds the job on whichever worker has it
+    client, _ = make_gateway(workers)
+    for job_id in job_ids:
+        assert client.get(f"/voice/jobs/{job_id}").json()["worker"] == job_id.split("-")[0]
+    assert client.get("/voice/jobs/unknown").status_code == 404
+
+
+def test_failed_workers_are_answered_and_released():
+    def fail_with(error):
+        def handler(request):
+            raise error("Worker failed", request=request)
+        return handler
+
+    for error, status in [(httpx.ReadTimeout, 504), (httpx.RemoteProtocolError, 502)]:
+        pool = WorkerPool("voice", ["http://slow"], transport=lambda url: httpx.MockTransport(fail_with(error)))
+        gateway = FastAPI()
+        gateway.include_router(create_gateway_router(pool), prefix="/voice")
+        response = TestClient(gateway).post("/voice/generate_audio", json={"text": "hi"})
+        assert response.status_code == status
+        assert pool.instances[0].in_flight == 0
+        assert pool.instances[0].down_until == 0
@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+from pydantic import BaseModel
+
+from core import jobs
+from core.jobs import JobManager, JobStore
+
+
+class EchoRequest(BaseModel):
+    text: str
+
+
+class EchoResponse(BaseModel):
+    echo_file: str
+
+
+async def echo_logic(request, progress=None):
+    return EchoResponse(echo_file=request.text)
+
+
+def test_submitted_job_runs_to_completion(tmp_path):
+    manager = JobManager(JobStore(str(tmp_path / "jobs.sqlite3")))
+    manager.register("echo", EchoRequest, echo_logic, artifact_field="echo_file")
+
+    async def main():
+        job = manager.submit("echo", EchoRequest(text="hello.txt"))
+        assert job["status"] == "queued"
+        await asyncio.gather(*manager._tasks)
+        return manager.get("echo", job["job_id"])
+
+    job = asyncio.run(main())
+    assert job["status"] == "succeeded"
+    assert manager.artifact(job) == "hello.txt"
+    assert manager.get("other", job["job_id"]) is None
+
+
+def test_pending_jobs_are_resumed_after_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    job = JobStore(path).create("echo", {"text": "resumed.txt"})
+
+    manager = JobManager(JobStore(path))
+    manager.register("echo", EchoRequest, echo_logic, artifact_field="echo_file")
+
+    async def main():
+        assert manager.resume() == 1
+        await asyncio.gather(*manager._tasks)
+
+    asyncio.run(main())
+    assert manager.get("echo", job["job_id"])["result"] == {"echo_file": "resumed.txt"}
+
+
+def test_each_pending_job_is_resumed_by_one_worker_only(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    before = store.create("echo", {"text": "before.txt"})
+    started_at = time.time()
+    store.create("echo", {"text": "running-elsewhere.txt"})
+
+    managers = [JobManager(JobStore(path)) for _ in range(2)]
+    for manager in managers:
+        manager.register("echo", EchoRequest, echo_logic, artifact_field="echo_file")
+
+    async def main():
+        resumed = [manager.resume(started_at) for manager in managers]
+        for manager in managers:
+            await asyncio.gather(*manager._tasks)
+        return resumed
+
+    assert asyncio.run(main()) == [1, 0]
+    assert store.get(before["job_id"])["status"] == "succeeded"
+
+
+async def slow_logic(request, progress=None):
+    progress.begin_stage("denoise", 100)
+    for step in range(100):
+        await asyncio.sleep(0.01)
+        progress.step(step)
+    return EchoResponse(echo_file=request.text)
+
+
+def test_cancelled_job_stops_at_step_boundary(tmp_path):
+    manager = JobManager(JobStore(str(tmp_path / "jobs.sqlite3")))
+    manager.register("slow", EchoRequest, slow_logic, artifact_field="echo_file")
+
+    async def main():
+        job = manager.submit("slow", EchoRequest(text="never.txt"))
+        await asyncio.sleep(0.05)
+        assert manager.progress(job["job_id"])["stage"] == "denoise"
+        assert manager.cancel(job["job_id"])
+        await asyncio.gather(*manager._tasks)
+        return manager.get("slow", job["job_id"])
+
+    job = asyncio.run(main())
+    assert job["status"] == "cancelled"
+    assert manager.progress(job["job_id"]) is None
+    assert not manager.cancel(job["job_id"])
+
+
+def test_jobs_can_be_followed_and_cancelled_through_another_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "PROGRESS_SYNC_INTERVAL", 0.02)
+    path = str(tmp_path / "jobs.sqlite3")
+    running, other = JobManager(JobStore(path)), JobManager(JobStore(path))
+    for manager in (running, other):
+        manager.register("slow", EchoRequest, slow_logic, artifact_field="echo_file")
+
+    async def main():
+        job = running.submit("slow", EchoRequest(text="never.txt"))
+        await asyncio.sleep(0.1)
+        assert other.progress(job["job_id"])["stage"] == "denoise"
+        assert other.cancel(job["job_id"])
+        await asyncio.gather(*running._tasks)
+        return other.get("slow", job["job_id"])
+
+    job = asyncio.run(main())
+    assert job["status"] == "cancelled"
+    assert other.progress(job["job_id"]) is None
+    assert not other.cancel(job["job_id"])
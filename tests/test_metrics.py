@@ -0,0 +1,58 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from core.metrics import stage_timer
+
+
+def _count(**labels):
+    return REGISTRY.get_sample_value("kalasetu_stage_duration_seconds_count", labels) or 0.0
+
+
+def test_stage_timer_records_duration_with_labels():
+    labels = {"agent": "graphics", "stage": "denoise", "resolution": "64x64", "enhance": "true", "ambience": ""}
+    before = _count(**labels)
+    with stage_timer("graphics", "denoise", resolution="64x64", enhance=True):
+        pass
+    assert _count(**labels) == before + 1
+
+
+def test_stage_timer_records_failed_stages():
+    labels = {"agent": "voice", "stage": "write", "resolution": "", "enhance": "", "ambience": "cafe"}
+    before = _count(**labels)
+    with pytest.raises(ValueError):
+        with stage_timer("voice", "write", ambience="cafe"):
+            raise ValueError("disk full")
+    assert _count(**labels) == before + 1
+
+
+def test_metrics_of_all_worker_processes_are_reported(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    root = os.path.join(os.path.dirname(__file__), "..")
+    record = (
+        "from core.metrics import IN_FLIGHT, REQUESTS, gauge_function, sample_gauges\n"
+        "REQUESTS.labels('voice', 'generated').inc()\n"
+        "gauge_function(IN_FLIGHT.labels('voice'), lambda: 2)\n"
+        "sample_gauges()\n"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", record], env=env, cwd=root, check=True)
+    render = "from core.metrics import render_metrics\nprint(render_metrics()[0].decode())"
+    output = subprocess.run([sys.executable, "-c", render], env=env, cwd=root, check=True, capture_output=True, text=True).stdout
+
+    assert 'kalasetu_requests_total{agent="voice",outcome="generated"} 2.0' in output
+    # Gauges of processes that have exited are left out once gunicorn marks them dead; here both still count
+    assert 'kalasetu_in_flight{agent="voice"} 4.0' in output
+
+
+def test_resolution_labels_are_bucketed_into_standard_sizes():
+    from core.metrics import resolution_label
+
+    assert resolution_label(512, 512) == "512x512"
+    assert resolution_label(500, 780) == "512x768"
+    assert resolution_label(1920, 1080) == "2048x1024"
+    assert resolution_label(513, 97) == "other"
+    assert resolution_label(123456, 512) == "other"
@@ -0,0 +1,53 @@
+import torch
+
+from config import Config
+from core.profiles import ExecutionProfile, load_profile, prepare_bark
+
+
+def test_overrides_are_applied(monkeypatch):
+    monkeypatch.setattr(Config, "EXECUTION_DTYPE", "fp32")
+    monkeypatch.setattr(Config, "TORCH_INTRA_OP_THREADS", 3)
+    monkeypatch.setattr(Config, "ATTENTION_SLICING", "true")
+    monkeypatch.setattr(Config, "TORCH_COMPILE", "false")
+    profile = load_profile()
+
+    assert profile.dtype == "fp32"
+    assert profile.torch_dtype == torch.float32
+    assert profile.intra_op_threads == 3
+    assert profile.attention_slicing is True
+    assert profile.compile is False
+
+
+def test_intra_op_threads_are_shared_between_concurrent_calls(monkeypatch):
+    from core import executor, profiles
+
+    monkeypatch.setattr(Config, "TORCH_INTRA_OP_THREADS", 0)
+    monkeypatch.setattr(profiles, "_cpu_count", lambda: 8)
+    monkeypatch.setattr(executor, "concurrent_calls", lambda: 3)
+    monkeypatch.setattr(profiles, "_profile", None)
+    threads = torch.get_num_threads()
+    try:
+        assert profiles.get_profile().intra_op_threads == 2
+        assert torch.get_num_threads() == 2
+    finally:
+        torch.set_num_threads(threads)
+
+
+def test_fp16_falls_back_to_fp32_on_cpu(monkeypatch):
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+    monkeypatch.setattr(Config, "EXECUTION_DTYPE", "fp16")
+    assert load_profile().dtype == "fp32"
+
+
+def test_bark_linear_layers_are_quantized():
+    class FakeBark(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.semantic = torch.nn.Sequential(torch.nn.Linear(8, 8))
+            self.coarse_acoustics = torch.nn.Sequential(torch.nn.Linear(8, 8))
+            self.fine_acoustics = torch.nn.Sequential(torch.nn.Linear(8, 8))
+
+    profile = ExecutionProfile("cpu", "fp32", 1, 1, False, False, False, True)
+    model = prepare_bark(FakeBark(), profile)
+    assert isinstance(model.semantic[0], torch.ao.nn.quantized.dynamic.Linear)
+    assert model.semantic(torch.randn(2, 8)).shape == (2, 8)
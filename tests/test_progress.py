@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from core.progress import BatchProgress, GenerationCancelled, ProgressTracker
+
+
+def test_cancel_raises_at_next_step():
+    tracker = ProgressTracker()
+    tracker.begin_stage("denoise", 10)
+    tracker.step(0)
+    tracker.cancel()
+    with pytest.raises(GenerationCancelled) as excinfo:
+        tracker.step(1)
+    assert excinfo.value.reason == "cancelled"
+
+
+def test_deadline_aborts_generation():
+    tracker = ProgressTracker(deadline_seconds=0.01)
+    time.sleep(0.02)
+    with pytest.raises(GenerationCancelled) as excinfo:
+        tracker.begin_stage("denoise", 10)
+    assert excinfo.value.reason == "exceeded its deadline"
+
+
+def test_snapshot_reports_step_and_eta():
+    tracker = ProgressTracker()
+    tracker.begin_stage("denoise", 4)
+    tracker.on_step_end(None, 1, None, {})
+    snapshot = tracker.snapshot()
+    assert snapshot["stage"] == "denoise"
+    assert snapshot["step"] == 2
+    assert snapshot["total_steps"] == 4
+    assert snapshot["eta_seconds"] is not None
+
+
+def test_batch_only_aborts_when_every_request_is_cancelled():
+    first, second = ProgressTracker(), ProgressTracker()
+    batch = BatchProgress([first, second])
+    batch.begin_stage("denoise", 3)
+    first.cancel()
+    batch.step(0)
+    assert second.step_count == 1
+    second.cancel()
+    with pytest.raises(GenerationCancelled):
+        batch.step(1)
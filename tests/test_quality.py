@@ -0,0 +1,42 @@
+from core.cache import request_key, resolve_seed
+from core.quality import with_fast_scheduler
+from graphics_agent.engine import denoise_settings as graphics_settings
+from graphics_agent.schemas import TextToGraphicsRequest
+from video_agent.engine import denoise_settings as video_settings
+from video_agent.schemas import TextToVideoRequest
+from voice_agent.engine import BARK, BARK_SMALL, bark_model
+from voice_agent.schemas import TextToAudioRequest
+
+
+def test_draft_and_final_share_the_seed_but_not_the_cache_entry():
+    draft = TextToGraphicsRequest(text="Quarterly revenue", quality="draft")
+    final = draft.copy(update={"quality": "final"})
+    assert resolve_seed(draft) == resolve_seed(final)
+    assert request_key("graphics", draft) != request_key("graphics", final)
+
+
+def test_tiers_map_to_denoise_settings():
+    request = TextToGraphicsRequest(text="x", num_inference_steps=30)
+    assert graphics_settings(request.copy(update={"quality": "draft"})) == (12, True)
+    assert graphics_settings(request) == (30, False)
+    assert graphics_settings(request.copy(update={"quality": "final"})) == (50, True)
+
+    clip = TextToVideoRequest(text="x")
+    assert video_settings(clip.copy(update={"quality": "draft"})) == (10, True)
+    assert video_settings(clip) == (25, False)
+    assert video_settings(clip.copy(update={"quality": "final"})) == (50, True)
+
+    speech = TextToAudioRequest(text="x")
+    assert bark_model(speech.copy(update={"quality": "draft"})) == BARK_SMALL
+    assert bark_model(speech.copy(update={"quality": "final"})) == BARK
+
+
+def test_fast_scheduler_pipeline_shares_the_models():
+    from benchmarks.stand_ins import build_stable_diffusion
+
+    pipe = build_stable_diffusion()
+    fast = with_fast_scheduler(pipe)
+    assert fast is with_fast_scheduler(pipe)
+    assert fast.unet is pipe.unet
+    assert type(fast.scheduler).__name__ == "DPMSolverMultistepScheduler"
+    assert type(pipe.scheduler).__name__ != "DPMSolverMultistepScheduler"
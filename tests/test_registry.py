@@ -0,0 +1,43 @@
+import torch
+
+from core.registry import ModelRegistry, estimate_model_size
+
+
+def make_loader(calls, name, features=256):
+    def loader():
+        calls.append(name)
+        return torch.nn.Linear(features, features, bias=False)
+    return loader
+
+
+def test_models_load_on_first_use_only():
+    calls = []
+    registry = ModelRegistry()
+    registry.register("a", make_loader(calls, "a"))
+    assert calls == []
+
+    first = registry.get("a")
+    second = registry.get("a")
+    assert first is second
+    assert calls == ["a"]
+
+
+def test_least_recently_used_model_is_evicted_over_budget():
+    calls = []
+    size = estimate_model_size(torch.nn.Linear(256, 256, bias=False))
+    registry = ModelRegistry(memory_budget_bytes=2 * size)
+    for name in ("a", "b", "c"):
+        registry.register(name, make_loader(calls, name))
+
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")
+    registry.get("c")
+
+    assert registry.loaded() == ["a", "c"]
+    assert registry.memory_usage() == 2 * size
+
+
+def test_estimate_model_size_handles_pairs():
+    model = torch.nn.Linear(4, 4)
+    assert estimate_model_size(("processor", model)) == (16 + 4) * 4
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from core.scheduling import FairScheduler, OverBudget, current_tenant, parse_weights
+from graphics_agent.engine import estimate_cost as estimate_graphics_cost
+from graphics_agent.schemas import TextToGraphicsRequest
+from video_agent.engine import estimate_cost as estimate_video_cost
+from video_agent.schemas import TextToVideoRequest
+
+
+def make_scheduler(**kwargs):
+    scheduler = FairScheduler(**kwargs)
+    for agent in ("voice", "video"):
+        scheduler.register(agent, lambda cost: cost)
+    return scheduler
+
+
+def run_all(scheduler, submissions):
+    """
+    Submits (agent, tenant, cost, name) in order and returns the names in the order they started.
+    """
+    started = []
+
+    async def submit(agent, tenant, cost, name):
+        current_tenant.set(tenant)
+
+        async def generate(request):
+            started.append(name)
+            await asyncio.sleep(0)
+            return name
+
+        return await scheduler.run(agent, cost, generate)
+
+    async def main():
+        tasks = [asyncio.ensure_future(submit(*submission)) for submission in submissions]
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(main())
+    assert results == [submission[3] for submission in submissions]
+    return started
+
+
+def test_short_requests_overtake_long_ones():
+    scheduler = make_scheduler(capacity=200, max_backlog=10_000)
+    started = run_all(scheduler, [
+        ("video", "a", 100, "long1"),
+        ("video", "a", 100, "long2"),
+        ("video", "a", 100, "long3"),
+        ("voice", "a", 1, "short1"),
+        ("voice", "a", 1, "short2"),
+    ])
+    assert started == ["long1", "long2", "short1", "short2", "long3"]
+    assert scheduler.stats()["running"] == 0
+
+
+def test_tenants_share_an_agent_fairly():
+    scheduler = make_scheduler(capacity=2, max_backlog=100)
+    started = run_all(scheduler, [("voice", "a", 1, f"a{index}") for index in range(4)] + [("voice", "b", 1, "b0")])
+    assert started == ["a0", "a1", "b0", "a2", "a3"]
+
+
+def test_weights_favor_an_agent():
+    scheduler = make_scheduler(capacity=2, max_backlog=100, weights={"voice": 3})
+    started = run_all(scheduler, [("video", "a", 1, f"video{index}") for index in range(4)] + [("voice", "a", 1, f"voice{index}") for index in range(3)])
+    assert started[:5] == ["video0", "video1", "voice0", "voice1", "voice2"]
+
+
+def test_requests_beyond_the_backlog_are_rejected():
+    scheduler = make_scheduler(capacity=8, max_backlog=25)
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def generate(request):
+            await gate.wait()
+
+        running = [asyncio.ensure_future(scheduler.run("video", 10, generate)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(OverBudget):
+            await scheduler.run("voice", 6, generate)
+        waiting = asyncio.ensure_future(scheduler.run("voice", 5, generate))
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == {"voice": 1}
+        # A cancelled request gives its share of the backlog back
+        waiting.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued_cost_seconds"] == 0
+        gate.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(main())
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_unregistered_agents_and_disabled_scheduler_pass_through():
+    async def generate(request):
+        return request
+
+    assert asyncio.run(make_scheduler(capacity=1, max_backlog=1).run("campaign", 5, generate)) == 5
+    assert asyncio.run(make_scheduler(capacity=0, max_backlog=0).run("video", 5, generate)) == 5
+
+
+def test_parse_weights():
+    assert parse_weights("voice=2, video=0.5,bad,graphics=0") == {"voice": 2.0, "video": 0.5}
+
+
+def test_cost_estimates_follow_the_request():
+    small = TextToGraphicsRequest(text="x", width=512, height=512)
+    assert estimate_graphics_cost(small.model_copy(update={"width": 1024})) == pytest.approx(2 * estimate_graphics_cost(small))
+    assert estimate_graphics_cost(small.model_copy(update={"enhance_image": True})) > 10 * estimate_graphics_cost(small)
+
+    clip = TextToVideoRequest(text="x")
+    assert estimate_video_cost(clip.model_copy(update={"duration": 20.0})) > 5 * estimate_video_cost(clip)
+    assert estimate_video_cost(clip.model_copy(update={"enhance_video": True})) > 10 * estimate_video_cost(clip)
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import os
+
+import torch
+
+from config import Config
+from core import readiness as readiness_module
+from core import snapshot
+from core.readiness import Readiness
+from core.registry import ModelRegistry
+
+
+def test_snapshot_roundtrip_matches_original_weights(tmp_path, monkeypatch):
+    from diffusers import StableDiffusionPipeline
+
+    from benchmarks.stand_ins import build_stable_diffusion
+
+    original = build_stable_diffusion()
+
+    def load_weights(source, **kwargs):
+        if source == "hub/tiny-sd":
+            return original
+        return StableDiffusionPipeline.from_pretrained(source, **kwargs)
+
+    monkeypatch.setitem(snapshot._sources, "tiny-sd", ("hub/tiny-sd", {}, load_weights))
+    monkeypatch.setattr(Config, "MODEL_SNAPSHOT_DIR", str(tmp_path))
+    assert snapshot.snapshot_path("tiny-sd") is None
+    assert snapshot.load_pretrained("tiny-sd") is original
+
+    path = snapshot.save_snapshot("tiny-sd", str(tmp_path))
+    assert snapshot.snapshot_path("tiny-sd") == path
+    assert not os.path.exists(path + ".partial")
+    with open(os.path.join(path, snapshot.MANIFEST)) as f:
+        assert json.load(f)["source"] == "hub/tiny-sd"
+    assert any(name.endswith(".safetensors") for name in os.listdir(os.path.join(path, "unet")))
+
+    loaded = snapshot.load_pretrained("tiny-sd")
+    assert loaded is not original
+    for key, value in original.unet.state_dict().items():
+        assert torch.equal(loaded.unet.state_dict()[key].to(value.dtype), value)
+
+
+class InlineExecutor:
+    name = "test"
+
+    async def run(self, fn, *args):
+        return fn(*args)
+
+
+def _fail(model):
+    raise RuntimeError("out of memory")
+
+
+def test_readiness_reports_warm_and_failed_models(monkeypatch):
+    registry = ModelRegistry()
+    registry.register("good", lambda: "model")
+    registry.register("bad", lambda: "model")
+    registry.register("unused", lambda: "model")
+    monkeypatch.setattr(readiness_module, "registry", registry)
+    warmed = []
+
+    readiness = Readiness()
+    readiness.register("good", InlineExecutor(), warmed.append)
+    readiness.register("bad", InlineExecutor(), _fail)
+    readiness.register("unused", InlineExecutor(), warmed.append)
+    assert readiness.report()["ready"] is False
+    assert readiness.selected("good, bad") == ["good", "bad"]
+
+    asyncio.run(readiness.warm_up(["good", "bad"]))
+    report = readiness.report()
+    assert warmed == ["model"]
+    assert report["ready"] is False
+    assert report["models"]["good"]["status"] == "ready"
+    assert "load_seconds" in report["models"]["good"]
+    assert report["models"]["bad"] == {"status": "failed", "agent": "test", "error": "out of memory"}
+    assert report["models"]["unused"]["status"] == "skipped"
+
+
+def test_ready_endpoint_with_warm_up_disabled(test_client):
+    # The test run sets WARMUP_MODELS=none, so every model is skipped
+    asyncio.run(readiness_module.readiness.warm_up())
+    response = test_client.get("/ready")
+    assert response.status_code == 200
+    assert set(response.json()["models"]) == {"bark", "bark-small", "stable-diffusion", "x4-upscaler", "text-to-video"}
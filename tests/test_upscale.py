@@ -0,0 +1,55 @@
+import numpy as np
+
+from core.upscale import feather_weights, tile_positions, upscale_frames
+
+
+class FakeUpscaler:
+    """
+    Nearest-neighbour 4x upscaler with the pipeline interface used by upscale_frames.
+    """
+
+    device = "cpu"
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.encoded_prompts = 0
+
+    def encode_prompt(self, prompt, device, num_images_per_prompt, do_classifier_free_guidance, negative_prompt=None):
+        import torch
+        self.encoded_prompts += 1
+        return torch.zeros(len(prompt), 4, 8), None
+
+    def __call__(self, image, prompt_embeds, negative_prompt_embeds, generator, output_type, callback=None):
+        self.batch_sizes.append(len(image))
+        images = [np.asarray(tile, dtype=np.float32).repeat(4, axis=0).repeat(4, axis=1) / 255 for tile in image]
+
+        class Output:
+            pass
+
+        output = Output()
+        output.images = np.stack(images)
+        return output
+
+
+def test_tile_positions_cover_the_axis():
+    assert tile_positions(100, 128, 16) == [0]
+    assert tile_positions(256, 128, 16) == [0, 112, 128]
+
+
+def test_feather_weights_are_positive_and_full_in_the_middle():
+    weights = feather_weights(16, 16, 4)
+    assert weights.min() > 0
+    assert weights[8, 8, 0] == 1
+
+
+def test_tiled_upscale_reassembles_frames_in_batches():
+    upscaler = FakeUpscaler()
+    frames = [np.random.randint(0, 256, (40, 56, 3), dtype=np.uint8) for _ in range(3)]
+    upscaled = list(upscale_frames(upscaler, frames, "prompt", tile_size=24, overlap=8, batch_size=5))
+
+    assert upscaler.encoded_prompts == 1
+    assert max(upscaler.batch_sizes) == 5
+    assert len(upscaled) == 3
+    for frame, result in zip(frames, upscaled):
+        assert result.shape == (160, 224, 3)
+        np.testing.assert_allclose(result, frame.repeat(4, axis=0).repeat(4, axis=1), atol=1)
@@ -0,0 +1,107 @@
+import os
+
+import imageio_ffmpeg
+import numpy as np
+import pytest
+
+from video_agent.encoding import FrameEncoder, to_uint8_frame
+from video_agent.subtitles import glyph_atlas, render_subtitle_track, render_subtitles
+
+
+def test_frames_are_encoded_in_a_single_pass(tmp_path):
+    path = str(tmp_path / "video.mp4")
+    frames = np.random.rand(6, 64, 96, 3).astype(np.float32)
+    with FrameEncoder(path, width=96, height=64, fps=6) as encoder:
+        for frame in frames:
+            encoder.write(frame)
+
+    assert imageio_ffmpeg.count_frames_and_secs(path)[0] == 6
+
+
+def test_aborted_encoding_leaves_no_partial_file(tmp_path):
+    path = str(tmp_path / "video.mp4")
+    with pytest.raises(RuntimeError):
+        with FrameEncoder(path, width=96, height=64, fps=6) as encoder:
+            encoder.write(np.zeros((64, 96, 3), dtype=np.uint8))
+            raise RuntimeError("Generation failed.")
+
+    assert not os.path.exists(path)
+
+
+def test_subtitles_are_blended_into_the_bottom_band():
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    overlay = render_subtitles("Hello world", width=160, height=120, font_size=12)
+    result = overlay.apply(frame)
+
+    assert result.shape == frame.shape
+    assert result[:overlay.top].max() == 0
+    assert result[overlay.top:].max() > 200
+
+
+def test_subtitle_glyphs_are_rendered_once_per_font_size():
+    atlas = glyph_atlas(12)
+    render_subtitles("abba", width=160, height=120, font_size=12)
+    glyph = atlas.glyph("a")
+    render_subtitles("a cab", width=160, height=120, font_size=12)
+    assert glyph_atlas(12) is atlas and atlas.glyph("a") is glyph
+    assert atlas.measure("ab") == atlas.glyph("a")[0] + atlas.glyph("b")[0]
+    # Lines wrap at spaces to fit the frame
+    assert all(atlas.measure(line) <= 100 for line in atlas.wrap("the quick brown fox jumps over the lazy dog", 100))
+
+
+def test_timed_subtitles_follow_the_sentences():
+    track = render_subtitle_track("Short one. A much longer second sentence.", width=160, height=120, frame_count=40, max_chars=40, font_size=12)
+    assert len(track.overlays) == 2 and track.ends == [10, 40]
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    assert np.array_equal(track.apply(frame, 9), track.overlays[0].apply(frame))
+    assert np.array_equal(track.apply(frame, 10), track.overlays[1].apply(frame))
+    assert np.array_equal(track.apply(frame, 50), track.overlays[1].apply(frame))
+
+    single = render_subtitle_track("Short one. A much longer second sentence.", width=160, height=120, frame_count=40, font_size=12)
+    assert len(single.overlays) == 1
+
+
+def test_to_uint8_frame_converts_floats():
+    assert to_uint8_frame(np.ones((2, 2, 3), dtype=np.float32)).max() == 255
+
+
+def test_title_card_is_letterboxed_to_the_frame():
+    from PIL import Image
+
+    from video_agent.encoding import fit_frame
+
+    frame = fit_frame(Image.new("RGB", (40, 20), "white"), width=32, height=32)
+    assert frame.shape == (32, 32, 3)
+    assert frame[16, 16].min() == 255
+    assert frame[0].max() == 0 and frame[-1].max() == 0
+
+
+def test_timed_subtitles_follow_the_narration_under_the_title_card(tmp_path, monkeypatch):
+    import scipy.io.wavfile as wavfile
+    from PIL import Image
+
+    from config import Config
+    from video_agent import engine
+    from video_agent.schemas import TextToVideoRequest
+
+    monkeypatch.setattr(Config, "VIDEO_FPS", 4)
+    monkeypatch.setattr(Config, "VIDEO_TITLE_CARD_SECONDS", 2)
+    monkeypatch.setattr(Config, "VIDEO_SUBTITLE_MAX_CHARS", 10)
+    monkeypatch.setattr(engine, "output_dir", str(tmp_path))
+    monkeypatch.setattr(engine, "_generate_frames", lambda request, prompt, progress: iter([np.zeros((64, 96, 3), dtype=np.uint8)] * 4))
+    narration = str(tmp_path / "narration.wav")
+    wavfile.write(narration, 8000, np.zeros(8000 * 4, dtype=np.int16))  # 16 frames at 4 fps
+    title_card = str(tmp_path / "card.png")
+    Image.new("RGB", (96, 64), "white").save(title_card)
+    tracks = []
+
+    def record_track(*args, **kwargs):
+        tracks.append(render_subtitle_track(*args, **kwargs))
+        return tracks[-1]
+
+    monkeypatch.setattr(engine, "render_subtitle_track", record_track)
+    request = TextToVideoRequest(text="One two. Six ten.", timed_subtitles=True)
+    engine._generate_video(request, narration_file=narration, title_card_file=title_card)
+
+    # Both sentences share the 16 frames of narration, of which the title card covers the first 8
+    assert tracks[0].ends == [8, 16]
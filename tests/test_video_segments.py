@@ -0,0 +1,41 @@
+import pytest
+import torch
+
+from config import Config
+from core.quality import with_fast_scheduler
+from video_agent.engine import _denoise_segment, plan_segments
+
+
+def test_segments_cover_the_duration_with_overlap():
+    assert plan_segments(16, 16, 4) == [16]
+    assert plan_segments(10, 16, 4) == [10]
+    assert plan_segments(40, 16, 4) == [16, 12, 12]
+    assert plan_segments(41, 16, 4) == [16, 12, 12, 1]
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_next_segment_continues_the_overlapping_frames(fast):
+    from benchmarks.stand_ins import build_text_to_video
+
+    pipe = build_text_to_video()
+    if fast:
+        pipe = with_fast_scheduler(pipe)
+    prompt_embeds, negative_prompt_embeds = pipe.encode_prompt(["a cat", ""], "cpu", 1, False)[0].chunk(2)
+    generator = torch.Generator("cpu").manual_seed(0)
+    steps = []
+
+    first = _denoise_segment(pipe, prompt_embeds, negative_prompt_embeds, generator, 6, 10, None, lambda step, timestep, latents: None)
+    previous = first[:, :, -2:].clone()
+    second = _denoise_segment(pipe, prompt_embeds, negative_prompt_embeds, generator, 6, 10, previous, lambda step, timestep, latents: steps.append(step))
+
+    assert second.shape == first.shape
+    assert steps
+    assert torch.equal(second[:, :, :2], previous.to(second.dtype))
+    assert not torch.equal(second[:, :, 2:], first[:, :, 2:])
+
+
+def test_out_of_range_durations_are_rejected_by_every_entry_point(test_client):
+    for duration in (-5, 0, Config.VIDEO_MAX_DURATION_SECONDS + 1):
+        body = {"text": "A river at dawn", "duration": duration}
+        assert test_client.post("/video/generate_video", json=body).status_code == 422
+        assert test_client.post("/video/jobs", json=body).status_code == 422
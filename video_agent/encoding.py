@@ -0,0 +1,112 @@
+
+import os
+import subprocess
+
+import numpy as np
+
+
+def _ffmpeg_exe() -> str:
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def to_uint8_frame(frame) -> np.ndarray:
+    """
+    Converts a PIL image or a float/uint8 array into an RGB uint8 array.
+    """
+    frame = np.asarray(frame)
+    if frame.dtype != np.uint8:
+        frame = (np.clip(frame, 0.0, 1.0) * 255).round().astype(np.uint8)
+    if frame.ndim == 2:
+        frame = np.stack([frame] * 3, axis=-1)
+    return frame[..., :3]
+
+
+def fit_frame(image, width: int, height: int) -> np.ndarray:
+    """
+    Scales an image to fit inside width x height, keeping its aspect ratio, and centers it
+    on a black frame of exactly that size.
+    """
+    from PIL import Image
+
+    image = image.convert("RGB")
+    scale = min(width / image.width, height / image.height)
+    size = (max(round(image.width * scale), 1), max(round(image.height * scale), 1))
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    left, top = (width - size[0]) // 2, (height - size[1]) // 2
+    frame[top:top + size[1], left:left + size[0]] = np.asarray(image.resize(size, Image.LANCZOS))
+    return frame
+
+
+def audio_duration(path: str) -> float:
+    """
+    Returns the length of a WAV file in seconds.
+    """
+    import wave
+
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+
+class FrameEncoder:
+    """
+    Encodes frames into an H.264 MP4 in a single pass by piping raw RGB frames into one ffmpeg process.
+    An optional audio track is muxed in and cut to the length of the video, unless cut_audio is False
+    (the caller then makes the video at least as long as the audio).
+    Frames are written as they are produced, so nothing but the final file touches disk.
+    An aborted or failed encoding deletes the partial file.
+    """
+
+    def __init__(self, path: str, width: int, height: int, fps: int = 8, audio_path: str = None, preset: str = "medium", crf: int = 18, cut_audio: bool = True):
+        self.path = path
+        self.width = width
+        self.height = height
+        command = [
+            _ffmpeg_exe(), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+        ]
+        if audio_path:
+            command += ["-i", audio_path, "-map", "0:v", "-map", "1:a", "-c:a", "aac"] + (["-shortest"] if cut_audio else [])
+        command += [
+            # yuv420p needs even dimensions
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart",
+            path,
+        ]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.frames_written = 0
+
+    def write(self, frame: np.ndarray):
+        frame = to_uint8_frame(frame)
+        if frame.shape[:2] != (self.height, self.width):
+            raise ValueError(f"Frame size {frame.shape[1]}x{frame.shape[0]} does not match {self.width}x{self.height}.")
+        self._process.stdin.write(np.ascontiguousarray(frame).tobytes())
+        self.frames_written += 1
+
+    def close(self):
+        self._process.stdin.close()
+        stderr = self._process.stderr.read()
+        if self._process.wait() != 0:
+            self._remove_output()
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+
+    def abort(self):
+        self._process.kill()
+        self._process.wait()
+        self._remove_output()
+
+    def _remove_output(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -1,12 +1,29 @@
 
 import asyncio
+import functools
+import itertools
+import math
 import os
-import torch
-import imageio
-from diffusers import DiffusionPipeline
-from diffusers.utils import export_to_video
-import moviepy.editor as mpe
+import time
+import uuid
+from PIL import Image
+from config import Config
+from core.cache import resolve_seed, result_cache
+from core.embeddings import prompt_embedding_cache
+from core.executor import AgentExecutor
+from core.metrics import observe_stage, resolution_label, stage_timer
+from core.models import UPSCALER
+from core.profiles import get_profile, prepare_pipeline
+from core.progress import ProgressTracker
+from core.quality import with_fast_scheduler
+from core.readiness import readiness
+from core.registry import registry
+from core.scheduling import fair_scheduler
+from core.snapshot import load_pretrained, register_snapshot
+from core.upscale import estimate_upscale_seconds, upscale_frames
+from .encoding import FrameEncoder, audio_duration, fit_frame, to_uint8_frame
 from .schemas import TextToVideoRequest, TextToVideoResponse
+from .subtitles import render_subtitle_track
 
 # Define paths
 base_dir = os.path.dirname(__file__)
@@ -14,62 +31,284 @@ output_dir = os.path.join(base_dir, "outputs")
 music_dir = os.path.join(base_dir, "assets", "music")
 os.makedirs(output_dir, exist_ok=True)
 
-# Load models
-device = "cuda" if torch.cuda.is_available() else "cpu"
-pipe = DiffusionPipeline.from_pretrained("damo-vilab/text-to-video-ms-1.7b", torch_dtype=torch.float16, variant="fp16")
-pipe.to(device)
+TEXT_TO_VIDEO = "text-to-video"
+NUM_INFERENCE_STEPS = 25
+FRAME_SIZE = 256  # The model's output resolution
+# Rough seconds of CPU work per latent pixel (1/8 of the frame in each direction), frame and denoising step
+DENOISE_SECONDS_PER_LATENT_PIXEL = 2e-4
 
-upscaler = DiffusionPipeline.from_pretrained("stabilityai/stable-diffusion-x4-upscaler", torch_dtype=torch.float16)
-upscaler.to(device)
 
-async def generate_video_logic(request: TextToVideoRequest) -> TextToVideoResponse:
+def _load_text_to_video_weights(source, **kwargs):
+    from diffusers import DiffusionPipeline
+
+    return DiffusionPipeline.from_pretrained(source, torch_dtype=get_profile().torch_dtype, **kwargs)
+
+
+def _load_text_to_video():
+    return prepare_pipeline(load_pretrained(TEXT_TO_VIDEO))
+
+
+def _warm_up_text_to_video(pipe):
+    pipe("warm-up", num_inference_steps=1)
+
+
+# Models are loaded on first use, or at startup by the warm-up; the upscaler is shared with the graphics agent
+registry.register(TEXT_TO_VIDEO, _load_text_to_video)
+register_snapshot(TEXT_TO_VIDEO, "damo-vilab/text-to-video-ms-1.7b", _load_text_to_video_weights, variant="fp16")
+
+executor = AgentExecutor(
+    "video",
+    max_workers=Config.VIDEO_MAX_WORKERS,
+    max_queue=Config.VIDEO_MAX_QUEUE,
+    backend=Config.VIDEO_EXECUTOR_BACKEND,
+)
+readiness.register(TEXT_TO_VIDEO, executor, _warm_up_text_to_video)
+
+def plan_segments(total_frames: int, segment_frames: int, overlap: int) -> list:
+    """
+    Returns how many new frames each segment contributes to a video of total_frames frames.
+    Every segment after the first regenerates the last overlap frames of the one before it.
+    """
+    sizes = [min(total_frames, segment_frames)]
+    remaining = total_frames - sizes[0]
+    while remaining > 0:
+        sizes.append(min(segment_frames - overlap, remaining))
+        remaining -= sizes[-1]
+    return sizes
+
+
+def denoise_settings(request: TextToVideoRequest) -> tuple:
+    """
+    Returns the step count of a request's quality tier and whether it samples with DPM-Solver++;
+    see graphics_agent.engine.denoise_settings.
+    """
+    if request.quality == "draft":
+        return Config.VIDEO_DRAFT_STEPS, True
+    if request.quality == "final":
+        return max(NUM_INFERENCE_STEPS, Config.VIDEO_FINAL_STEPS), True
+    return NUM_INFERENCE_STEPS, False
+
+
+def _enhances(request: TextToVideoRequest) -> bool:
+    # Drafts are previews, so they are never upscaled
+    return request.enhance_video and request.quality != "draft"
+
+
+def _total_frames(request: TextToVideoRequest) -> int:
+    return math.ceil(request.duration * Config.VIDEO_FPS) if request.duration else Config.VIDEO_SEGMENT_FRAMES
+
+
+def _overlap() -> int:
+    return min(Config.VIDEO_SEGMENT_OVERLAP_FRAMES, Config.VIDEO_SEGMENT_FRAMES - 1)
+
+
+def estimate_cost(request: TextToVideoRequest) -> float:
+    """
+    Estimates the seconds of work a request needs from its frame count, including the overlapping
+    frames every segment regenerates, and its enhancement.
+    """
+    total_frames = _total_frames(request)
+    sizes = plan_segments(total_frames, Config.VIDEO_SEGMENT_FRAMES, _overlap())
+    denoised_frames = total_frames + _overlap() * (len(sizes) - 1)
+    steps, _ = denoise_settings(request)
+    cost = (FRAME_SIZE // 8) ** 2 * denoised_frames * steps * DENOISE_SECONDS_PER_LATENT_PIXEL
+    if _enhances(request):
+        cost += estimate_upscale_seconds(FRAME_SIZE, FRAME_SIZE, total_frames)
+    return cost
+
+
+fair_scheduler.register("video", estimate_cost)
+
+
+def _denoise_segment(pipe, prompt_embeds, negative_prompt_embeds, generator, num_frames: int, num_inference_steps: int, previous, callback):
+    """
+    Denoises one segment and returns its latents. When previous (the clean latents of the previous
+    segment's last frames) is given, the segment's first frames are pinned to them, noised to the
+    current timestep after every step, so the new frames continue the previous motion.
+    """
+    import torch
+
+    latents = None
+    if previous is not None:
+        overlap = previous.shape[2]
+        shape = (1, pipe.unet.config.in_channels, num_frames) + tuple(previous.shape[3:])
+        latents = torch.randn(shape, generator=generator, dtype=previous.dtype)
+        noise = latents[:, :, :overlap].clone()
+        step_callback = callback
+
+        def callback(step, timestep, segment_latents):
+            timesteps = pipe.scheduler.timesteps
+            if step + 1 < len(timesteps):
+                known = pipe.scheduler.add_noise(previous, noise, timesteps[step + 1:step + 2])
+            else:
+                known = previous
+            # The pipeline keeps using this tensor, so the overlap is replaced in place
+            segment_latents[:, :, :overlap] = known.to(segment_latents.device, segment_latents.dtype)
+            step_callback(step, timestep, segment_latents)
+
+    return pipe(
+        prompt_embeds=prompt_embeds,
+        negative_prompt_embeds=negative_prompt_embeds,
+        num_frames=num_frames,
+        num_inference_steps=num_inference_steps,
+        generator=generator,
+        latents=latents,
+        callback=callback,
+        output_type="latent",
+    ).frames
+
+
+def _generate_frames(request: TextToVideoRequest, prompt: str, progress: ProgressTracker):
+    """
+    Yields the video's frames as uint8 arrays, one segment at a time. A video longer than one segment
+    (VIDEO_SEGMENT_FRAMES) is generated as consecutive segments conditioned on the last
+    VIDEO_SEGMENT_OVERLAP_FRAMES frames of the previous one, and only one segment's latents and
+    frames are held at a time, so memory does not grow with the duration.
+    """
+    import torch
+
+    pipe = registry.get(TEXT_TO_VIDEO)
+    steps, fast = denoise_settings(request)
+    if fast:
+        pipe = with_fast_scheduler(pipe)
+    seed = resolve_seed(request)
+    generator = torch.Generator("cpu").manual_seed(seed)
+    overlap = _overlap()
+    sizes = plan_segments(_total_frames(request), Config.VIDEO_SEGMENT_FRAMES, overlap)
+
+    previous = None
+    for index, size in enumerate(sizes):
+        stage = "denoise" if len(sizes) == 1 else f"denoise (segment {index + 1}/{len(sizes)})"
+        progress.begin_stage(stage, steps)
+        with stage_timer("video", "denoise", enhance=_enhances(request)):
+            # The prompt is built from a few templated fields, so its encoding usually comes from the cache
+            prompt_embeds, negative_prompt_embeds = prompt_embedding_cache.encode(TEXT_TO_VIDEO, pipe, [prompt, ""]).chunk(2)
+            num_frames = size if previous is None else overlap + size
+            latents = _denoise_segment(pipe, prompt_embeds, negative_prompt_embeds, generator, num_frames, steps, previous, progress.callback)
+            previous = latents[:, :, -overlap:].clone() if overlap and index + 1 < len(sizes) else None
+            with torch.no_grad():
+                video = pipe.video_processor.postprocess_video(video=pipe.decode_latents(latents), output_type="np")[0]
+            del latents
+        # The overlapping frames repeat the end of the previous segment
+        video_frames = video[-size:]
+
+        # Enhance video frames if requested
+        if _enhances(request):
+            print("Enhancing video frames...")
+            upscaler = registry.get(UPSCALER)
+            with stage_timer("video", "upscale", enhance=True):
+                video_frames = list(upscale_frames(upscaler, video_frames, prompt, seed=seed + index, progress=progress))
+        for frame in video_frames:
+            yield to_uint8_frame(frame)
+
+
+def _generate_video(request: TextToVideoRequest, progress: ProgressTracker = None, narration_file: str = None, title_card_file: str = None) -> TextToVideoResponse:
     """
     Core logic for generating video from text using a diffusion model.
+    Frames stream into the encoder as each segment is finished; see _generate_frames.
+    - **narration_file**: A WAV file used as the audio track instead of the background music.
+      Without a duration, the generated clip is looped to cover it, up to VIDEO_MAX_DURATION_SECONDS.
+    - **title_card_file**: An image shown before the clip for VIDEO_TITLE_CARD_SECONDS.
     """
+    progress = progress or ProgressTracker(request.deadline_seconds)
     prompt = f"A video of '{request.text}', with a {request.tone} tone, in the {request.domain} domain, set in a {request.environment}."
     if request.avatar:
         prompt += f" Featuring an avatar: {request.avatar}."
 
     print(f"Generating video with prompt: '{prompt}'")
 
-    video_frames = pipe(prompt, num_inference_steps=25).frames
+    frames = _generate_frames(request, prompt, progress)
+    first_frame = next(frames)
+    height, width = first_frame.shape[:2]
+    frames = itertools.chain([first_frame], frames)
+    labels = {"resolution": resolution_label(width, height), "enhance": _enhances(request)}
 
-    # Enhance video frames if requested
-    if request.enhance_video:
-        print("Enhancing video frames...")
-        upscaled_frames = []
-        for frame in video_frames:
-            # Assuming the upscaler can take a PIL image and a prompt
-            upscaled_frame = upscaler(prompt=prompt, image=frame).images[0]
-            upscaled_frames.append(upscaled_frame)
-        video_frames = upscaled_frames
-    base_video_path = os.path.join(output_dir, "temp_video.mp4")
-    export_to_video(video_frames, base_video_path)
+    music_file_path = None
+    if request.background_music and narration_file:
+        print("Warning: The narration replaces the background music.")
+    elif request.background_music:
+        music_file_path = os.path.join(music_dir, f"{request.background_music}.mp3")
+        if not os.path.exists(music_file_path):
+            print(f"Warning: Music file not found: {music_file_path}. Skipping background music.")
+            music_file_path = None
 
-    # Post-processing with moviepy
-    final_clip = mpe.VideoFileClip(base_video_path)
+    title_frames = []
+    if title_card_file:
+        with Image.open(title_card_file) as title_card:
+            title_frames = [fit_frame(title_card, width, height)] * round(Config.VIDEO_TITLE_CARD_SECONDS * Config.VIDEO_FPS)
+    # The narration is cut to the video unless the video is lengthened to cover it
+    cut_audio = True
+    if narration_file and not request.duration:
+        # Loop the single-segment clip (the frames are shared, not copied) until it covers the narration
+        clip = list(frames)
+        needed = math.ceil(audio_duration(narration_file) * Config.VIDEO_FPS) - len(title_frames)
+        longest = math.floor(Config.VIDEO_MAX_DURATION_SECONDS * Config.VIDEO_FPS) - len(title_frames)
+        frame_count = max(min(needed, longest), len(clip))
+        cut_audio = frame_count < needed
+        frames = (clip[index % len(clip)] for index in range(frame_count))
+    else:
+        frame_count = _total_frames(request)
 
-    # Add subtitles if requested
+    # Render the subtitles once from cached glyphs and blend them onto the frames in memory
+    start = time.perf_counter()
+    subtitles = None
     if request.add_subtitles:
-        subtitle_clip = mpe.TextClip(request.text, fontsize=24, color='white', bg_color='black', size=final_clip.size)
-        subtitle_clip = subtitle_clip.set_pos(('center', 'bottom')).set_duration(final_clip.duration)
-        final_clip = mpe.CompositeVideoClip([final_clip, subtitle_clip])
+        max_chars = Config.VIDEO_SUBTITLE_MAX_CHARS if request.timed_subtitles else 0
+        # Timed over the whole video, title card included, since the narration starts under it
+        subtitles = render_subtitle_track(request.text, width, height, len(title_frames) + frame_count, max_chars=max_chars)
+    rendering_seconds = time.perf_counter() - start
 
-    # Add background music if requested
-    if request.background_music:
-        music_file_path = os.path.join(music_dir, f"{request.background_music}.mp3")
-        if os.path.exists(music_file_path):
-            music_clip = mpe.AudioFileClip(music_file_path).set_duration(final_clip.duration)
-            final_clip = final_clip.set_audio(music_clip)
-        else:
-            print(f"Warning: Music file not found: {music_file_path}. Skipping background music.")
+    # Encode the final video in a single pass while the frames are generated, muxing in the narration or music
+    final_video_path = os.path.join(output_dir, f"final_video_{uuid.uuid4().hex[:8]}.mp4")
+    encode_seconds = 0.0
+    compositing_seconds = 0.0
+    encoder = FrameEncoder(final_video_path, width, height, fps=Config.VIDEO_FPS, audio_path=narration_file or music_file_path, preset=Config.VIDEO_ENCODER_PRESET, cut_audio=cut_audio)
+    with encoder:
+        def write(frame):
+            nonlocal encode_seconds
+            start = time.perf_counter()
+            encoder.write(frame)
+            encode_seconds += time.perf_counter() - start
+            progress.check()
 
-    # Export final video
-    final_video_path = os.path.join(output_dir, "final_video.mp4")
-    final_clip.write_videofile(final_video_path, codec="libx264", audio_codec="aac")
+        for frame in title_frames:
+            write(frame)
+        for index, frame in enumerate(frames):
+            if subtitles:
+                start = time.perf_counter()
+                frame = subtitles.apply(frame, len(title_frames) + index)
+                compositing_seconds += time.perf_counter() - start
+            write(frame)
+        # Closing waits for ffmpeg to finish the file
+        closing_started = time.perf_counter()
+    encode_seconds += time.perf_counter() - closing_started
+    # Compositing and encoding are interleaved with generation, so each is timed on its own
+    if subtitles:
+        observe_stage("video", "subtitles", rendering_seconds + compositing_seconds, **labels)
+    observe_stage("video", "encode", encode_seconds, **labels)
 
     return TextToVideoResponse(video_file=final_video_path, message="Video generated successfully.")
 
+async def _run_generate_video(request: TextToVideoRequest, progress: ProgressTracker = None, **inputs) -> TextToVideoResponse:
+    # Trackers cannot cross process boundaries, so progress is only reported for thread workers
+    if executor.backend != "thread":
+        progress = None
+    return await executor.run(_generate_video, request, progress, **inputs)
+
+async def generate_video_logic(request: TextToVideoRequest, progress: ProgressTracker = None, narration_file: str = None, title_card_file: str = None) -> TextToVideoResponse:
+    """
+    Runs video generation on the video agent's executor so the event loop stays responsive.
+    Repeated requests are answered from the result cache.
+    - **progress**: Receives per-step progress and carries cancellation. Defaults to a tracker
+      enforcing the request's deadline_seconds.
+    - **narration_file**, **title_card_file**: Generated audio and image to build the video around
+      (see _generate_video); the campaign agent passes its narration and graphic.
+    """
+    progress = progress or ProgressTracker(request.deadline_seconds)
+    inputs = {name: path for name, path in (("narration_file", narration_file), ("title_card_file", title_card_file)) if path}
+    generate = functools.partial(_run_generate_video, progress=progress, **inputs)
+    return await result_cache.fetch("video", request, generate, TextToVideoResponse, "video_file", inputs=inputs)
+
 async def test_generate_video_logic():
     print("Testing basic video generation...")
     basic_request = TextToVideoRequest(
@@ -1,12 +1,16 @@
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from .schemas import TextToVideoRequest, TextToVideoResponse
+from core.executor import ExecutorSaturated
+from core.jobs import create_job_router
+from core.progress import GenerationCancelled, ProgressTracker, cancel_on_disconnect
 from .engine import generate_video_logic
 
 video_agent_router = APIRouter()
+video_agent_router.include_router(create_job_router("video", TextToVideoRequest, generate_video_logic, artifact_field="video_file"))
 
 @video_agent_router.post("/generate_video", response_model=TextToVideoResponse)
-async def generate_video(request: TextToVideoRequest):
+async def generate_video(request: TextToVideoRequest, http_request: Request = None):
     """
     Generates a video from text using a pre-trained model.
     - **text**: The script for the video.
@@ -14,11 +18,23 @@ async def generate_video(request: TextToVideoRequest):
     - **domain**: The subject domain (e.g., 'education', 'marketing').
     - **environment**: The setting of the video (e.g., 'studio', 'outdoor').
     - **avatar**: The ID of an avatar to use for narration (optional).
+    - **duration**: Length of the video in seconds (optional). Long videos are generated segment by segment.
+    - **deadline_seconds**: Cancels the generation if it runs longer than this (optional).
     """
     if not request.text:
         raise HTTPException(status_code=400, detail="Text cannot be empty.")
 
-    response = await generate_video_logic(request)
+    try:
+        progress = ProgressTracker(request.deadline_seconds)
+        generation = generate_video_logic(request, progress=progress)
+        if http_request is not None:
+            response = await cancel_on_disconnect(http_request, progress, generation)
+        else:
+            response = await generation
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except GenerationCancelled as e:
+        raise HTTPException(status_code=504 if e.reason == "exceeded its deadline" else 499, detail=str(e))
     return response
 
 if __name__ == '__main__':
@@ -1,6 +1,8 @@
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+from config import Config
 
 class TextToVideoRequest(BaseModel):
     text: str
@@ -9,9 +11,15 @@ class TextToVideoRequest(BaseModel):
     environment: str = "studio"
     avatar: Optional[str] = None
     add_subtitles: bool = True
+    timed_subtitles: bool = False  # Show the text a sentence at a time, timed by length, instead of all at once
     background_music: Optional[str] = None  # e.g., 'uplifting', 'dramatic'
     enhance_video: bool = False
+    duration: Optional[float] = Field(None, gt=0, le=Config.VIDEO_MAX_DURATION_SECONDS)  # Seconds of video; defaults to a single segment
+    seed: Optional[int] = None  # Derived from the request when omitted
+    deadline_seconds: Optional[float] = None  # Generation is aborted once it runs longer
+    quality: Literal["draft", "standard", "final"] = "standard"  # Draft renders a fast preview
 
 class TextToVideoResponse(BaseModel):
     video_file: str
     message: str
+    seed: Optional[int] = None  # Re-render a draft at final quality with this seed
@@ -0,0 +1,148 @@
+
+import functools
+import math
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from voice_agent.audio import split_sentences
+
+
+class GlyphAtlas:
+    """
+    Coverage masks of the glyphs of one font size, each rendered once on first use.
+    Subtitle lines are laid out by copying glyph masks, so no text is rasterized per request.
+    """
+
+    def __init__(self, font_size: int):
+        try:
+            self.font = ImageFont.load_default(size=font_size)
+        except TypeError:  # Pillow < 10.1 has no sized default font
+            self.font = ImageFont.load_default()
+        ascent, descent = self.font.getmetrics() if hasattr(self.font, "getmetrics") else (font_size, 4)
+        self.line_height = ascent + descent
+        self._glyphs = {}  # character -> (advance, mask)
+
+    def glyph(self, character: str):
+        glyph = self._glyphs.get(character)
+        if glyph is None:
+            advance = self.font.getlength(character)
+            right = self.font.getbbox(character)[2]
+            mask = Image.new("L", (max(math.ceil(max(advance, right)), 1), self.line_height))
+            ImageDraw.Draw(mask).text((0, 0), character, font=self.font, fill=255)
+            glyph = self._glyphs[character] = (advance, np.asarray(mask))
+        return glyph
+
+    def measure(self, text: str) -> float:
+        return sum(self.glyph(character)[0] for character in text)
+
+    def wrap(self, text: str, width: float) -> list:
+        """
+        Splits text into lines no wider than width, at spaces.
+        """
+        lines = []
+        for word in text.split():
+            if lines and self.measure(f"{lines[-1]} {word}") <= width:
+                lines[-1] = f"{lines[-1]} {word}"
+            else:
+                lines.append(word)
+        return lines or [""]
+
+    def render(self, text: str) -> np.ndarray:
+        """
+        Returns the coverage mask of one line of text, line_height rows high.
+        """
+        glyphs = [self.glyph(character) for character in text]
+        width = math.ceil(sum(advance for advance, _ in glyphs)) + max((mask.shape[1] for _, mask in glyphs), default=0)
+        line = np.zeros((self.line_height, max(width, 1)), dtype=np.uint8)
+        x = 0.0
+        for advance, mask in glyphs:
+            region = line[:, round(x):round(x) + mask.shape[1]]
+            np.maximum(region, mask, out=region)
+            x += advance
+        return line[:, :max(math.ceil(x), 1)]
+
+
+@functools.lru_cache(maxsize=8)
+def glyph_atlas(font_size: int) -> GlyphAtlas:
+    return GlyphAtlas(font_size)
+
+
+class SubtitleOverlay:
+    """
+    A subtitle band rendered once and alpha-blended onto frames.
+    Only the band at the bottom of the frame is stored, as 8-bit fixed-point weights and
+    premultiplied white text, so blending is integer arithmetic on the band's rows.
+    """
+
+    def __init__(self, top: int, coverage: np.ndarray, background_opacity: float):
+        self.top = top
+        coverage = coverage.astype(np.uint16)[..., None]
+        background = round(256 * background_opacity)
+        # Text over the band: alpha = background + (1 - background) * coverage, colour = white * coverage
+        weight = background + ((256 - background) * coverage + 127) // 255
+        self.inverse_weight = 256 - weight
+        self.premultiplied = coverage * 256 + 128  # Including the rounding term
+
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        frame = frame.copy()
+        rows = slice(self.top, self.top + self.inverse_weight.shape[0])
+        # At most 255 * 256 + 128, so uint16 cannot overflow
+        blended = frame[rows].astype(np.uint16)
+        blended *= self.inverse_weight
+        blended += self.premultiplied
+        blended >>= 8
+        frame[rows] = blended
+        return frame
+
+
+def render_subtitles(text: str, width: int, height: int, font_size: int = 24, padding: int = 6, background_opacity: float = 0.6) -> SubtitleOverlay:
+    """
+    Renders white text, centered line by line, on a translucent black band at the bottom of a width x height frame.
+    """
+    atlas = glyph_atlas(font_size)
+    lines = atlas.wrap(text, width - 2 * padding)
+
+    line_height = atlas.line_height + 4
+    band_height = min(len(lines) * line_height + 2 * padding, height)
+    coverage = np.zeros((band_height, width), dtype=np.uint8)
+    for index, line in enumerate(lines):
+        mask = atlas.render(line)
+        top = padding + index * line_height
+        left = max((width - mask.shape[1]) // 2, 0)
+        region = coverage[top:top + mask.shape[0], left:left + mask.shape[1]]
+        region[:] = mask[:region.shape[0], :region.shape[1]]
+    return SubtitleOverlay(height - band_height, coverage, background_opacity)
+
+
+class SubtitleTrack:
+    """
+    The subtitles of a clip: consecutive overlays, each shown up to (but not including) its end frame.
+    The last overlay stays on any frames beyond the track.
+    """
+
+    def __init__(self, overlays: list, ends: list):
+        self.overlays = overlays
+        self.ends = ends
+
+    def apply(self, frame: np.ndarray, index: int) -> np.ndarray:
+        for overlay, end in zip(self.overlays, self.ends):
+            if index < end:
+                return overlay.apply(frame)
+        return self.overlays[-1].apply(frame)
+
+
+def render_subtitle_track(text: str, width: int, height: int, frame_count: int, max_chars: int = 0, **style) -> SubtitleTrack:
+    """
+    Renders the text as one overlay for the whole clip, or, with max_chars, as sentence segments
+    of at most max_chars characters, each shown for a share of the frames proportional to its length.
+    - **style**: font_size, padding and background_opacity, as for render_subtitles.
+    """
+    segments = (split_sentences(text, max_chars) if max_chars else []) or [text]
+    total = sum(len(segment) for segment in segments)
+    ends = []
+    shown = 0
+    for segment in segments:
+        shown += len(segment)
+        ends.append(round(frame_count * shown / total) if total else frame_count)
+    return SubtitleTrack([render_subtitles(segment, width, height, **style) for segment in segments], ends)
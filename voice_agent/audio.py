@@ -0,0 +1,178 @@
+
+import os
+import re
+import struct
+import textwrap
+from math import gcd
+
+import numpy as np
+import scipy.io.wavfile as wavfile
+from scipy.signal import resample_poly
+
+# Sentence ends: Latin punctuation followed by whitespace, or Devanagari/CJK punctuation
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|(?<=[।。！？])")
+
+
+def split_sentences(text: str, max_chars: int = 200) -> list:
+    """
+    Splits text into sentence-sized chunks of at most max_chars characters.
+    Short sentences are merged with their neighbours; overly long ones are split at word boundaries.
+    """
+    chunks = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        pieces = textwrap.wrap(sentence, max_chars, break_long_words=False) if len(sentence) > max_chars else [sentence]
+        for piece in pieces:
+            if current and len(current) + 1 + len(piece) <= max_chars:
+                current = f"{current} {piece}"
+            else:
+                if current:
+                    chunks.append(current)
+                current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class Crossfader:
+    """
+    Joins consecutive audio chunks with a short linear crossfade.
+    push() returns the audio that is final so far; the last fade_samples of each chunk are held
+    back until the next chunk arrives (or flush() is called), so it also works while streaming.
+    """
+
+    def __init__(self, fade_samples: int):
+        self.fade_samples = fade_samples
+        self._tail = None
+
+    def push(self, audio: np.ndarray) -> np.ndarray:
+        audio = np.asarray(audio, dtype=np.float32)
+        if self._tail is not None and len(self._tail):
+            n = min(len(self._tail), len(audio))
+            ramp = np.linspace(0.0, 1.0, n, endpoint=False, dtype=np.float32)
+            blended = self._tail[len(self._tail) - n:] * (1.0 - ramp) + audio[:n] * ramp
+            audio = np.concatenate([self._tail[:len(self._tail) - n], blended, audio[n:]])
+        keep = min(self.fade_samples, len(audio))
+        self._tail = audio[len(audio) - keep:]
+        return audio[:len(audio) - keep]
+
+    def flush(self) -> np.ndarray:
+        tail = self._tail if self._tail is not None else np.zeros(0, dtype=np.float32)
+        self._tail = None
+        return tail
+
+
+def crossfade_concat(chunks: list, fade_samples: int) -> np.ndarray:
+    crossfader = Crossfader(fade_samples)
+    parts = [crossfader.push(chunk) for chunk in chunks]
+    parts.append(crossfader.flush())
+    return np.concatenate(parts)
+
+
+def wav_header(sample_rate: int, num_samples: int = None) -> bytes:
+    """
+    Returns a 16-bit mono PCM WAV header. Without num_samples the sizes are set to the maximum,
+    which players treat as a stream of unknown length.
+    """
+    data_size = num_samples * 2 if num_samples is not None else 0xFFFFFFFF - 36
+    return b"RIFF" + struct.pack("<I", data_size + 36) + b"WAVE" + b"fmt " + struct.pack(
+        "<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16
+    ) + b"data" + struct.pack("<I", data_size)
+
+
+def to_pcm16_array(audio: np.ndarray) -> np.ndarray:
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+
+
+def to_pcm16(audio: np.ndarray) -> bytes:
+    return to_pcm16_array(audio).tobytes()
+
+
+def load_audio(path: str):
+    """
+    Decodes an audio file into a mono float32 array in [-1, 1]. Returns (samples, sample_rate).
+    WAV files are read directly; other formats are decoded through pydub (requires ffmpeg).
+    """
+    if path.lower().endswith(".wav"):
+        sample_rate, samples = wavfile.read(path)
+    else:
+        from pydub import AudioSegment
+
+        segment = AudioSegment.from_file(path)
+        sample_rate = segment.frame_rate
+        samples = np.array(segment.get_array_of_samples()).reshape(-1, segment.channels)
+        samples = samples.astype(np.float32) / float(1 << (8 * segment.sample_width - 1))
+    if samples.dtype == np.uint8:
+        samples = (samples.astype(np.float32) - 128) / 128
+    elif np.issubdtype(samples.dtype, np.integer):
+        samples = samples.astype(np.float32) / np.iinfo(samples.dtype).max
+    samples = samples.astype(np.float32)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    return samples, sample_rate
+
+
+def resample(audio: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    if source_rate == target_rate:
+        return audio
+    divisor = gcd(source_rate, target_rate)
+    return resample_poly(audio, target_rate // divisor, source_rate // divisor).astype(np.float32)
+
+
+def mix_ambience(speech: np.ndarray, ambience: np.ndarray, gain_db: float = -10.0, fade_samples: int = 0) -> np.ndarray:
+    """
+    Mixes an ambience track under speech. The track is looped or trimmed to the speech length,
+    attenuated by gain_db and faded in and out over fade_samples.
+    """
+    if not len(speech) or not len(ambience):
+        return speech
+    bed = np.resize(ambience, len(speech)) * np.float32(10 ** (gain_db / 20))
+    fade = min(fade_samples, len(bed) // 2)
+    if fade:
+        ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+        bed[:fade] *= ramp
+        bed[len(bed) - fade:] *= ramp[::-1]
+    return np.clip(speech + bed, -1.0, 1.0)
+
+
+class AmbienceLibrary:
+    """
+    Holds the ambience tracks decoded once, and their resampled versions per sample rate.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._tracks = None
+        self._resampled = {}
+
+    def load(self):
+        tracks = {}
+        if os.path.isdir(self.directory):
+            for file_name in sorted(os.listdir(self.directory)):
+                name, extension = os.path.splitext(file_name)
+                if extension.lower() in (".md", ".txt") or name in tracks:
+                    continue
+                try:
+                    tracks[name] = load_audio(os.path.join(self.directory, file_name))
+                except Exception as e:
+                    print(f"Warning: Could not decode ambience file {file_name}: {e}")
+        self._tracks = tracks
+        self._resampled = {}
+        print(f"Loaded {len(tracks)} ambience track(s).")
+
+    def get(self, name: str, sample_rate: int):
+        """
+        Returns the named track at the given sample rate, or None if there is no such track.
+        """
+        if self._tracks is None:
+            self.load()
+        if name not in self._tracks:
+            return None
+        key = (name, sample_rate)
+        if key not in self._resampled:
+            samples, source_rate = self._tracks[name]
+            self._resampled[key] = resample(samples, source_rate, sample_rate)
+        return self._resampled[key]
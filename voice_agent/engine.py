@@ -2,11 +2,35 @@
 from .schemas import TextToAudioRequest
 
 import asyncio
+import functools
 import os
-from transformers import AutoProcessor, BarkModel
+import threading
+import uuid
+from typing import AsyncIterator, List
+import numpy as np
+import torch
 import scipy.io.wavfile as wavfile
-from pydub import AudioSegment
 
+from config import Config
+from core.cache import resolve_seed, result_cache
+from core.executor import AgentExecutor, ExecutorSaturated
+from core.metrics import stage_timer
+from core.profiles import get_profile, prepare_bark
+from core.progress import ProgressTracker
+from core.readiness import readiness
+from core.registry import registry
+from core.scheduling import fair_scheduler
+from core.snapshot import load_pretrained, register_snapshot
+from .audio import (
+    AmbienceLibrary,
+    Crossfader,
+    crossfade_concat,
+    mix_ambience,
+    split_sentences,
+    to_pcm16,
+    to_pcm16_array,
+    wav_header,
+)
 from .schemas import TextToAudioRequest, TextToAudioResponse
 
 # Define paths
@@ -15,9 +39,71 @@ output_dir = os.path.join(base_dir, "outputs")
 ambience_dir = os.path.join(base_dir, "assets", "ambience")
 os.makedirs(output_dir, exist_ok=True)
 
-# Load the model and processor
-processor = AutoProcessor.from_pretrained("suno/bark")
-model = BarkModel.from_pretrained("suno/bark")
+# Ambience tracks are decoded once and kept in memory
+ambience_tracks = AmbienceLibrary(ambience_dir)
+
+BARK = "bark"
+BARK_SMALL = "bark-small"  # Speaks draft requests
+# Rough seconds of CPU work per character of text, across Bark's three models
+SECONDS_PER_CHARACTER = {BARK: 0.1, BARK_SMALL: 0.03}
+# Bark samples from torch's process-wide RNG and takes no torch.Generator, so seeded generations
+# hold this lock: otherwise concurrent workers would reseed each other mid-generation
+_seeded_generation = threading.Lock()
+
+
+def _load_bark_weights(source, **kwargs):
+    from transformers import AutoProcessor, BarkModel
+
+    processor = AutoProcessor.from_pretrained(source, **kwargs)
+    model = BarkModel.from_pretrained(source, torch_dtype=get_profile().torch_dtype, **kwargs)
+    return processor, model
+
+
+def _load_bark(name: str = BARK):
+    processor, model = load_pretrained(name)
+    return processor, prepare_bark(model)
+
+
+def _warm_up_bark(bark):
+    processor, model = bark
+    inputs = processor(["Warm-up."], voice_preset="v2/en_speaker_6", return_tensors="pt")
+    model.generate(**inputs, semantic_max_new_tokens=8)
+
+
+# The models and processors are loaded on first use, or at startup by the warm-up
+registry.register(BARK, _load_bark)
+registry.register(BARK_SMALL, functools.partial(_load_bark, BARK_SMALL))
+register_snapshot(BARK, "suno/bark", _load_bark_weights)
+register_snapshot(BARK_SMALL, "suno/bark-small", _load_bark_weights)
+
+executor = AgentExecutor(
+    "voice",
+    max_workers=Config.VOICE_MAX_WORKERS,
+    max_queue=Config.VOICE_MAX_QUEUE,
+    backend=Config.VOICE_EXECUTOR_BACKEND,
+)
+readiness.register(BARK, executor, _warm_up_bark)
+readiness.register(BARK_SMALL, executor, _warm_up_bark)
+
+
+def bark_model(request: TextToAudioRequest) -> str:
+    """
+    Returns the Bark variant of a request's quality tier: Bark small for drafts, full Bark otherwise.
+    The quality tier does not change the derived seed, so a final render reuses the draft's seed.
+    """
+    return BARK_SMALL if request.quality == "draft" else BARK
+
+
+def estimate_cost(request: TextToAudioRequest) -> float:
+    """
+    Estimates the seconds of work a request needs from the length of its text and its model.
+    """
+    return len(request.text) * SECONDS_PER_CHARACTER[bark_model(request)]
+
+
+fair_scheduler.register("voice", estimate_cost)
+# How long a stream that has started waits before retrying a sentence the scheduler turned away
+STREAM_RETRY_SECONDS = 0.5
 
 # Define available voices for different languages and accents
 voice_presets = {
@@ -34,53 +120,127 @@ voice_presets = {
 }
 
 
-async def generate_audio_logic(request: TextToAudioRequest) -> TextToAudioResponse:
+def _synthesize(chunks: List[str], voice_preset: str, request: TextToAudioRequest, seed: int) -> List[np.ndarray]:
+    """
+    Generates one padded batch of text chunks and returns the unpadded waveform of each.
+    """
+    processor, model = registry.get(bark_model(request))
+    with stage_timer("voice", "tokenize", ambience=request.ambience):
+        inputs = processor(chunks, voice_preset=voice_preset, return_tensors="pt")
+
+    # Bark samples from the global RNG, so seed it for reproducible output; tokenizing runs outside the lock
+    with _seeded_generation:
+        torch.manual_seed(seed)
+        with stage_timer("voice", "generate", ambience=request.ambience):
+            audio, lengths = model.generate(
+                **inputs,
+                do_sample=True,
+                fine_temperature=request.creativity,
+                coarse_temperature=request.stability,
+                return_output_lengths=True,
+            )
+    audio = audio.float().cpu().numpy()  # numpy has no bfloat16
+    return [audio[i, :length] for i, length in enumerate(lengths)]
+
+
+def _sample_rate(name: str = BARK) -> int:
+    _, model = registry.get(name)
+    return model.generation_config.sample_rate
+
+
+def _generate_audio(request: TextToAudioRequest, progress: ProgressTracker = None) -> TextToAudioResponse:
     """
     Core logic for generating audio from text using suno/bark model.
     """
+    progress = progress or ProgressTracker()
     print(f"Generating audio for: '{request.text}' in {request.language} with a {request.accent} accent.")
 
     voice_preset = voice_presets.get(f"{request.language}-{request.accent}", "v2/en_speaker_6")  # Default to en-us
+    _, model = registry.get(bark_model(request))
+    sample_rate = model.generation_config.sample_rate
 
-    inputs = processor(request.text, voice_preset=voice_preset, return_tensors="pt")
+    # Bark handles short segments best: generate sentence-sized chunks in padded batches
+    # with one voice preset, then join them with short crossfades
+    chunks = split_sentences(request.text, Config.VOICE_MAX_CHUNK_CHARS)
+    seed = resolve_seed(request)
+    pieces = []
+    progress.begin_stage("synthesize", -(-len(chunks) // Config.VOICE_BATCH_SIZE))
+    for start in range(0, len(chunks), Config.VOICE_BATCH_SIZE):
+        pieces.extend(_synthesize(chunks[start:start + Config.VOICE_BATCH_SIZE], voice_preset, request, seed + start))
+        progress.step()
+    with stage_timer("voice", "mix", ambience=request.ambience):
+        audio_array = crossfade_concat(pieces, sample_rate * Config.VOICE_CROSSFADE_MS // 1000)
 
-    # Generate audio
-    audio_array = model.generate(**inputs, do_sample=True, fine_temperature=request.creativity, coarse_temperature=request.stability)
-    audio_array = audio_array.cpu().numpy().squeeze()
+        # If ambience is requested, mix it in memory
+        if request.ambience != "none":
+            ambience = ambience_tracks.get(request.ambience, sample_rate)
+            if ambience is None:
+                print(f"Warning: Ambience track not found: {request.ambience}. Skipping ambience.")
+            else:
+                audio_array = mix_ambience(
+                    audio_array,
+                    ambience,
+                    gain_db=Config.VOICE_AMBIENCE_GAIN_DB,
+                    fade_samples=sample_rate * Config.VOICE_AMBIENCE_FADE_MS // 1000,
+                )
 
-    # Save the audio file
-    sample_rate = model.generation_config.sample_rate
-    audio_file_name = f"generated_audio_{request.language}_{request.accent}.wav"
+    # Save the audio file; this is the only encode
+    audio_file_name = f"generated_audio_{request.language}_{request.accent}_{uuid.uuid4().hex[:8]}.wav"
     audio_file_path = os.path.join(output_dir, audio_file_name)
-    wavfile.write(audio_file_path, sample_rate, audio_array)
-
-    # If ambience is requested, mix it in
-    if request.ambience != "none":
-        try:
-            # Load generated speech
-            speech = AudioSegment.from_wav(audio_file_path)
-
-            # Load ambience track
-            ambience_file = os.path.join(ambience_dir, f"{request.ambience}.wav")
-            if not os.path.exists(ambience_file):
-                print(f"Warning: Ambience file not found: {ambience_file}. Skipping ambience.")
-            else:
-                ambience = AudioSegment.from_wav(ambience_file)
+    with stage_timer("voice", "write", ambience=request.ambience):
+        wavfile.write(audio_file_path, sample_rate, to_pcm16_array(audio_array))
 
-                # Mix speech with ambience (overlay)
-                # Adjust ambience volume to be in the background
-                mixed = speech.overlay(ambience - 10)  # Reduce ambience volume by 10 dB
+    return TextToAudioResponse(audio_file=audio_file_path, message="Audio generated successfully.")
 
-                # Export mixed audio
-                mixed_file_name = f"generated_audio_with_{request.ambience}.wav"
-                mixed_file_path = os.path.join(output_dir, mixed_file_name)
-                mixed.export(mixed_file_path, format="wav")
-                audio_file_path = mixed_file_path
 
-        except Exception as e:
-            print(f"Error during audio mixing: {e}. Returning original audio.")
+async def _run_generate_audio(request: TextToAudioRequest, progress: ProgressTracker = None) -> TextToAudioResponse:
+    # Trackers cannot cross process boundaries, so progress is only reported for thread workers
+    if executor.backend != "thread":
+        progress = None
+    return await executor.run(_generate_audio, request, progress)
 
-    return TextToAudioResponse(audio_file=audio_file_path, message="Audio generated successfully.")
+
+async def generate_audio_logic(request: TextToAudioRequest, progress: ProgressTracker = None) -> TextToAudioResponse:
+    """
+    Runs audio generation on the voice agent's executor so the event loop stays responsive.
+    Repeated requests are answered from the result cache.
+    - **progress**: Receives per-chunk progress and carries cancellation.
+    """
+    generate = functools.partial(_run_generate_audio, progress=progress)
+    return await result_cache.fetch("voice", request, generate, TextToAudioResponse, "audio_file")
+
+
+async def stream_audio_logic(request: TextToAudioRequest) -> AsyncIterator[bytes]:
+    """
+    Streams a WAV file sentence by sentence: each chunk is sent as soon as it is generated,
+    so the time to first audio is bounded by a single sentence. Ambience is not mixed in.
+    The first item holds the WAV header together with the first chunk.
+    Every sentence waits for its turn in the fair scheduler, charged for its own text, so streams
+    take turns with the other voice requests. Only the first sentence can be rejected; later ones
+    wait for capacity instead, since the response has already started.
+    """
+    voice_preset = voice_presets.get(f"{request.language}-{request.accent}", "v2/en_speaker_6")
+    chunks = split_sentences(request.text, Config.VOICE_MAX_CHUNK_CHARS)
+    seed = resolve_seed(request)
+    sample_rate = await executor.run(_sample_rate, bark_model(request))
+    crossfader = Crossfader(sample_rate * Config.VOICE_CROSSFADE_MS // 1000)
+
+    header = wav_header(sample_rate)
+    for index, chunk in enumerate(chunks):
+        async def synthesize(chunk_request):
+            return await executor.run(_synthesize, [chunk], voice_preset, request, seed + index)
+
+        while True:
+            try:
+                pieces = await fair_scheduler.run("voice", request.model_copy(update={"text": chunk}), synthesize)
+                break
+            except ExecutorSaturated:
+                if index == 0:
+                    raise
+                await asyncio.sleep(STREAM_RETRY_SECONDS)
+        yield header + to_pcm16(crossfader.push(pieces[0]))
+        header = b""
+    yield header + to_pcm16(crossfader.flush())
 
 
 async def test_generate_audio_logic():
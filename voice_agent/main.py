@@ -1,9 +1,13 @@
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from .schemas import TextToAudioRequest, TextToAudioResponse
-from .engine import generate_audio_logic
+from core.executor import ExecutorSaturated
+from core.jobs import create_job_router
+from .engine import generate_audio_logic, stream_audio_logic
 
 voice_agent_router = APIRouter()
+voice_agent_router.include_router(create_job_router("voice", TextToAudioRequest, generate_audio_logic, artifact_field="audio_file"))
 
 @voice_agent_router.post("/generate_audio", response_model=TextToAudioResponse)
 async def generate_audio(request: TextToAudioRequest):
@@ -17,9 +21,35 @@ async def generate_audio(request: TextToAudioRequest):
     if not request.text:
         raise HTTPException(status_code=400, detail="Text cannot be empty.")
     
-    response = await generate_audio_logic(request)
+    try:
+        response = await generate_audio_logic(request)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     return response
 
+@voice_agent_router.post("/stream_audio")
+async def stream_audio(request: TextToAudioRequest):
+    """
+    Streams generated audio as a WAV file, one sentence at a time.
+    Accepts the same body as /generate_audio; ambience is not applied to streams.
+    """
+    if not request.text:
+        raise HTTPException(status_code=400, detail="Text cannot be empty.")
+
+    stream = stream_audio_logic(request)
+    try:
+        # Generate the first sentence before responding so capacity errors can still return 503
+        first_chunk = await stream.__anext__()
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    async def body():
+        yield first_chunk
+        async for chunk in stream:
+            yield chunk
+
+    return StreamingResponse(body(), media_type="audio/wav")
+
 if __name__ == '__main__':
     # Example of how to test this module directly
     import asyncio
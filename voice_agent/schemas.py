@@ -1,6 +1,6 @@
 
 from pydantic import BaseModel
-from typing import Literal
+from typing import Literal, Optional
 
 class TextToAudioRequest(BaseModel):
     text: str
@@ -9,8 +9,11 @@ class TextToAudioRequest(BaseModel):
     ambience: Literal["none", "cafe", "news_studio", "nature"] = "none"
     creativity: float = 0.7  # Corresponds to fine_temperature
     stability: float = 0.3  # Corresponds to coarse_temperature
+    seed: Optional[int] = None  # Derived from the request when omitted
+    quality: Literal["draft", "standard", "final"] = "standard"  # Draft renders a fast preview
 
 class TextToAudioResponse(BaseModel):
     audio_file: str
     message: str
+    seed: Optional[int] = None  # Re-render a draft at final quality with this seed
 